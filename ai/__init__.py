@@ -7,45 +7,28 @@ from .grok_provider import GrokProvider
 from .claude_provider import ClaudeProvider
 import os
 import logging
-from utils.settings import load_ai_models
 from utils.constants import DEFAULT_AI_MODEL
+from .provider_registry import provider_registry
+from .result_cache import ai_result_cache
+from .executor import ai_executor, AIProviderError
 
 # 获取日志记录器
 logger = logging.getLogger(__name__)
 
+# 注册提供商名称对应的提供者类
+provider_registry.register("openai", OpenAIProvider)
+provider_registry.register("gemini", GeminiProvider)
+provider_registry.register("deepseek", DeepSeekProvider)
+provider_registry.register("qwen", QwenProvider)
+provider_registry.register("grok", GrokProvider)
+provider_registry.register("claude", ClaudeProvider)
+
 async def get_ai_provider(model=None):
-    """获取AI提供者实例"""
+    """获取AI提供者实例（同一模型复用同一实例及其客户端）"""
     if not model:
         model = DEFAULT_AI_MODEL
-    
-    # 加载提供商配置（使用dict格式）
-    providers_config = load_ai_models(type="dict")
-    
-    # 根据模型名称选择对应的提供者
-    provider = None
-    
-    # 遍历配置中的每个提供商
-    for provider_name, models_list in providers_config.items():
-        # 检查完全匹配
-        if model in models_list:
-            if provider_name == "openai":
-                provider = OpenAIProvider()
-            elif provider_name == "gemini":
-                provider = GeminiProvider()
-            elif provider_name == "deepseek":
-                provider = DeepSeekProvider()
-            elif provider_name == "qwen":
-                provider = QwenProvider()
-            elif provider_name == "grok":
-                provider = GrokProvider()
-            elif provider_name == "claude":
-                provider = ClaudeProvider()
-            break
-    
-    if not provider:
-        raise ValueError(f"不支持的模型: {model}")
 
-    return provider
+    return provider_registry.get_provider(model)
 
 
 __all__ = [
@@ -56,5 +39,9 @@ __all__ = [
     'QwenProvider',
     'GrokProvider',
     'ClaudeProvider',
-    'get_ai_provider'
+    'get_ai_provider',
+    'provider_registry',
+    'ai_result_cache',
+    'ai_executor',
+    'AIProviderError'
 ]
\ No newline at end of file
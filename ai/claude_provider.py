@@ -1,6 +1,9 @@
 from typing import Optional, List, Dict
+import asyncio
 import anthropic
 from .base import BaseAIProvider
+from .provider_registry import provider_registry
+from utils.constants import AI_REQUEST_TIMEOUT
 import os
 import logging
 
@@ -22,13 +25,12 @@ class ClaudeProvider(BaseAIProvider):
         api_base = os.getenv('CLAUDE_API_BASE', '').strip()
         if api_base:
             logger.info(f"使用自定义Claude API基础URL: {api_base}")
-            self.client = anthropic.Anthropic(
-                api_key=api_key,
-                base_url=api_base
-            )
+            factory = lambda: anthropic.Anthropic(api_key=api_key, base_url=api_base, timeout=AI_REQUEST_TIMEOUT)
         else:
             # 使用默认URL
-            self.client = anthropic.Anthropic(api_key=api_key)
+            factory = lambda: anthropic.Anthropic(api_key=api_key, timeout=AI_REQUEST_TIMEOUT)
+        # 同一API地址和密钥共用一个客户端，复用HTTP连接池
+        self.client = provider_registry.get_client(('claude', api_key, api_base), factory)
             
         self.model = kwargs.get('model', self.default_model)
         
@@ -76,19 +78,23 @@ class ClaudeProvider(BaseAIProvider):
                 # 没有图片，只添加文本
                 messages.append({"role": "user", "content": message})
             
-            # 使用流式输出 - 按照官方文档正确实现
-            with self.client.messages.stream(
-                model=self.model,
-                max_tokens=4096,
-                messages=messages
-            ) as stream:
-                # 使用专用的text_stream迭代器直接获取文本
-                full_response = ""
-                for text in stream.text_stream:
-                    full_response += text
-        
-            return full_response
+            # 同步客户端在线程中调用，不阻塞事件循环，超时后调用方可以直接返回
+            return await asyncio.to_thread(self._stream_text, messages)
             
         except Exception as e:
             logger.error(f"Claude API 调用失败: {str(e)}")
-            return f"AI处理失败: {str(e)}" 
\ No newline at end of file
+            return f"AI处理失败: {str(e)}" 
+
+    def _stream_text(self, messages: List[Dict]) -> str:
+        """使用流式输出获取完整回复 (同步调用)"""
+        # 使用流式输出 - 按照官方文档正确实现
+        with self.client.messages.stream(
+            model=self.model,
+            max_tokens=4096,
+            messages=messages
+        ) as stream:
+            # 使用专用的text_stream迭代器直接获取文本
+            full_response = ""
+            for text in stream.text_stream:
+                full_response += text
+        return full_response
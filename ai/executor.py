@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from utils.constants import DEFAULT_AI_MODEL, AI_CONCURRENCY, AI_REQUEST_TIMEOUT, AI_BREAKER_THRESHOLD, AI_BREAKER_COOLDOWN
+from .provider_registry import provider_registry
+from .result_cache import FAILED_RESULT_PREFIXES
+
+logger = logging.getLogger(__name__)
+
+# 每个提供商保留最近多少次调用的耗时用于统计
+LATENCY_WINDOW = 200
+
+
+class AIProviderError(Exception):
+    """AI调用失败（提供商返回错误、超时或熔断），调用方应使用未处理的原文"""
+
+
+class AITimeoutError(AIProviderError):
+    """AI调用超时"""
+
+
+class AICircuitOpenError(AIProviderError):
+    """提供商连续失败已熔断，在冷却时间内直接拒绝调用"""
+
+
+class _ProviderState:
+    """单个提供商的并发限制、熔断状态和调用统计"""
+
+    __slots__ = (
+        'semaphore', 'failures', 'opened_at', 'probing',
+        'calls', 'errors', 'timeouts', 'rejected', 'in_flight', 'latencies'
+    )
+
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # 连续失败次数，达到阈值后熔断
+        self.failures = 0
+        # 熔断开始时间，为 None 表示未熔断
+        self.opened_at: Optional[float] = None
+        # 冷却结束后是否已有一个试探请求正在进行
+        self.probing = False
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+
+class AIExecutor:
+    """
+    AI调用执行层
+
+    - 每个提供商一个信号量，最多同时进行 concurrency 个请求，排队等待同样计入超时时间
+    - 单次请求超过 timeout 秒视为失败；使用同步 SDK 的提供者 (Claude、Gemini) 在线程中调用，
+      超时后立即返回，线程中的请求由客户端自身的超时结束
+    - 连续失败 breaker_threshold 次后熔断，breaker_cooldown 秒内直接失败，
+      冷却结束后放行一个试探请求，成功则恢复，失败则继续熔断
+    - 按提供商记录调用次数、失败次数和耗时
+    提供者把异常转换成 'AI处理失败: ...' 文本返回，这类结果同样视为失败
+    """
+
+    def __init__(self, concurrency: int = AI_CONCURRENCY, timeout: float = AI_REQUEST_TIMEOUT,
+                 breaker_threshold: int = AI_BREAKER_THRESHOLD, breaker_cooldown: float = AI_BREAKER_COOLDOWN):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.breaker_threshold = max(1, breaker_threshold)
+        self.breaker_cooldown = breaker_cooldown
+        self._states: Dict[str, _ProviderState] = {}
+        logger.info(
+            f"AIExecutor 初始化，每个提供商并发数: {self.concurrency}，超时: {self.timeout} 秒，"
+            f"熔断阈值: {self.breaker_threshold} 次，冷却: {self.breaker_cooldown} 秒"
+        )
+
+    def _get_state(self, provider_name: str) -> _ProviderState:
+        state = self._states.get(provider_name)
+        if state is None:
+            state = _ProviderState(self.concurrency)
+            self._states[provider_name] = state
+        return state
+
+    def _allow(self, state: _ProviderState) -> bool:
+        """熔断检查，冷却结束后只放行一个试探请求"""
+        if state.opened_at is None:
+            return True
+        if state.probing or time.monotonic() - state.opened_at < self.breaker_cooldown:
+            return False
+        state.probing = True
+        return True
+
+    def _record_success(self, provider_name: str, state: _ProviderState) -> None:
+        if state.opened_at is not None:
+            logger.info(f"AI提供商 {provider_name} 已恢复，关闭熔断")
+        state.failures = 0
+        state.opened_at = None
+        state.probing = False
+
+    def _record_failure(self, provider_name: str, state: _ProviderState) -> None:
+        state.errors += 1
+        state.failures += 1
+        if state.probing or state.failures >= self.breaker_threshold:
+            if state.opened_at is None or state.probing:
+                logger.warning(
+                    f"AI提供商 {provider_name} 连续失败 {state.failures} 次，熔断 {self.breaker_cooldown} 秒"
+                )
+            state.opened_at = time.monotonic()
+        state.probing = False
+
+    async def process(self, model: str, message: str, prompt: Optional[str] = None,
+                      images: Optional[List[Dict[str, str]]] = None, timeout: Optional[float] = None) -> str:
+        """
+        调用模型处理消息
+
+        Args:
+            model: 模型名称，为空时使用默认模型
+            message: 消息内容
+            prompt: 提示词
+            images: 图片列表，每个图片是一个包含 data 和 mime_type 的字典
+            timeout: 超时时间 (秒)，默认使用 AI_REQUEST_TIMEOUT
+
+        Returns:
+            str: 处理后的文本
+
+        Raises:
+            AIProviderError: 调用失败、超时或提供商已熔断
+            ValueError: 模型不在配置中
+        """
+        model = model or DEFAULT_AI_MODEL
+        provider = provider_registry.get_provider(model)
+        provider_name = provider_registry.get_provider_name(model)
+        state = self._get_state(provider_name)
+        timeout = timeout or self.timeout
+
+        if not self._allow(state):
+            state.rejected += 1
+            raise AICircuitOpenError(f"AI提供商 {provider_name} 已熔断，跳过AI处理")
+
+        state.calls += 1
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(
+                self._call(state, provider, model, message, prompt, images), timeout
+            )
+        except asyncio.TimeoutError:
+            state.timeouts += 1
+            self._record_failure(provider_name, state)
+            raise AITimeoutError(f"AI提供商 {provider_name} 调用超时 ({timeout} 秒)")
+        except asyncio.CancelledError:
+            # 调用方被取消，不计入失败，但要让出试探机会
+            state.probing = False
+            raise
+        except Exception as e:
+            self._record_failure(provider_name, state)
+            raise AIProviderError(f"AI提供商 {provider_name} 调用失败: {str(e)}") from e
+        finally:
+            state.latencies.append(time.monotonic() - start)
+
+        if isinstance(result, str) and result.startswith(FAILED_RESULT_PREFIXES):
+            self._record_failure(provider_name, state)
+            raise AIProviderError(result)
+        self._record_success(provider_name, state)
+        logger.info(f"AI提供商 {provider_name} 调用完成，耗时 {state.latencies[-1]:.2f} 秒")
+        return result
+
+    @staticmethod
+    async def _call(state: _ProviderState, provider, model, message, prompt, images) -> str:
+        async with state.semaphore:
+            state.in_flight += 1
+            try:
+                return await provider.process_message(message=message, prompt=prompt, model=model, images=images)
+            finally:
+                state.in_flight -= 1
+
+    def stats(self) -> Dict[str, dict]:
+        """各提供商的调用统计"""
+        result = {}
+        for provider_name, state in self._states.items():
+            latencies = sorted(state.latencies)
+            result[provider_name] = {
+                'calls': state.calls,
+                'errors': state.errors,
+                'timeouts': state.timeouts,
+                'rejected': state.rejected,
+                'in_flight': state.in_flight,
+                'circuit_open': state.opened_at is not None,
+                'avg_latency': sum(latencies) / len(latencies) if latencies else 0.0,
+                'p95_latency': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+            }
+        return result
+
+
+# 创建全局实例
+ai_executor = AIExecutor()
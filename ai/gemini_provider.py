@@ -1,4 +1,5 @@
 from typing import Optional, List, Dict
+import asyncio
 import google.generativeai as genai
 # 移除对不存在的模块的导入
 # from google.genai import types
@@ -7,6 +8,7 @@ from .openai_base_provider import OpenAIBaseProvider
 import os
 import logging
 import base64
+from utils.constants import AI_REQUEST_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
@@ -124,32 +126,39 @@ class GeminiProvider(BaseAIProvider):
                             logger.error(f"处理单张图片时出错: {str(img_error)}")
                     
                     # 使用流式输出 - 不设置额外参数，使用默认值
-                    response_stream = self.model.generate_content(
-                        contents,
-                        stream=True
-                    )
+                    return await asyncio.to_thread(self._generate_text, contents)
                 except Exception as e:
                     logger.error(f"Gemini处理带图片消息时出错: {str(e)}")
                     # 如果处理图片失败，尝试只用文本
-                    response_stream = self.model.generate_content(
-                        [{"role": "user", "parts": [{"text": user_message}]}],
-                        stream=True
+                    return await asyncio.to_thread(
+                        self._generate_text, [{"role": "user", "parts": [{"text": user_message}]}]
                     )
             else:
                 # 无图片，使用流式输出
-                response_stream = self.model.generate_content(
-                    [{"role": "user", "parts": [{"text": user_message}]}],
-                    stream=True
+                return await asyncio.to_thread(
+                    self._generate_text, [{"role": "user", "parts": [{"text": user_message}]}]
                 )
             
-            # 收集完整响应
-            full_response = ""
-            for chunk in response_stream:
-                if hasattr(chunk, 'text'):
-                    full_response += chunk.text
-            
-            return full_response
-            
         except Exception as e:
             logger.error(f"Gemini处理消息时出错: {str(e)}")
-            return f"AI处理失败: {str(e)}" 
\ No newline at end of file
+            return f"AI处理失败: {str(e)}" 
+
+    def _generate_text(self, contents) -> str:
+        """
+        使用流式输出获取完整回复 (同步调用)
+
+        SDK 是同步的，由 process_message 放到线程中执行，不阻塞事件循环
+        """
+        response_stream = self.model.generate_content(
+            contents,
+            stream=True,
+            request_options={"timeout": AI_REQUEST_TIMEOUT}
+        )
+
+        # 收集完整响应
+        full_response = ""
+        for chunk in response_stream:
+            if hasattr(chunk, 'text'):
+                full_response += chunk.text
+
+        return full_response
@@ -1,6 +1,7 @@
 from typing import Optional, List, Dict
 from openai import AsyncOpenAI
 from .base import BaseAIProvider
+from .provider_registry import provider_registry
 import os
 import logging
 
@@ -33,9 +34,10 @@ class OpenAIBaseProvider(BaseAIProvider):
 
             api_base = os.getenv(f'{self.env_prefix}_API_BASE', '').strip() or self.default_api_base
 
-            self.client = AsyncOpenAI(
-                api_key=api_key,
-                base_url=api_base
+            # 同一API地址和密钥共用一个客户端，复用HTTP连接池
+            self.client = provider_registry.get_client(
+                ('openai', api_key, api_base),
+                lambda: AsyncOpenAI(api_key=api_key, base_url=api_base)
             )
 
             self.model = kwargs.get('model', self.default_model)
@@ -0,0 +1,102 @@
+import logging
+import os
+from typing import Callable, Dict, Hashable, Optional, Tuple, Type
+
+from utils.settings import load_ai_models, AI_MODELS_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderRegistry:
+    """
+    AI提供者注册表
+
+    - 缓存解析后的 ai_models.json，文件修改时间变化时才重新读取
+    - 按 (提供商, 模型) 缓存提供者实例，不再为每条消息创建新实例
+    - 按 (类型, API密钥, API地址) 缓存底层客户端，同一提供商的不同模型共用一个连接池
+    """
+
+    def __init__(self):
+        self._provider_classes: Dict[str, Type] = {}
+        self._config: Optional[Dict] = None
+        self._config_mtime: Optional[int] = None
+        # 模型名称 -> 提供商名称
+        self._model_index: Dict[str, str] = {}
+        self._providers: Dict[Tuple[str, str], object] = {}
+        self._clients: Dict[Hashable, object] = {}
+
+    def register(self, provider_name: str, provider_class: Type) -> None:
+        """注册提供商名称对应的提供者类"""
+        self._provider_classes[provider_name] = provider_class
+
+    @staticmethod
+    def _get_config_mtime() -> Optional[int]:
+        try:
+            return os.stat(AI_MODELS_PATH).st_mtime_ns
+        except OSError:
+            return None
+
+    def get_models_config(self) -> Dict:
+        """获取AI模型配置（dict格式），配置文件未修改时直接返回缓存"""
+        mtime = self._get_config_mtime()
+        if self._config is None or mtime != self._config_mtime:
+            if self._config is not None:
+                logger.info("AI模型配置文件已修改，重新加载")
+            config = load_ai_models(type="dict")
+            model_index = {}
+            for provider_name, models_list in config.items():
+                for model in models_list:
+                    # 与原来的遍历顺序一致，先出现的提供商优先
+                    model_index.setdefault(model, provider_name)
+            self._config = config
+            self._model_index = model_index
+            # 配置文件可能刚被创建，重新获取修改时间
+            self._config_mtime = self._get_config_mtime()
+            # 模型归属可能已变化，提供者实例重新创建（底层客户端仍然复用）
+            self._providers.clear()
+        return self._config
+
+    def get_provider(self, model: str):
+        """
+        获取模型对应的提供者实例
+
+        Raises:
+            ValueError: 模型不在配置中或提供商未注册
+        """
+        self.get_models_config()
+        provider_name = self._model_index.get(model)
+        provider_class = self._provider_classes.get(provider_name)
+        if provider_class is None:
+            raise ValueError(f"不支持的模型: {model}")
+
+        key = (provider_name, model)
+        provider = self._providers.get(key)
+        if provider is None:
+            provider = provider_class()
+            self._providers[key] = provider
+            logger.info(f"创建AI提供者实例: {provider_name}/{model}")
+        return provider
+
+    def get_provider_name(self, model: str) -> Optional[str]:
+        """获取模型所属的提供商名称"""
+        self.get_models_config()
+        return self._model_index.get(model)
+
+    def get_client(self, key: Hashable, factory: Callable[[], object]):
+        """
+        获取共享的API客户端，不存在时调用 factory 创建
+
+        Args:
+            key: 客户端标识，如 ('openai', api_key, api_base)
+            factory: 创建客户端的无参函数
+        """
+        client = self._clients.get(key)
+        if client is None:
+            client = factory()
+            self._clients[key] = client
+            logger.info(f"创建 {key[0]} 客户端: {key[-1] or '默认API地址'}")
+        return client
+
+
+# 创建全局实例
+provider_registry = ProviderRegistry()
@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.constants import BASE_DIR, AI_CACHE_TTL, AI_CACHE_MAX_ITEMS, AI_CACHE_MEMORY_ITEMS
+
+logger = logging.getLogger(__name__)
+
+# 缓存数据库文件，与 forward.db 放在同一目录
+AI_CACHE_DB_PATH = os.path.join(BASE_DIR, 'db', 'ai_cache.db')
+
+# 提供者调用失败时返回的文本前缀，这类结果不缓存
+FAILED_RESULT_PREFIXES = ('AI处理失败:', '模型未能生成有效回答')
+
+# 每写入多少条结果清理一次数据库中过期和超出数量的记录
+PRUNE_INTERVAL = 100
+
+# 缓存数据库的读写都在这个线程中依次执行，不阻塞事件循环
+_disk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ai-cache')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_results (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ai_results_used_at ON ai_results (used_at);
+"""
+
+
+def make_cache_key(model: str, prompt: Optional[str], message: str,
+                   images: Optional[List[Dict[str, str]]] = None) -> str:
+    """
+    生成AI结果的缓存键
+
+    由模型、展开后的完整提示词、消息文本的哈希和每张图片内容的哈希组成
+    """
+    digest = hashlib.sha256()
+    for part in (model or '', prompt or '', hashlib.sha256(message.encode('utf-8')).hexdigest()):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    for image in images or []:
+        digest.update(hashlib.sha256(image.get('data', '').encode('ascii')).digest())
+    return digest.hexdigest()
+
+
+def is_cacheable(result) -> bool:
+    """提供者调用失败时返回的是错误提示文本，不能缓存"""
+    return isinstance(result, str) and bool(result) and not result.startswith(FAILED_RESULT_PREFIXES)
+
+
+class AIResultCache:
+    """
+    AI处理结果缓存
+
+    - 内存中按 LRU 保留最近使用的 memory_items 条结果，未命中时再查询磁盘
+    - 结果同时写入 SQLite 文件 (在单独的线程中读写)，重启后仍然有效；超过 ttl 秒的结果过期，
+      数据库中最多保留 max_items 条，超出时删除最久未使用的记录
+    - 相同键的请求正在进行时，后来的请求等待同一个结果，只调用一次API
+    ttl 为 0 时不缓存，但仍然合并同时进行的相同请求
+    """
+
+    def __init__(self, ttl: int = AI_CACHE_TTL, max_items: int = AI_CACHE_MAX_ITEMS,
+                 memory_items: int = AI_CACHE_MEMORY_ITEMS, db_path: str = AI_CACHE_DB_PATH):
+        self.ttl = ttl
+        self.max_items = max(1, max_items)
+        self.memory_items = max(1, memory_items)
+        self.db_path = db_path
+        # key -> (过期时间, 结果)
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        logger.info(f"AIResultCache 初始化，有效期: {self.ttl} 秒，最多缓存: {self.max_items} 条")
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._connection is not None:
+            return self._connection
+        with self._lock:
+            if self._connection is None:
+                try:
+                    os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+                    connection = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False,
+                                                 isolation_level=None)
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.execute("PRAGMA synchronous=NORMAL")
+                    connection.executescript(_SCHEMA)
+                    self._connection = connection
+                except sqlite3.Error as e:
+                    logger.error(f"打开AI结果缓存数据库失败，仅使用内存缓存: {str(e)}")
+                    return None
+        return self._connection
+
+    async def _run_disk(self, func, *args):
+        """在缓存数据库线程中执行同步的 SQLite 操作，数据库被锁定时不阻塞事件循环"""
+        return await asyncio.get_running_loop().run_in_executor(_disk_executor, func, *args)
+
+    async def get(self, key: str) -> Optional[str]:
+        """获取未过期的缓存结果"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        cached = self._memory.get(key)
+        if cached is not None:
+            if cached[0] > now:
+                self._memory.move_to_end(key)
+                return cached[1]
+            del self._memory[key]
+
+        row = await self._run_disk(self._disk_get, key, now)
+        if row is None:
+            return None
+        self._remember(key, row[1], row[0])
+        return row[0]
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        connection = self._connect()
+        if connection is None:
+            return None
+        try:
+            row = connection.execute(
+                "SELECT result, expires_at FROM ai_results WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE ai_results SET used_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"读取AI结果缓存失败: {str(e)}")
+            return None
+        return row[0], row[1]
+
+    async def set(self, key: str, result: str) -> None:
+        """保存结果，失败的结果不会保存"""
+        if not self.enabled or not is_cacheable(result):
+            return
+        now = time.time()
+        expires_at = now + self.ttl
+        self._remember(key, expires_at, result)
+        await self._run_disk(self._disk_set, key, result, expires_at, now)
+
+    def _disk_set(self, key: str, result: str, expires_at: float, now: float) -> None:
+        connection = self._connect()
+        if connection is None:
+            return
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO ai_results (key, result, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, result, expires_at, now)
+            )
+            self._writes += 1
+            if self._writes % PRUNE_INTERVAL == 0:
+                self._prune(connection, now)
+        except sqlite3.Error as e:
+            logger.warning(f"写入AI结果缓存失败: {str(e)}")
+
+    def _remember(self, key: str, expires_at: float, result: str) -> None:
+        self._memory[key] = (expires_at, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _prune(self, connection: sqlite3.Connection, now: float) -> None:
+        """删除过期记录，并只保留最近使用的 max_items 条"""
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            expired = connection.execute("DELETE FROM ai_results WHERE expires_at <= ?", (now,)).rowcount
+            trimmed = connection.execute(
+                "DELETE FROM ai_results WHERE key IN ("
+                "SELECT key FROM ai_results ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_items,)
+            ).rowcount
+        if expired or trimmed:
+            logger.info(f"AI结果缓存清理: 过期 {expired} 条，超出数量 {trimmed} 条")
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """
+        获取缓存结果，未命中时调用 compute 并缓存结果
+
+        相同键的请求正在进行时直接等待其结果
+        """
+        cached = await self.get(key)
+        if cached is not None:
+            self.hits += 1
+            logger.info(f"AI结果缓存命中 (命中 {self.hits} 次，未命中 {self.misses} 次)")
+            return cached
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.hits += 1
+            logger.info("相同的AI请求正在进行，等待其结果")
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = asyncio.ensure_future(compute())
+        self._inflight[key] = future
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            if future.done() and self._inflight.get(key) is future:
+                del self._inflight[key]
+            elif not future.done():
+                # 调用方被取消，请求完成后再移除
+                future.add_done_callback(
+                    lambda done: self._inflight.pop(key) if self._inflight.get(key) is done else None
+                )
+        await self.set(key, result)
+        return result
+
+    async def clear(self) -> None:
+        """清空所有缓存"""
+        self._memory.clear()
+        await self._run_disk(self._disk_clear)
+
+    def _disk_clear(self) -> None:
+        connection = self._connect()
+        if connection is not None:
+            try:
+                connection.execute("DELETE FROM ai_results")
+            except sqlite3.Error as e:
+                logger.warning(f"清空AI结果缓存失败: {str(e)}")
+
+
+# 创建全局实例
+ai_result_cache = AIResultCache()
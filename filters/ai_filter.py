@@ -3,8 +3,13 @@ from filters.base_filter import BaseFilter
 from filters.keyword_filter import KeywordFilter
 from utils.common import check_keywords
 from utils.common import get_main_module
-from ai import get_ai_provider
+from ai import ai_executor, AIProviderError
+from ai.result_cache import ai_result_cache, make_cache_key
 from utils.constants import DEFAULT_AI_MODEL,DEFAULT_SUMMARY_PROMPT,DEFAULT_AI_PROMPT
+from utils.media_cache import media_cache
+from managers.chat_history import chat_history
+from managers.entity_cache import entity_cache
+from telethon import utils as telethon_utils
 from datetime import datetime, timedelta
 import asyncio
 import re
@@ -20,6 +25,9 @@ class AIFilter(BaseFilter):
     AI处理过滤器，使用AI处理消息文本
     """
     
+    def is_applicable(self, rule):
+        return bool(rule.is_ai)
+
     async def _process(self, context):
         """
         使用AI处理消息文本
@@ -88,17 +96,13 @@ class AIFilter(BaseFilter):
                                 # 创建内存缓冲区
                                 buffer = io.BytesIO()
                                 # 直接下载到内存缓冲区
-                                await msg.download_media(file=buffer)
+                                await media_cache.download(msg, buffer)
                                 # 获取图片内容
                                 buffer.seek(0)
                                 content = buffer.read()
                                 
                                 # 获取MIME类型
-                                mime_type = "image/jpeg"  # 默认类型
-                                if msg.photo:
-                                    mime_type = "image/jpeg"
-                                elif msg.document and hasattr(msg.document, 'mime_type'):
-                                    mime_type = msg.document.mime_type
+                                mime_type = context.get_media_info(msg).mime_type or "image/jpeg"
                                 
                                 # 保存到内存图片列表
                                 image_files.append({
@@ -119,17 +123,13 @@ class AIFilter(BaseFilter):
                         # 创建内存缓冲区
                         buffer = io.BytesIO()
                         # 直接下载到内存
-                        await event.message.download_media(file=buffer)
+                        await media_cache.download(event.message, buffer)
                         # 获取图片内容
                         buffer.seek(0)
                         content = buffer.read()
                         
                         # 获取MIME类型
-                        mime_type = "image/jpeg"  # 默认类型
-                        if hasattr(event.message.media, 'photo'):
-                            mime_type = "image/jpeg"
-                        elif hasattr(event.message.media, 'document') and hasattr(event.message.media.document, 'mime_type'):
-                            mime_type = event.message.media.document.mime_type
+                        mime_type = context.media_info.mime_type or "image/jpeg"
                         
                         # 保存到内存图片列表
                         image_files.append({
@@ -186,22 +186,20 @@ async def _ai_handle(message: str, rule, image_files=None) -> str:
             logger.info("AI处理未开启，返回原始消息")
             return message
         # 先读取数据库，如果ai模型为空，则使用.env中的默认模型
+        # 规则是多个事件共享的快照，默认值只保存在局部变量中
+        ai_model = rule.ai_model or DEFAULT_AI_MODEL
         if not rule.ai_model:
-            rule.ai_model = DEFAULT_AI_MODEL
-            logger.info(f"使用默认AI模型: {rule.ai_model}")
+            logger.info(f"使用默认AI模型: {ai_model}")
         else:
-            logger.info(f"使用规则配置的AI模型: {rule.ai_model}")
+            logger.info(f"使用规则配置的AI模型: {ai_model}")
             
-        provider = await get_ai_provider(rule.ai_model)
-        
+        prompt = rule.ai_prompt or DEFAULT_AI_PROMPT
         if not rule.ai_prompt:
-            rule.ai_prompt = DEFAULT_AI_PROMPT
             logger.info("使用默认AI提示词")
         else:
             logger.info("使用规则配置的AI提示词")
         
         # 处理特殊提示词格式
-        prompt = rule.ai_prompt
         if prompt:
             # 处理聊天记录提示词
             
@@ -217,31 +215,31 @@ async def _ai_handle(message: str, rule, image_files=None) -> str:
                 main = await get_main_module()
                 client = main.user_client
                 
-                # 获取源聊天和目标聊天ID
-                source_chat_id = int(rule.source_chat.telegram_chat_id)
-                target_chat_id = int(rule.target_chat.telegram_chat_id)
+                # 获取源聊天和目标聊天ID（与消息事件中的 chat_id 形式一致）
+                source_chat_id = await _resolve_peer_id(client, rule.source_chat)
+                target_chat_id = await _resolve_peer_id(client, rule.target_chat)
                 
                 # 处理源聊天的消息获取
                 if source_context_match:
                     count = int(source_context_match.group(1))
-                    chat_history = await _get_chat_messages(client, source_chat_id, count=count)
-                    prompt = prompt.replace(source_context_match.group(0), chat_history)
+                    history_text = await _get_chat_messages(client, source_chat_id, count=count)
+                    prompt = prompt.replace(source_context_match.group(0), history_text)
                     
                 if source_time_match:
                     minutes = int(source_time_match.group(1))
-                    chat_history = await _get_chat_messages(client, source_chat_id, minutes=minutes)
-                    prompt = prompt.replace(source_time_match.group(0), chat_history)
+                    history_text = await _get_chat_messages(client, source_chat_id, minutes=minutes)
+                    prompt = prompt.replace(source_time_match.group(0), history_text)
                 
                 # 处理目标聊天的消息获取
                 if target_context_match:
                     count = int(target_context_match.group(1))
-                    chat_history = await _get_chat_messages(client, target_chat_id, count=count)
-                    prompt = prompt.replace(target_context_match.group(0), chat_history)
+                    history_text = await _get_chat_messages(client, target_chat_id, count=count)
+                    prompt = prompt.replace(target_context_match.group(0), history_text)
                     
                 if target_time_match:
                     minutes = int(target_time_match.group(1))
-                    chat_history = await _get_chat_messages(client, target_chat_id, minutes=minutes)
-                    prompt = prompt.replace(target_time_match.group(0), chat_history)
+                    history_text = await _get_chat_messages(client, target_chat_id, minutes=minutes)
+                    prompt = prompt.replace(target_time_match.group(0), history_text)
             
             # 替换消息占位符
             if '{Message}' in prompt:
@@ -286,23 +284,39 @@ async def _ai_handle(message: str, rule, image_files=None) -> str:
         
         logger.info(f"共有 {len(img_data)} 张图片将上传到AI")
         
-        processed_text = await provider.process_message(
-            message=message,
-            prompt=prompt,
-            model=rule.ai_model,
-            images=img_data if img_data else None
+        # 相同模型、提示词和内容的消息（多条规则或不同频道转发的同一内容）共用一次AI调用
+        images = img_data if img_data else None
+        cache_key = make_cache_key(ai_model, prompt, message, images)
+        processed_text = await ai_result_cache.get_or_compute(
+            cache_key,
+            lambda: ai_executor.process(ai_model, message, prompt=prompt, images=images)
         )
         logger.info(f"AI处理完成: {processed_text}")
         return processed_text
         
+    except AIProviderError as e:
+        logger.warning(f"{str(e)}，使用未经AI处理的原始消息")
+        return message
     except Exception as e:
         logger.error(f"AI处理消息时出错: {str(e)}")
         return message
 
 
+async def _resolve_peer_id(client, chat) -> int:
+    """获取聊天的完整ID，解析失败时使用数据库中保存的ID"""
+    try:
+        _, entity = await entity_cache.resolve(client, chat.telegram_chat_id, chat=chat)
+        return telethon_utils.get_peer_id(entity)
+    except Exception as e:
+        logger.warning(f"解析聊天 {chat.telegram_chat_id} 失败: {str(e)}")
+        return int(chat.telegram_chat_id)
+
+
 async def _get_chat_messages(client, chat_id, minutes=None, count=None, delay_seconds: float = 0.5) -> str:
     """获取聊天记录
     
+    优先从聊天记录缓冲区读取，只有请求的条数超过缓冲区大小时才逐页拉取
+
     Args:
         client: Telegram客户端
         chat_id: 聊天ID
@@ -313,6 +327,13 @@ async def _get_chat_messages(client, chat_id, minutes=None, count=None, delay_se
     Returns:
         str: 聊天记录文本
     """
+    try:
+        texts = await chat_history.get_texts(client, chat_id, count=count, minutes=minutes)
+        if texts is not None:
+            return "\n---\n".join(texts)
+    except Exception as e:
+        logger.warning(f"从聊天记录缓冲区读取失败，改为直接拉取: {str(e)}")
+
     try:
         messages = []
         limit = count if count else 500  # 设置一个合理的默认值
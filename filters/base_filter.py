@@ -16,6 +16,21 @@ class BaseFilter(ABC):
             name: 过滤器名称，如果为None则使用类名
         """
         self.name = name or self.__class__.__name__
+
+    def is_applicable(self, rule):
+        """
+        判断过滤器对规则是否可能生效，用于生成规则的过滤器执行计划
+
+        只能依据规则自身的字段判断，返回 False 的过滤器不会进入该规则的执行计划。
+        默认对所有规则生效。
+
+        Args:
+            rule: 转发规则
+
+        Returns:
+            bool: 过滤器是否需要执行
+        """
+        return True
         
     async def process(self, context):
         """
@@ -7,6 +7,7 @@ from telethon import Button
 from filters.base_filter import BaseFilter
 from telethon.tl.functions.channels import GetFullChannelRequest
 from utils.common import get_main_module
+from managers.entity_cache import entity_cache
 from difflib import SequenceMatcher
 import traceback
 logger = logging.getLogger(__name__)
@@ -16,6 +17,9 @@ class CommentButtonFilter(BaseFilter):
     评论区按钮过滤器，用于在消息中添加指向关联群组消息的按钮
     """
     
+    def is_applicable(self, rule):
+        return bool(rule.enable_comment_button) and not rule.only_rss
+
     async def _process(self, context):
         """
         为消息添加评论区按钮
@@ -48,7 +52,7 @@ class CommentButtonFilter(BaseFilter):
                 event = context.event
                 
                 # 获取原始频道实体
-                channel_entity = await client.get_entity(event.chat_id)
+                channel_entity = await entity_cache.get_entity(client, event.chat_id)
                 
                 # 获取频道的真实用户名
                 channel_username = None
@@ -91,38 +95,17 @@ class CommentButtonFilter(BaseFilter):
                     linked_group_id = full_channel.full_chat.linked_chat_id
                     
                     # 获取关联群组实体
-                    linked_group = await client.get_entity(linked_group_id)
+                    linked_group = await entity_cache.get_entity(client, linked_group_id)
                     
                     # 检查消息是否属于媒体组
                     channel_msg_id = event.message.id
                     
                     if hasattr(event.message, 'grouped_id') and event.message.grouped_id:
                         logger.info(f"检测到媒体组消息，组ID: {event.message.grouped_id}")
-                        # 获取同一媒体组的所有消息
-                        media_group_messages = []
-                        
-                        try:
-                            # 获取频道历史消息
-                            async for message in client.iter_messages(
-                                channel_entity,
-                                limit=20,  # 限制查询消息数量
-                                offset_date=event.message.date,  # 从当前消息时间开始查询
-                                reverse=False  # 从新到旧
-                            ):
-                                # 检查是否属于同一媒体组
-                                if (hasattr(message, 'grouped_id') and 
-                                    message.grouped_id == event.message.grouped_id):
-                                    media_group_messages.append(message)
-                            
-                            if media_group_messages:
-                                # 找出ID最小的消息
-                                min_id_message = min(media_group_messages, key=lambda x: x.id)
-                                channel_msg_id = min_id_message.id
-                                logger.info(f"使用媒体组中ID最小的消息: {channel_msg_id}")
-                        except Exception as e:
-                            logger.error(f"获取媒体组消息失败: {e}")
-                            # 失败时使用原始消息ID
-                            logger.info(f"使用原始消息ID: {channel_msg_id}")
+                        # 评论区链接指向媒体组中ID最小的消息
+                        if context.album_messages:
+                            channel_msg_id = min(message.id for message in context.album_messages)
+                            logger.info(f"使用媒体组中ID最小的消息: {channel_msg_id}")
                     
                     # 添加短暂延迟，等待消息同步完成
                     logger.info("等待2秒，确保消息同步完成...")
@@ -1,5 +1,29 @@
 import copy
 
+from utils.media import MediaInfo
+
+class RuleEvent:
+    """
+    规则私有的事件视图
+
+    message 属于当前规则，可以单独替换；事件本身的属性和方法（chat_id、get_chat 等）来自原事件，
+    其他属性与 Telethon 事件一样转到当前的 message 上。
+    """
+
+    __slots__ = ('_event', 'message')
+
+    def __init__(self, event):
+        self._event = event
+        self.message = event.message
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name in RuleEvent.__slots__:
+            raise AttributeError(name)
+        if hasattr(type(self._event), name) or name in vars(self._event):
+            return getattr(self._event, name)
+        return getattr(self.message, name)
+
+
 class MessageContext:
     """
     消息上下文类，包含处理消息所需的所有信息
@@ -17,7 +41,9 @@ class MessageContext:
             metadata: 可选的元数据字典
         """
         self.client = client
-        self.event = event
+        # 同一事件的多条规则并发处理，每条规则使用自己的事件视图，
+        # 延迟过滤器替换消息时不影响其他规则
+        self.event = RuleEvent(event)
         self.chat_id = chat_id
         self.rule = rule
 
@@ -33,6 +59,10 @@ class MessageContext:
         # 记录处理过程中的媒体文件
         self.media_files = []
 
+        # 是否直接引用原消息的媒体发送（无需下载再上传），以及发送客户端可以引用的媒体
+        self.reference_send = False
+        self.reference_media = None
+
         # 记录发送者信息
         self.sender_info = ''
 
@@ -53,6 +83,21 @@ class MessageContext:
         self.media_group_id = event.message.grouped_id
         self.media_group_messages = []
 
+        # 媒体组的完整消息列表（按ID排序），由媒体组聚合器提供
+        if metadata and metadata.get('album_messages'):
+            self.album_messages = metadata['album_messages']
+        elif self.is_media_group:
+            self.album_messages = [event.message]
+        else:
+            self.album_messages = []
+
+        # 消息媒体元数据 {消息ID: MediaInfo}，同一条消息的所有规则共用
+        if metadata and metadata.get('media_infos') is not None:
+            self.media_infos = dict(metadata['media_infos'])
+        else:
+            self.media_infos = build_media_infos(self.album_messages or [event.message])
+        self.media_info = self.get_media_info(event.message)
+
         # 用于跟踪被跳过的超大媒体
         self.skipped_media = []
 
@@ -76,6 +121,25 @@ class MessageContext:
                 'original_message_id': None    # 原频道消息的 message_id
             }
         
+    def get_media_info(self, message):
+        """获取消息的媒体元数据，未解析过的消息在此解析"""
+        info = self.media_infos.get(message.id)
+        if info is None:
+            info = MediaInfo.from_message(message)
+            self.media_infos[message.id] = info
+        return info
+
+    def refresh_media_info(self):
+        """消息被重新获取后重新解析媒体元数据"""
+        self.media_infos = build_media_infos(self.album_messages)
+        self.media_info = MediaInfo.from_message(self.event.message)
+        self.media_infos[self.event.message.id] = self.media_info
+
     def clone(self):
         """创建上下文的副本"""
         return copy.deepcopy(self) 
+
+
+def build_media_infos(messages):
+    """解析一组消息的媒体元数据，返回 {消息ID: MediaInfo}"""
+    return {message.id: MediaInfo.from_message(message) for message in messages}
@@ -14,6 +14,9 @@ class DelayFilter(BaseFilter):
     重新获取消息的最新内容再进行处理。
     """
     
+    def is_applicable(self, rule):
+        return bool(rule.enable_delay) and (rule.delay_seconds or 0) > 0
+
     async def _process(self, context):
         """
         根据规则配置，决定是否等待并获取最新的消息内容
@@ -79,6 +82,17 @@ class DelayFilter(BaseFilter):
                     if hasattr(updated_message, 'media') and updated_message.media:
                         context.is_media_group = updated_message.grouped_id is not None
                         context.media_group_id = updated_message.grouped_id
+
+                    # 媒体组的其他消息一并刷新
+                    if len(context.album_messages) > 1:
+                        album_ids = [message.id for message in context.album_messages]
+                        updated_album = await client.get_messages(chat_id, ids=album_ids)
+                        context.album_messages = [
+                            updated or message
+                            for message, updated in zip(context.album_messages, updated_album)
+                        ]
+
+                    context.refresh_media_info()
                     
                     logger.info(f"[规则ID:{rule.id}] 上下文消息数据已更新完成")
                 else:
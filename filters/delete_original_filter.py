@@ -9,6 +9,9 @@ class DeleteOriginalFilter(BaseFilter):
     删除原始消息过滤器，处理转发后是否要删除原始消息
     """
     
+    def is_applicable(self, rule):
+        return bool(rule.is_delete_original)
+
     async def _process(self, context):
         """
         处理是否删除原始消息
@@ -33,16 +36,10 @@ class DeleteOriginalFilter(BaseFilter):
             
             # 媒体组消息
             if event.message.grouped_id:
-                # 使用用户客户端获取并删除媒体组消息
-                async for message in user_client.iter_messages(
-                        event.chat_id,
-                        min_id=event.message.id - 10,
-                        max_id=event.message.id + 10,
-                        reverse=True
-                ):
-                    if message.grouped_id == event.message.grouped_id:
-                        await message.delete()
-                        logger.info(f'已删除媒体组消息 ID: {message.id}')
+                # 使用用户客户端一次性删除媒体组的所有消息
+                message_ids = [message.id for message in context.album_messages]
+                await user_client.delete_messages(event.chat_id, message_ids)
+                logger.info(f'已删除媒体组消息 ID: {message_ids}')
             else:
                 # 单条消息的删除逻辑
                 message = await user_client.get_messages(event.chat_id, ids=event.message.id)
@@ -14,6 +14,9 @@ class EditFilter(BaseFilter):
     仅在频道消息中生效
     """
     
+    def is_applicable(self, rule):
+        return rule.handle_mode == HandleMode.EDIT
+
     async def _process(self, context):
         """
         处理消息编辑
@@ -35,6 +38,10 @@ class EditFilter(BaseFilter):
         if rule.handle_mode != HandleMode.EDIT:
             logger.debug(f"当前规则非编辑模式 (当前模式: {rule.handle_mode})，跳过编辑处理")
             return True
+
+        # RSS过滤器不在执行计划中时，由这里拦截已被过滤的消息
+        if not context.should_forward:
+            return False
             
         # 检查是否为频道消息
         chat = await event.get_chat()
@@ -1,6 +1,7 @@
 import logging
 from filters.base_filter import BaseFilter
 from filters.context import MessageContext
+from models.change_tracker import change_tracker
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +13,8 @@ class FilterChain:
     def __init__(self):
         """初始化过滤器链"""
         self.filters = []
+        # 规则执行计划缓存 {rule_id: (rule_version, filters)}
+        self._plans = {}
         
     def add_filter(self, filter_obj):
         """
@@ -23,7 +26,31 @@ class FilterChain:
         if not isinstance(filter_obj, BaseFilter):
             raise TypeError("过滤器必须是BaseFilter的子类")
         self.filters.append(filter_obj)
+        self._plans.clear()
         return self
+
+    def get_plan(self, rule):
+        """
+        获取规则的过滤器执行计划，跳过对该规则不可能生效的过滤器
+
+        计划按规则ID和规则版本号缓存，规则修改后下次处理时重新计算
+
+        Args:
+            rule: 转发规则
+
+        Returns:
+            list: 按顺序需要执行的过滤器
+        """
+        version = change_tracker.version('forward_rules', rule.id)
+        cached = self._plans.get(rule.id)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        plan = [filter_obj for filter_obj in self.filters if filter_obj.is_applicable(rule)]
+        self._plans[rule.id] = (version, plan)
+        skipped = [filter_obj.name for filter_obj in self.filters if filter_obj not in plan]
+        logger.info(f"规则 {rule.id} 过滤器执行计划已生成: {len(plan)}/{len(self.filters)} 个过滤器，跳过: {skipped}")
+        return plan
         
     async def process(self, client, event, chat_id, rule, metadata=None):
         """
@@ -42,10 +69,11 @@ class FilterChain:
         # 创建消息上下文
         context = MessageContext(client, event, chat_id, rule, metadata)
         
-        logger.info(f"开始过滤器链处理，共 {len(self.filters)} 个过滤器")
+        plan = self.get_plan(rule)
+        logger.info(f"开始过滤器链处理，共 {len(plan)} 个过滤器")
         
-        # 依次执行每个过滤器
-        for filter_obj in self.filters:
+        # 依次执行计划中的每个过滤器
+        for filter_obj in plan:
             try:
                 should_continue = await filter_obj.process(context)
                 if not should_continue:
@@ -31,29 +31,15 @@ class InitFilter(BaseFilter):
         try:
             #处理媒体组消息
             if event.message.grouped_id:
-                # 等待更长时间让所有媒体消息到达
-                # await asyncio.sleep(1)
-                
-                # 收集媒体组的所有消息
-                try:
-                    async for message in event.client.iter_messages(
-                        event.chat_id,
-                        limit=20,
-                        min_id=event.message.id - 10,
-                        max_id=event.message.id + 10
-                    ):
-                        if message.grouped_id == event.message.grouped_id:
-                            if message.text:    
-                                # 保存第一条消息的文本和按钮
-                                context.message_text = message.text or ''
-                                context.original_message_text = message.text or ''
-                                context.check_message_text = message.text or ''
-                                context.buttons = message.buttons if hasattr(message, 'buttons') else None
-                            logger.info(f'获取到媒体组文本并添加到context: {message.text}')
-                        
-                except Exception as e:
-                    logger.error(f'收集媒体组消息时出错: {str(e)}')
-                    context.errors.append(f"收集媒体组消息错误: {str(e)}")
+                # 媒体组的文本和按钮保存在第一条带文本的消息中
+                for message in context.album_messages:
+                    if message.text:
+                        context.message_text = message.text or ''
+                        context.original_message_text = message.text or ''
+                        context.check_message_text = message.text or ''
+                        context.buttons = message.buttons if hasattr(message, 'buttons') else None
+                        logger.info(f'获取到媒体组文本并添加到context: {message.text}')
+                        break
             # 检测评论区消息(通过 reply_to 判断)
             # 仅当已标记为评论区消息时才进行详细检测（避免不必要的 API 调用）
             if context.comment_metadata.get('is_comment') and event.message.reply_to and hasattr(event.message.reply_to, 'reply_to_msg_id'):
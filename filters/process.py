@@ -16,23 +16,8 @@ from filters.rss_filter import RSSFilter
 from filters.push_filter import PushFilter
 logger = logging.getLogger(__name__)
 
-async def process_forward_rule(client, event, chat_id, rule, metadata=None):
-    """
-    处理转发规则
-
-    Args:
-        client: 机器人客户端
-        event: 消息事件
-        chat_id: 聊天ID
-        rule: 转发规则
-        metadata: 可选的元数据字典
-
-    Returns:
-        bool: 处理是否成功
-    """
-    logger.info(f'使用过滤器链处理规则 ID: {rule.id}')
-
-    # 创建过滤器链
+def _build_filter_chain():
+    """构建过滤器链，所有规则共用，按规则的执行计划跳过不需要的过滤器"""
     filter_chain = FilterChain()
 
     # 添加初始化过滤器
@@ -77,6 +62,29 @@ async def process_forward_rule(client, event, chat_id, rule, metadata=None):
     # 添加删除原始消息过滤器（最后执行）
     filter_chain.add_filter(DeleteOriginalFilter())
 
+    return filter_chain
+
+
+# 过滤器均为无状态对象，启动时创建一次
+filter_chain = _build_filter_chain()
+
+
+async def process_forward_rule(client, event, chat_id, rule, metadata=None):
+    """
+    处理转发规则
+
+    Args:
+        client: 机器人客户端
+        event: 消息事件
+        chat_id: 聊天ID
+        rule: 转发规则
+        metadata: 可选的元数据字典
+
+    Returns:
+        bool: 处理是否成功
+    """
+    logger.info(f'使用过滤器链处理规则 ID: {rule.id}')
+
     # 执行过滤器链
     result = await filter_chain.process(client, event, chat_id, rule, metadata)
 
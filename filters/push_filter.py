@@ -2,13 +2,14 @@ import logging
 import os
 import pytz
 import asyncio
-import apprise
 from datetime import datetime
 import traceback
 
 from filters.base_filter import BaseFilter
 from models.models import get_session, PushConfig
 from enums.enums import PreviewMode
+from utils.media_cache import media_cache
+from managers.push_dispatcher import push_dispatcher, PushTarget
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,9 @@ class PushFilter(BaseFilter):
     推送过滤器，利用apprise库推送消息
     """
     
+    def is_applicable(self, rule):
+        return bool(rule.enable_push)
+
     async def _process(self, context):
         """
         推送消息
@@ -85,13 +89,8 @@ class PushFilter(BaseFilter):
             # 只清理已处理的媒体文件
             if processed_files:
                 logger.info(f'清理已处理的媒体文件，共 {len(processed_files)} 个')
-                for file_path in processed_files:
-                    try:
-                        if os.path.exists(str(file_path)):
-                            os.remove(file_path)
-                            logger.info(f'删除已处理的媒体文件: {file_path}')
-                    except Exception as e:
-                        logger.error(f'删除媒体文件失败: {str(e)}')
+                for file_path in dict.fromkeys(processed_files):
+                    media_cache.release(file_path)
     
     async def _push_media_group(self, context, push_configs):
         """推送媒体组消息"""
@@ -136,7 +135,7 @@ class PushFilter(BaseFilter):
                 need_cleanup = True
                 for message in context.media_group_messages:
                     if message.media:
-                        file_path = await message.download_media(os.path.join(os.getcwd(), 'temp'))
+                        file_path = await media_cache.acquire(message)
                         if file_path:
                             files.append(file_path)
                             logger.info(f'已下载媒体组文件: {file_path}')
@@ -150,7 +149,7 @@ class PushFilter(BaseFilter):
                 need_cleanup = True
                 for message in context.media_group_messages:
                     if message.media:
-                        file_path = await message.download_media(os.path.join(os.getcwd(), 'temp'))
+                        file_path = await media_cache.acquire(message)
                         if file_path:
                             files.append(file_path)
                             logger.info(f'已下载媒体文件: {file_path}')
@@ -182,45 +181,12 @@ class PushFilter(BaseFilter):
                 # 按配置的媒体发送方式分别处理每个推送配置
                 processed_files = []
                 
-                for config in push_configs:
-                    # 获取该配置的媒体发送模式
-                    send_mode = config.media_send_mode  # "Single" 或 "Multiple"
-                    
-                    # 检查所有文件是否存在
-                    valid_files = [f for f in files if os.path.exists(str(f))]
-                    if not valid_files:
-                        continue
-                    
-                    # 根据媒体发送模式来决定发送方式
-                    if send_mode == "Multiple":
-                        try:
-                            logger.info(f'尝试一次性发送 {len(valid_files)} 个文件到 {config.push_channel}，模式: {send_mode}')
-                            await self._send_push_notification(
-                                [config], 
-                                caption_text or f"收到一组媒体文件 (共{len(valid_files)}个)", 
-                                None,  # 不使用单附件参数
-                                valid_files  # 使用多附件参数
-                            )
-                            processed_files.extend(valid_files)
-                        except Exception as e:
-                            logger.error(f'尝试一次性发送多个文件失败，错误: {str(e)}')
-                            # 如果一次性发送失败，则尝试逐个发送
-                            for i, file_path in enumerate(valid_files):
-                                # 第一个文件使用完整文本，后续文件使用简短描述
-                                file_caption = caption_text if i == 0 else f"媒体组的第 {i+1} 个文件"
-                                await self._send_push_notification([config], file_caption, file_path)
-                                processed_files.append(file_path)
-                    # 逐个发送文件
-                    else:
-                        for i, file_path in enumerate(valid_files):
-                            # 第一个文件使用完整文本，后续文件使用简短描述
-                            if i == 0:
-                                file_caption = caption_text or f"收到一组媒体文件 (共{len(valid_files)}个)"
-                            else:
-                                file_caption = f"媒体组的第 {i+1} 个文件" if len(valid_files) > 1 else ""
-                            
-                            await self._send_push_notification([config], file_caption, file_path)
-                            processed_files.append(file_path)
+                # 各推送配置并发发送，同一配置内的文件按顺序发送
+                results = await asyncio.gather(*(
+                    self._push_group_to_config(config, files, caption_text) for config in push_configs
+                ))
+                for sent_files in results:
+                    processed_files.extend(sent_files)
                 
         except Exception as e:
             logger.error(f'推送媒体组消息时出错: {str(e)}')
@@ -230,19 +196,57 @@ class PushFilter(BaseFilter):
             # 如果是自己下载的文件，立即清理
             if need_cleanup:
                 for file_path in files:
-                    try:
-                        if os.path.exists(str(file_path)):
-                            os.remove(file_path)
-                            logger.info(f'删除临时文件: {file_path}')
-                            # 移除已删除的文件，避免重复删除
-                            if file_path in processed_files:
-                                processed_files.remove(file_path)
-                    except Exception as e:
-                        logger.error(f'删除临时文件失败: {str(e)}')
+                    media_cache.release(file_path)
+                    # 移除已释放的文件，避免重复释放
+                    while file_path in processed_files:
+                        processed_files.remove(file_path)
             
             # 返回处理过但未删除的文件
             return processed_files
     
+    async def _push_group_to_config(self, config, files, caption_text):
+        """按推送配置的媒体发送方式推送媒体组，返回已推送的文件"""
+        processed_files = []
+        # 获取该配置的媒体发送模式
+        send_mode = config.media_send_mode  # "Single" 或 "Multiple"
+        
+        # 检查所有文件是否存在
+        valid_files = [f for f in files if os.path.exists(str(f))]
+        if not valid_files:
+            return processed_files
+        
+        # 根据媒体发送模式来决定发送方式
+        if send_mode == "Multiple":
+            try:
+                logger.info(f'尝试一次性发送 {len(valid_files)} 个文件到 {config.push_channel}，模式: {send_mode}')
+                await self._send_push_notification(
+                    [config], 
+                    caption_text or f"收到一组媒体文件 (共{len(valid_files)}个)", 
+                    None,  # 不使用单附件参数
+                    valid_files  # 使用多附件参数
+                )
+                processed_files.extend(valid_files)
+            except Exception as e:
+                logger.error(f'尝试一次性发送多个文件失败，错误: {str(e)}')
+                # 如果一次性发送失败，则尝试逐个发送
+                for i, file_path in enumerate(valid_files):
+                    # 第一个文件使用完整文本，后续文件使用简短描述
+                    file_caption = caption_text if i == 0 else f"媒体组的第 {i+1} 个文件"
+                    await self._send_push_notification([config], file_caption, file_path)
+                    processed_files.append(file_path)
+        # 逐个发送文件
+        else:
+            for i, file_path in enumerate(valid_files):
+                # 第一个文件使用完整文本，后续文件使用简短描述
+                if i == 0:
+                    file_caption = caption_text or f"收到一组媒体文件 (共{len(valid_files)}个)"
+                else:
+                    file_caption = f"媒体组的第 {i+1} 个文件" if len(valid_files) > 1 else ""
+                
+                await self._send_push_notification([config], file_caption, file_path)
+                processed_files.append(file_path)
+        return processed_files
+    
     async def _push_single_media(self, context, push_configs):
         """推送单条媒体消息"""
         rule = context.rule
@@ -293,7 +297,7 @@ class PushFilter(BaseFilter):
             elif rule.enable_only_push and event.message and event.message.media:
                 logger.info(f'需要自己下载文件，开始下载单个媒体消息...')
                 need_cleanup = True
-                file_path = await event.message.download_media(os.path.join(os.getcwd(), 'temp'))
+                file_path = await media_cache.acquire(event.message)
                 if file_path:
                     files.append(file_path)
                     logger.info(f'已下载媒体文件: {file_path}')
@@ -347,15 +351,10 @@ class PushFilter(BaseFilter):
             # 如果是自己下载的文件，需要清理
             if need_cleanup:
                 for file_path in files:
-                    try:
-                        if os.path.exists(str(file_path)):
-                            os.remove(file_path)
-                            logger.info(f'删除临时文件: {file_path}')
-                            # 从已处理列表中移除
-                            if file_path in processed_files:
-                                processed_files.remove(file_path)
-                    except Exception as e:
-                        logger.error(f'删除临时文件失败: {str(e)}')
+                    media_cache.release(file_path)
+                    # 从已处理列表中移除
+                    while file_path in processed_files:
+                        processed_files.remove(file_path)
     
             # 返回处理过但未删除的文件
             return processed_files
@@ -386,54 +385,25 @@ class PushFilter(BaseFilter):
         return []
     
     async def _send_push_notification(self, push_configs, body, attachment=None, all_attachments=None):
-        """发送推送通知"""
+        """发送推送通知，所有推送配置并发发送"""
         if not body and not attachment and not all_attachments:
             logger.warning('没有内容可推送')
             return
         
+        items = []
         for config in push_configs:
-            try:
-                # 创建Apprise对象
-                apobj = apprise.Apprise()
-                
-                # 添加推送服务
-                service_url = config.push_channel
-                if apobj.add(service_url):
-                    logger.info(f'成功添加推送服务: {service_url}')
-                else:
-                    logger.error(f'添加推送服务失败: {service_url}')
-                    continue
-                
-                # 发送推送
-                if all_attachments and len(all_attachments) > 0 and config.media_send_mode == "Multiple":
-                    # 尝试一次性发送所有附件
-                    logger.info(f'发送带{len(all_attachments)}个附件的推送，模式: {config.media_send_mode}')
-                    send_result = await asyncio.to_thread(
-                        apobj.notify,
-                        body=body or f"收到{len(all_attachments)}个媒体文件",
-                        attach=all_attachments
-                    )
-                elif attachment and os.path.exists(str(attachment)):
-                    # 单附件推送
-                    logger.info(f'发送带单个附件的推送: {os.path.basename(str(attachment))}')
-                    send_result = await asyncio.to_thread(
-                        apobj.notify,
-                        body=body or " ",
-                        attach=attachment
-                    )
-                else:
-                    # 纯文本推送
-                    logger.info('发送纯文本推送')
-                    send_result = await asyncio.to_thread(
-                        apobj.notify,
-                        body=body
-                    )
-                
-                if send_result:
-                    logger.info(f'推送发送成功: {service_url}')
-                else:
-                    logger.error(f'推送发送失败: {service_url}')
-                
-            except Exception as e:
-                logger.error(f'发送推送时出错: {str(e)}')
-                logger.error(traceback.format_exc())
\ No newline at end of file
+            target = PushTarget.from_config(config)
+            if all_attachments and len(all_attachments) > 0 and config.media_send_mode == "Multiple":
+                # 一次性发送所有附件
+                logger.info(f'发送带{len(all_attachments)}个附件的推送，模式: {config.media_send_mode}')
+                items.append((target, body or f"收到{len(all_attachments)}个媒体文件", list(all_attachments)))
+            elif attachment and os.path.exists(str(attachment)):
+                # 单附件推送
+                logger.info(f'发送带单个附件的推送: {os.path.basename(str(attachment))}')
+                items.append((target, body or " ", str(attachment)))
+            else:
+                # 纯文本推送
+                logger.info('发送纯文本推送')
+                items.append((target, body, None))
+        
+        await push_dispatcher.send(items)
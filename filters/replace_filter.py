@@ -9,6 +9,9 @@ class ReplaceFilter(BaseFilter):
     替换过滤器，根据规则替换消息文本
     """
     
+    def is_applicable(self, rule):
+        return bool(rule.is_replace)
+
     async def _process(self, context):
         """
         处理消息文本替换
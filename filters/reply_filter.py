@@ -3,6 +3,7 @@ import asyncio
 from telethon import Button
 from filters.base_filter import BaseFilter
 from utils.common import get_main_module
+from managers.send_scheduler import send_scheduler
 import traceback
 logger = logging.getLogger(__name__)
 
@@ -12,6 +13,9 @@ class ReplyFilter(BaseFilter):
     由于媒体组消息无法直接添加按钮，此过滤器会使用bot回复已转发的消息，并添加评论区按钮
     """
     
+    def is_applicable(self, rule):
+        return bool(rule.enable_comment_button)
+
     async def _process(self, context):
         """
         处理媒体组消息的评论区按钮
@@ -55,7 +59,8 @@ class ReplyFilter(BaseFilter):
             logger.info(f"正在使用Bot给已转发的媒体组消息 {first_forwarded_msg.id} 发送评论区按钮回复")
             
             # 发送回复消息，附带评论区按钮
-            await client.send_message(
+            await send_scheduler.send_message(
+                client,
                 entity=target_chat_id,
                 message="💬 评论区",
                 buttons=buttons,
@@ -1,7 +1,6 @@
 import os
 import logging
 import asyncio
-import aiohttp
 import mimetypes
 import json
 from pathlib import Path
@@ -12,9 +11,21 @@ import uuid
 from utils.constants import TEMP_DIR, RSS_MEDIA_DIR, get_rule_media_dir,RSS_HOST,RSS_PORT,RSS_ENABLED
 from models.models import get_session
 from utils.common import get_db_ops
+from utils.media_cache import media_cache
+from managers.rss_ingest_client import rss_ingest_client
+from utils.media import MediaInfo
+from utils.media_pipeline import map_bounded
 
 logger = logging.getLogger(__name__)
 
+# 没有原始文件名时按媒体类型使用的默认文件名
+DEFAULT_MEDIA_NAMES = {
+    'document': "document_{id}",
+    'video': "video_{id}.mp4",
+    'audio': "audio_{id}.mp3",
+    'voice': "voice_{id}.ogg",
+}
+
 class RSSFilter(BaseFilter):
     """
     RSS过滤器，用于将符合条件的消息添加到RSS订阅源中
@@ -36,6 +47,11 @@ class RSSFilter(BaseFilter):
         # 确保媒体文件存储根目录存在
         Path(self.rss_media_path).mkdir(parents=True, exist_ok=True)
     
+    def is_applicable(self, rule):
+        # 规则级的 RSS 配置由独立的 RSS 服务维护，这里只按全局开关判断；
+        # 仅转发到RSS的规则需要由本过滤器结束过滤链，始终保留
+        return RSS_ENABLED.lower() == 'true' or bool(rule.only_rss)
+
     def _get_rule_media_path(self, rule_id):
         """获取规则特定的媒体目录"""
         return get_rule_media_dir(rule_id)
@@ -90,6 +106,7 @@ class RSSFilter(BaseFilter):
                     message_text = getattr(message, 'text', '') or getattr(message, 'caption', '') or '文件消息'
                     entry_data = {
                         "id": str(message.id),
+                        "chat_id": str(message.chat_id),
                         "title": message_text[:20] + ('...' if len(message_text) > 20 else ''),
                         "content": message_text,
                         "published": datetime.now().isoformat(),
@@ -111,7 +128,7 @@ class RSSFilter(BaseFilter):
                 if entry_data:
                     success = await self._send_to_rss_service(rule.id, entry_data)
                     if success:
-                        logger.info(f"成功将消息添加到规则 {rule.id} 的RSS订阅源")
+                        logger.info(f"已将消息提交到规则 {rule.id} 的RSS订阅源")
                     else:
                         logger.error(f"无法将消息添加到规则 {rule.id} 的RSS订阅源")
                 else:
@@ -130,7 +147,8 @@ class RSSFilter(BaseFilter):
         """准备RSS条目数据"""
         try:
             # 获取标题（使用自定义方法）
-            title = self._get_message_title(message)
+            media_info = context.get_media_info(message) if context else MediaInfo.from_message(message)
+            title = self._get_message_title(message, media_info)
             
             # 安全获取消息内容
             content = ""
@@ -187,6 +205,7 @@ class RSSFilter(BaseFilter):
             # 构建条目数据
             entry_data = {
                 "id": str(message.id),
+                "chat_id": str(message.chat_id),
                 "title": title,
                 "content": content,
                 "published": message.date.isoformat(),
@@ -203,7 +222,7 @@ class RSSFilter(BaseFilter):
             logger.error(f"准备RSS条目数据时出错: {str(e)}")
             return None
     
-    def _get_message_title(self, message):
+    def _get_message_title(self, message, media_info=None):
         """获取消息标题"""
         # 使用消息的前20个字符作为标题
         text = ""
@@ -214,30 +233,20 @@ class RSSFilter(BaseFilter):
             
         title = text.split('\n')[0][:20].strip() + "..." if text and len(text.split('\n')[0]) >= 20 else text.split('\n')[0].strip() if text else ""
         
-        # 如果标题为空，使用默认标题
+        # 如果标题为空，按媒体类型使用默认标题
         if not title:
-            # 检测各种媒体类型
-            has_photo = hasattr(message, 'photo') and message.photo
-            has_video = hasattr(message, 'video') and message.video
-            has_document = hasattr(message, 'document') and message.document
-            has_audio = hasattr(message, 'audio') and message.audio
-            has_voice = hasattr(message, 'voice') and message.voice
-            
-            if has_photo:
+            if media_info is None:
+                media_info = MediaInfo.from_message(message)
+            kind = media_info.kind
+            if kind == 'photo':
                 title = "图片消息"
-            elif has_video:
+            elif kind == 'video':
                 title = "视频消息"
-            elif has_document:
-                doc_name = ""
-                if hasattr(message.document, 'file_name') and message.document.file_name:
-                    doc_name = message.document.file_name
-                title = f"文件: {doc_name}" if doc_name else "文件消息"
-            elif has_audio:
-                audio_name = ""
-                if hasattr(message.audio, 'file_name') and message.audio.file_name:
-                    audio_name = message.audio.file_name
-                title = f"音频: {audio_name}" if audio_name else "音频消息"
-            elif has_voice:
+            elif kind == 'document':
+                title = f"文件: {media_info.file_name}" if media_info.file_name else "文件消息"
+            elif kind == 'audio':
+                title = f"音频: {media_info.file_name}" if media_info.file_name else "音频消息"
+            elif kind == 'voice':
                 title = "语音消息"
             else:
                 title = "新消息"
@@ -291,6 +300,28 @@ class RSSFilter(BaseFilter):
             logger.error(f"获取消息链接时出错: {str(e)}")
             return ""
     
+    def _describe_media(self, message, media_info):
+        """
+        获取媒体保存到RSS目录时的文件名、原始文件名和MIME类型
+
+        Returns:
+            Optional[Tuple[str, str, str]]: 没有可保存的媒体时返回 None
+        """
+        message_id = getattr(message, 'id', 'unknown')
+        kind = media_info.kind
+        if kind in DEFAULT_MEDIA_NAMES:
+            # 文档、视频、音频、语音都是文件，优先使用原始文件名
+            original_name = media_info.file_name
+            file_name = original_name or DEFAULT_MEDIA_NAMES[kind].format(id=message_id)
+            file_name = self._sanitize_filename(file_name)
+            mime_type = media_info.mime_type or mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+            return file_name, original_name or file_name, mime_type
+        # 链接预览中的图片同样保存
+        if kind == 'photo' or (kind == 'webpage' and getattr(message, 'photo', None)):
+            # 照片没有原始文件名
+            return f"photo_{message_id}.jpg", "photo.jpg", "image/jpeg"
+        return None
+
     async def _process_media(self, client, message, context=None, rule_id=None):
         """处理媒体内容"""
         media_list = []
@@ -303,210 +334,40 @@ class RSSFilter(BaseFilter):
                         logger.info(f"媒体文件 {name or ''} (大小: {size}MB) 已在skipped_media列表中，RSS过滤器跳过下载")
                         return media_list
 
-            # 处理文档类型
-            if hasattr(message, 'document') and message.document:
-                # 获取原始文件名
-                original_name = None
-                for attr in message.document.attributes:
-                    if hasattr(attr, 'file_name'):
-                        original_name = attr.file_name
-                        break
-                
-                # 生成文件名
-                message_id = getattr(message, 'id', 'unknown')
-                file_name = original_name if original_name else f"document_{message_id}"
-                file_name = self._sanitize_filename(file_name)
-                
-                # 获取规则ID，优先使用传入的rule_id
-                current_rule_id = rule_id
-                if current_rule_id is None and context and hasattr(context, 'rule') and hasattr(context.rule, 'id'):
-                    current_rule_id = context.rule.id
-                
-                # 使用规则特定的媒体目录
-                rule_media_path = self._get_rule_media_path(current_rule_id) if current_rule_id else self.rss_media_path
-                
-                # 下载文件
-                local_path = os.path.join(rule_media_path, file_name)
-                try:
-                    if not os.path.exists(local_path):
-                        await message.download_media(local_path)
-                        logger.info(f"下载媒体文件到: {local_path}")
-                    
-                    # 获取文件大小和MIME类型
-                    file_size = os.path.getsize(local_path)
-                    mime_type = message.document.mime_type or mimetypes.guess_type(file_name)[0] or "application/octet-stream"
-                    
-                    # 添加到媒体列表，使用规则特定的URL
-                    media_info = {
-                        "url": f"/media/{current_rule_id}/{file_name}" if current_rule_id else f"/media/{file_name}",
-                        "type": mime_type,
-                        "size": file_size,
-                        "filename": file_name,
-                        "original_name": original_name or file_name
-                    }
-                    media_list.append(media_info)
-                    logger.info(f"添加文档到RSS: {file_name}, 原始文件名: {original_name or '未知'}")
-                except Exception as e:
-                    logger.error(f"处理文档时出错: {str(e)}")
+            media_info = context.get_media_info(message) if context else MediaInfo.from_message(message)
+            described = self._describe_media(message, media_info)
+            if described is None:
+                return media_list
+            file_name, original_name, mime_type = described
             
-            # 处理图片类型
-            elif hasattr(message, 'photo') and message.photo:
-                message_id = getattr(message, 'id', 'unknown')
-                
-                # 获取规则ID，优先使用传入的rule_id
-                current_rule_id = rule_id
-                if current_rule_id is None and context and hasattr(context, 'rule') and hasattr(context.rule, 'id'):
-                    current_rule_id = context.rule.id
-                
-                # 使用规则特定的媒体目录
-                rule_media_path = self._get_rule_media_path(current_rule_id) if current_rule_id else self.rss_media_path
-                local_path = os.path.join(rule_media_path, f"photo_{message_id}.jpg")
-                
-                try:
-                    if not os.path.exists(local_path):
-                        await message.download_media(local_path)
-                        logger.info(f"下载图片到: {local_path}")
-                    
-                    # 获取文件大小
-                    file_size = os.path.getsize(local_path)
-                    
-                    # 添加到媒体列表，使用规则特定的URL
-                    media_info = {
-                        "url": f"/media/{current_rule_id}/{f'photo_{message_id}.jpg'}" if current_rule_id else f"/media/{f'photo_{message_id}.jpg'}",
-                        "type": "image/jpeg",
-                        "size": file_size,
-                        "filename": f"photo_{message_id}.jpg",
-                        "original_name": "photo.jpg"  # 照片没有原始文件名
-                    }
-                    media_list.append(media_info)
-                    logger.info(f"添加图片到RSS: {f'photo_{message_id}.jpg'}")
-                except Exception as e:
-                    logger.error(f"处理图片时出错: {str(e)}")
+            # 获取规则ID，优先使用传入的rule_id
+            current_rule_id = rule_id
+            if current_rule_id is None and context and hasattr(context, 'rule') and hasattr(context.rule, 'id'):
+                current_rule_id = context.rule.id
             
-            # 处理视频类型
-            elif hasattr(message, 'video') and message.video:
-                message_id = getattr(message, 'id', 'unknown')
-                
-                # 获取原始文件名
-                original_name = None
-                for attr in message.video.attributes:
-                    if hasattr(attr, 'file_name'):
-                        original_name = attr.file_name
-                        break
-                
-                file_name = original_name if original_name else f"video_{message_id}.mp4"
-                file_name = self._sanitize_filename(file_name)
-                
-                # 获取规则ID，优先使用传入的rule_id
-                current_rule_id = rule_id
-                if current_rule_id is None and context and hasattr(context, 'rule') and hasattr(context.rule, 'id'):
-                    current_rule_id = context.rule.id
-                
-                # 使用规则特定的媒体目录
-                rule_media_path = self._get_rule_media_path(current_rule_id) if current_rule_id else self.rss_media_path
-                local_path = os.path.join(rule_media_path, file_name)
-                
-                try:
-                    if not os.path.exists(local_path):
-                        await message.download_media(local_path)
-                        logger.info(f"下载视频到: {local_path}")
-                    
-                    # 获取文件大小和MIME类型
-                    file_size = os.path.getsize(local_path)
-                    mime_type = message.video.mime_type or "video/mp4"
-                    
-                    # 添加到媒体列表，使用规则特定的URL
-                    media_info = {
-                        "url": f"/media/{current_rule_id}/{file_name}" if current_rule_id else f"/media/{file_name}",
-                        "type": mime_type,
-                        "size": file_size,
-                        "filename": file_name,
-                        "original_name": original_name or file_name
-                    }
-                    media_list.append(media_info)
-                    logger.info(f"添加视频到RSS: {file_name}")
-                except Exception as e:
-                    logger.error(f"处理视频时出错: {str(e)}")
+            # 使用规则特定的媒体目录
+            rule_media_path = self._get_rule_media_path(current_rule_id) if current_rule_id else self.rss_media_path
+            local_path = os.path.join(rule_media_path, file_name)
             
-            # 处理音频类型
-            elif hasattr(message, 'audio') and message.audio:
-                message_id = getattr(message, 'id', 'unknown')
-                
-                # 获取原始文件名
-                original_name = None
-                for attr in message.audio.attributes:
-                    if hasattr(attr, 'file_name'):
-                        original_name = attr.file_name
-                        break
-                
-                file_name = original_name if original_name else f"audio_{message_id}.mp3"
-                file_name = self._sanitize_filename(file_name)
-                
-                # 获取规则ID，优先使用传入的rule_id
-                current_rule_id = rule_id
-                if current_rule_id is None and context and hasattr(context, 'rule') and hasattr(context.rule, 'id'):
-                    current_rule_id = context.rule.id
-                
-                # 使用规则特定的媒体目录
-                rule_media_path = self._get_rule_media_path(current_rule_id) if current_rule_id else self.rss_media_path
-                local_path = os.path.join(rule_media_path, file_name)
-                
-                try:
-                    if not os.path.exists(local_path):
-                        await message.download_media(local_path)
-                        logger.info(f"下载音频到: {local_path}")
-                    
-                    # 获取文件大小和MIME类型
-                    file_size = os.path.getsize(local_path)
-                    mime_type = message.audio.mime_type or "audio/mpeg"
-                    
-                    # 添加到媒体列表，使用规则特定的URL
-                    media_info = {
-                        "url": f"/media/{current_rule_id}/{file_name}" if current_rule_id else f"/media/{file_name}",
-                        "type": mime_type,
-                        "size": file_size,
-                        "filename": file_name,
-                        "original_name": original_name or file_name
-                    }
-                    media_list.append(media_info)
-                    logger.info(f"添加音频到RSS: {file_name}")
-                except Exception as e:
-                    logger.error(f"处理音频时出错: {str(e)}")
-            
-            # 处理语音消息
-            elif hasattr(message, 'voice') and message.voice:
-                message_id = getattr(message, 'id', 'unknown')
-                file_name = f"voice_{message_id}.ogg"
-                
-                # 获取规则ID，优先使用传入的rule_id
-                current_rule_id = rule_id
-                if current_rule_id is None and context and hasattr(context, 'rule') and hasattr(context.rule, 'id'):
-                    current_rule_id = context.rule.id
+            try:
+                if not os.path.exists(local_path):
+                    await media_cache.download(message, local_path)
+                    logger.info(f"下载媒体文件到: {local_path}")
                 
-                # 使用规则特定的媒体目录
-                rule_media_path = self._get_rule_media_path(current_rule_id) if current_rule_id else self.rss_media_path
-                local_path = os.path.join(rule_media_path, file_name)
+                # 获取文件大小
+                file_size = os.path.getsize(local_path)
                 
-                try:
-                    if not os.path.exists(local_path):
-                        await message.download_media(local_path)
-                        logger.info(f"下载语音到: {local_path}")
-                    
-                    # 获取文件大小
-                    file_size = os.path.getsize(local_path)
-                    
-                    # 添加到媒体列表，使用规则特定的URL
-                    media_info = {
-                        "url": f"/media/{current_rule_id}/{file_name}" if current_rule_id else f"/media/{file_name}",
-                        "type": "audio/ogg",
-                        "size": file_size,
-                        "filename": file_name,
-                        "original_name": "voice.ogg"  # 语音消息没有原始文件名
-                    }
-                    media_list.append(media_info)
-                    logger.info(f"添加语音到RSS: {file_name}")
-                except Exception as e:
-                    logger.error(f"处理语音时出错: {str(e)}")
+                # 添加到媒体列表，使用规则特定的URL
+                media_list.append({
+                    "url": f"/media/{current_rule_id}/{file_name}" if current_rule_id else f"/media/{file_name}",
+                    "type": mime_type,
+                    "size": file_size,
+                    "filename": file_name,
+                    "original_name": original_name
+                })
+                logger.info(f"添加{media_info.kind or '媒体'}到RSS: {file_name}, 原始文件名: {original_name}")
+            except Exception as e:
+                logger.error(f"处理媒体文件时出错: {str(e)}")
         
         except Exception as e:
             logger.error(f"处理媒体内容时出错: {str(e)}")
@@ -524,8 +385,6 @@ class RSSFilter(BaseFilter):
     async def _send_to_rss_service(self, rule_id, entry_data):
         """发送数据到RSS服务"""
         try:
-            url = f"{self.rss_base_url}/api/entries/{rule_id}/add"
-            
             # 记录要发送的数据（只记录非二进制数据）
             debug_data = entry_data.copy()
             if "media" in debug_data:
@@ -538,22 +397,142 @@ class RSSFilter(BaseFilter):
                     else:
                         media_files.append(str(media))
                 debug_data["media"] = f"{len(debug_data['media'])} 个媒体文件: {', '.join(media_files)}"
-            logger.info(f"发送到RSS服务: {url}, 数据: {debug_data}")
+            logger.info(f"提交RSS条目: 规则ID={rule_id}, 数据: {debug_data}")
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=entry_data) as response:
-                    response_text = await response.text()
-                    if response.status != 200:
-                        logger.error(f"发送到RSS服务失败: {response.status} - {response_text}")
-                        return False
-                    
-                    logger.info(f"成功发送到RSS服务, 规则ID: {rule_id}, 响应: {response_text}")
-                    return True
-                    
+            # 加入批量提交队列，由后台协程通过长连接提交，不等待RSS服务处理完成
+            return rss_ingest_client.submit(rule_id, entry_data)
+
         except Exception as e:
             logger.error(f"发送到RSS服务时出错: {str(e)}")
             return False
     
+    async def _download_group_item(self, context, msg, rule_id, rule_media_path):
+        """下载媒体组中的单个文件到规则的RSS媒体目录，返回媒体信息，失败或跳过时返回 None"""
+        try:
+            # 检查消息是否在skipped_media列表中
+            if hasattr(context, 'skipped_media') and context.skipped_media:
+                skip_msg = False
+                for skipped_msg, size, name in context.skipped_media:
+                    if skipped_msg.id == msg.id:
+                        logger.info(f"媒体组中的媒体文件 {name or ''} (大小: {size}MB) 已在skipped_media列表中，RSS过滤器跳过下载")
+                        skip_msg = True
+                        break
+                if skip_msg:
+                    return None
+
+            msg_info = context.get_media_info(msg)
+
+            # 处理图片类型
+            if msg_info.kind == 'photo':
+                message_id = getattr(msg, 'id', 'unknown')
+                file_name = f"photo_{message_id}.jpg"
+
+                try:
+                    # 使用规则特定的媒体目录
+                    local_path = os.path.join(rule_media_path, file_name)
+
+                    # 如果文件已存在且大小正常，跳过下载
+                    if os.path.exists(local_path) and os.path.getsize(local_path) > 0:
+                        logger.info(f"媒体文件已存在，跳过下载: {local_path}")
+                    else:
+                        try:
+                            await media_cache.download(msg, local_path)
+                            logger.info(f"直接下载图片到: {local_path}")
+                        except Exception as e:
+                            if "file reference has expired" in str(e):
+                                logger.warning(f"文件引用已过期，尝试重新获取消息")
+                                try:
+                                    # 尝试重新获取消息
+                                    refreshed_msg = await context.client.get_messages(
+                                        msg.chat_id, ids=msg.id
+                                    )
+                                    if refreshed_msg:
+                                        await media_cache.download(refreshed_msg, local_path)
+                                        logger.info(f"成功重新下载图片到: {local_path}")
+                                    else:
+                                        logger.error("无法重新获取消息")
+                                        return None
+                                except Exception as refresh_error:
+                                    logger.error(f"重新获取消息时出错: {str(refresh_error)}")
+                                    return None
+                            else:
+                                logger.error(f"下载媒体组图片时出错: {str(e)}")
+                                return None
+
+                    # 获取文件大小
+                    if os.path.exists(local_path):
+                        file_size = os.path.getsize(local_path)
+
+                        # 添加到媒体列表，使用规则特定的URL
+                        media_info = {
+                            "url": f"/media/{rule_id}/{file_name}",
+                            "type": "image/jpeg",
+                            "size": file_size,
+                            "filename": file_name,
+                            "original_name": "photo.jpg"  # 照片没有原始文件名
+                        }
+                        logger.info(f"添加媒体组图片到RSS: {file_name}")
+                        return media_info
+                except Exception as e:
+                    logger.error(f"处理媒体组图片时出错: {str(e)}")
+            elif msg_info.kind in DEFAULT_MEDIA_NAMES:
+                file_name, original_name, mime_type = self._describe_media(msg, msg_info)
+
+                try:
+                    # 使用规则特定的媒体目录
+                    local_path = os.path.join(rule_media_path, file_name)
+
+                    # 如果文件已存在且大小正常，跳过下载
+                    if os.path.exists(local_path) and os.path.getsize(local_path) > 0:
+                        logger.info(f"媒体文件已存在，跳过下载: {local_path}")
+                    else:
+                        try:
+                            await media_cache.download(msg, local_path)
+                            logger.info(f"直接下载文档到: {local_path}")
+                        except Exception as e:
+                            if "file reference has expired" in str(e):
+                                logger.warning(f"文件引用已过期，尝试重新获取消息")
+                                try:
+                                    # 尝试重新获取消息
+                                    refreshed_msg = await context.client.get_messages(
+                                        msg.chat_id, ids=msg.id
+                                    )
+                                    if refreshed_msg:
+                                        await media_cache.download(refreshed_msg, local_path)
+                                        logger.info(f"成功重新下载文档到: {local_path}")
+                                    else:
+                                        logger.error("无法重新获取消息")
+                                        return None
+                                except Exception as refresh_error:
+                                    logger.error(f"重新获取消息时出错: {str(refresh_error)}")
+                                    return None
+                            else:
+                                logger.error(f"下载媒体组文档时出错: {str(e)}")
+                                return None
+
+                    # 获取文件大小和MIME类型
+                    if os.path.exists(local_path):
+                        file_size = os.path.getsize(local_path)
+
+                        # 添加到媒体列表，使用规则特定的URL
+                        media_info = {
+                            "url": f"/media/{rule_id}/{file_name}",
+                            "type": mime_type,
+                            "size": file_size,
+                            "filename": file_name,
+                            "original_name": original_name
+                        }
+                        logger.info(f"添加媒体组文档到RSS: {file_name}, 原始文件名: {original_name}")
+                        return media_info
+                except Exception as e:
+                    logger.error(f"处理媒体组文档时出错: {str(e)}")
+
+            # 其他媒体类型处理可以类似添加
+
+        except Exception as e:
+            logger.error(f"处理媒体组消息时出错: {str(e)}")
+        return None
+    
     async def _process_media_group(self, context, rule):
         """处理媒体组消息"""
         try:
@@ -595,10 +574,9 @@ class RSSFilter(BaseFilter):
                         # 尝试从原始消息中获取文件名
                         original_name = None
                         for msg in context.media_group_messages:
-                            if hasattr(msg, 'document') and msg.document:
-                                original_name = getattr(msg.document, 'file_name', None)
-                                if original_name:
-                                    break
+                            original_name = context.get_media_info(msg).file_name
+                            if original_name:
+                                break
                         
                         # 添加到媒体列表，使用规则特定的URL
                         media_info = {
@@ -618,138 +596,12 @@ class RSSFilter(BaseFilter):
                     logger.warning("媒体组没有已下载的文件，尝试从media_group_messages获取")
                     
                     # 直接处理媒体组消息
-                    for msg in context.media_group_messages:
-                        try:
-                            # 检查消息是否在skipped_media列表中
-                            if hasattr(context, 'skipped_media') and context.skipped_media:
-                                skip_msg = False
-                                for skipped_msg, size, name in context.skipped_media:
-                                    if skipped_msg.id == msg.id:
-                                        logger.info(f"媒体组中的媒体文件 {name or ''} (大小: {size}MB) 已在skipped_media列表中，RSS过滤器跳过下载")
-                                        skip_msg = True
-                                        break
-                                if skip_msg:
-                                    continue
-
-                            # 处理图片类型
-                            if hasattr(msg, 'photo') and msg.photo:
-                                message_id = getattr(msg, 'id', 'unknown')
-                                file_name = f"photo_{message_id}.jpg"
-                                
-                                try:
-                                    # 使用规则特定的媒体目录
-                                    local_path = os.path.join(rule_media_path, file_name)
-                                    
-                                    # 如果文件已存在且大小正常，跳过下载
-                                    if os.path.exists(local_path) and os.path.getsize(local_path) > 0:
-                                        logger.info(f"媒体文件已存在，跳过下载: {local_path}")
-                                    else:
-                                        try:
-                                            await msg.download_media(local_path)
-                                            logger.info(f"直接下载图片到: {local_path}")
-                                        except Exception as e:
-                                            if "file reference has expired" in str(e):
-                                                logger.warning(f"文件引用已过期，尝试重新获取消息")
-                                                try:
-                                                    # 尝试重新获取消息
-                                                    refreshed_msg = await context.client.get_messages(
-                                                        msg.chat_id, ids=msg.id
-                                                    )
-                                                    if refreshed_msg:
-                                                        await refreshed_msg.download_media(local_path)
-                                                        logger.info(f"成功重新下载图片到: {local_path}")
-                                                    else:
-                                                        logger.error("无法重新获取消息")
-                                                        continue
-                                                except Exception as refresh_error:
-                                                    logger.error(f"重新获取消息时出错: {str(refresh_error)}")
-                                                    continue
-                                            else:
-                                                logger.error(f"下载媒体组图片时出错: {str(e)}")
-                                                continue
-                                    
-                                    # 获取文件大小
-                                    if os.path.exists(local_path):
-                                        file_size = os.path.getsize(local_path)
-                                        
-                                        # 添加到媒体列表，使用规则特定的URL
-                                        media_info = {
-                                            "url": f"/media/{rule_id}/{file_name}",
-                                            "type": "image/jpeg",
-                                            "size": file_size,
-                                            "filename": file_name,
-                                            "original_name": "photo.jpg"  # 照片没有原始文件名
-                                        }
-                                        media_list.append(media_info)
-                                        logger.info(f"添加媒体组图片到RSS: {file_name}")
-                                except Exception as e:
-                                    logger.error(f"处理媒体组图片时出错: {str(e)}")
-                            elif hasattr(msg, 'document') and msg.document:
-                                # 获取消息ID，用于生成默认文件名
-                                message_id = getattr(msg, 'id', 'unknown')
-                                original_name = None
-                                for attr in msg.document.attributes:
-                                    if hasattr(attr, 'file_name'):
-                                        original_name = attr.file_name
-                                        break
-                                
-                                file_name = original_name if original_name else f"document_{message_id}"
-                                file_name = self._sanitize_filename(file_name)
-                                
-                                try:
-                                    # 使用规则特定的媒体目录
-                                    local_path = os.path.join(rule_media_path, file_name)
-                                    
-                                    # 如果文件已存在且大小正常，跳过下载
-                                    if os.path.exists(local_path) and os.path.getsize(local_path) > 0:
-                                        logger.info(f"媒体文件已存在，跳过下载: {local_path}")
-                                    else:
-                                        try:
-                                            await msg.download_media(local_path)
-                                            logger.info(f"直接下载文档到: {local_path}")
-                                        except Exception as e:
-                                            if "file reference has expired" in str(e):
-                                                logger.warning(f"文件引用已过期，尝试重新获取消息")
-                                                try:
-                                                    # 尝试重新获取消息
-                                                    refreshed_msg = await context.client.get_messages(
-                                                        msg.chat_id, ids=msg.id
-                                                    )
-                                                    if refreshed_msg:
-                                                        await refreshed_msg.download_media(local_path)
-                                                        logger.info(f"成功重新下载文档到: {local_path}")
-                                                    else:
-                                                        logger.error("无法重新获取消息")
-                                                        continue
-                                                except Exception as refresh_error:
-                                                    logger.error(f"重新获取消息时出错: {str(refresh_error)}")
-                                                    continue
-                                            else:
-                                                logger.error(f"下载媒体组文档时出错: {str(e)}")
-                                                continue
-                                    
-                                    # 获取文件大小和MIME类型
-                                    if os.path.exists(local_path):
-                                        file_size = os.path.getsize(local_path)
-                                        mime_type = msg.document.mime_type or mimetypes.guess_type(file_name)[0] or "application/octet-stream"
-                                        
-                                        # 添加到媒体列表，使用规则特定的URL
-                                        media_info = {
-                                            "url": f"/media/{rule_id}/{file_name}",
-                                            "type": mime_type,
-                                            "size": file_size,
-                                            "filename": file_name,
-                                            "original_name": original_name or file_name
-                                        }
-                                        media_list.append(media_info)
-                                        logger.info(f"添加媒体组文档到RSS: {file_name}, 原始文件名: {original_name or '未知'}")
-                                except Exception as e:
-                                    logger.error(f"处理媒体组文档时出错: {str(e)}")
-                            
-                            # 其他媒体类型处理可以类似添加
-                        
-                        except Exception as e:
-                            logger.error(f"处理媒体组消息时出错: {str(e)}")
+                    # 并发下载，结果保持媒体组顺序
+                    results = await map_bounded(
+                        lambda msg: self._download_group_item(context, msg, rule_id, rule_media_path),
+                        context.media_group_messages
+                    )
+                    media_list.extend(item for item in results if item)
             
             # 准备条目数据
             # 获取消息文本内容
@@ -770,6 +622,7 @@ class RSSFilter(BaseFilter):
             # 构建条目数据
             entry_data = {
                 "id": str(context.event.message.id),
+                "chat_id": str(context.event.message.chat_id),
                 "title": title,
                 "content": context.message_text or "",
                 "published": context.event.message.date.isoformat(),
@@ -783,8 +636,8 @@ class RSSFilter(BaseFilter):
             
             # 如果有有效的媒体文件，添加到RSS订阅源
             if media_list:
-                await self._send_to_rss_service(rule.id, entry_data)
-                logger.info(f"成功将媒体组消息添加到规则 {rule.id} 的RSS订阅源")
+                if await self._send_to_rss_service(rule.id, entry_data):
+                    logger.info(f"已将媒体组消息提交到规则 {rule.id} 的RSS订阅源")
             else:
                 logger.warning("媒体组消息没有有效的媒体文件，跳过添加到RSS订阅源")
         
@@ -2,10 +2,24 @@ import logging
 import os
 from filters.base_filter import BaseFilter
 from enums.enums import PreviewMode
-from telethon.errors import FloodWaitError
+from telethon.errors import (
+    FloodWaitError, FileReferenceExpiredError, FileReferenceInvalidError,
+    FileReferenceEmptyError, MediaEmptyError, MediaInvalidError, ChannelPrivateError
+)
+from utils.media import get_reference_messages, media_bytes_required
+from utils.media_cache import media_cache
+from utils.media_pipeline import prepare_album, upload_cached
+from managers.send_scheduler import send_scheduler
+from managers.entity_cache import entity_cache
 
 logger = logging.getLogger(__name__)
 
+# 引用原消息媒体发送失败时可以改为下载后发送的错误
+REFERENCE_ERRORS = (
+    FileReferenceExpiredError, FileReferenceInvalidError, FileReferenceEmptyError,
+    MediaEmptyError, MediaInvalidError
+)
+
 class SenderFilter(BaseFilter):
     """
     消息发送过滤器，用于发送处理后的消息
@@ -37,33 +51,11 @@ class SenderFilter(BaseFilter):
         target_chat = rule.target_chat
         target_chat_id = int(target_chat.telegram_chat_id)
         
-        # 预先获取目标聊天实体
+        # 解析目标聊天（使用实体缓存，记录可用的ID形式）
         try:
-            entity = None
-            try:
-                # 直接使用ID
-                entity = await client.get_entity(target_chat_id)
-                logger.info(f'成功获取目标聊天实体: {target_chat.name} (ID: {target_chat_id})')
-            except Exception as e1:
-                try:
-                    # 尝试添加-100前缀
-                    if not str(target_chat_id).startswith('-100'):
-                        super_group_id = int(f'-100{abs(target_chat_id)}')
-                        entity = await client.get_entity(super_group_id)
-                        target_chat_id = super_group_id  # 更新使用正确的ID
-                        logger.info(f'使用私有群组ID格式成功获取实体: {target_chat.name} (ID: {target_chat_id})')
-                except Exception as e2:
-                    try:
-                        # 尝试常规群组格式
-                        if not str(target_chat_id).startswith('-'):
-                            group_id = int(f'-{abs(target_chat_id)}')
-                            entity = await client.get_entity(group_id)
-                            target_chat_id = group_id  # 更新使用正确的ID
-                            logger.info(f'使用常规群组ID格式成功获取实体: {target_chat.name} (ID: {target_chat_id})')
-                    except Exception as e3:
-                        logger.warning(f'无法获取目标聊天实体，尝试继续发送: {e1}, {e2}, {e3}')
+            target_chat_id, _ = await entity_cache.resolve(client, target_chat.telegram_chat_id, chat=target_chat)
         except Exception as e:
-            logger.warning(f'获取目标聊天实体时出错: {str(e)}')
+            logger.warning(f'无法获取目标聊天实体，尝试继续发送: {str(e)}')
         
         # 设置消息格式
         parse_mode = rule.message_mode.value  # 使用枚举的值（字符串）
@@ -75,7 +67,7 @@ class SenderFilter(BaseFilter):
                 logger.info(f'准备发送媒体组消息')
                 await self._send_media_group(context, target_chat_id, parse_mode)
             # 处理单条媒体消息
-            elif context.media_files or context.skipped_media:
+            elif context.media_files or context.skipped_media or context.reference_send:
                 logger.info(f'准备发送单条媒体消息')
                 await self._send_single_media(context, target_chat_id, parse_mode)
             # 处理纯文本消息
@@ -85,6 +77,11 @@ class SenderFilter(BaseFilter):
                 
             logger.info(f'消息已发送到: {target_chat.name} ({target_chat_id})')
             return True
+        except ChannelPrivateError as e:
+            entity_cache.invalidate(target_chat.telegram_chat_id, client)
+            logger.error(f'无法访问目标聊天 {target_chat.name}: {str(e)}')
+            context.errors.append(f"发送消息错误: {str(e)}")
+            return False
         except FloodWaitError as e:
             wait_time = e.seconds
             logger.error(f'发送消息频率限制，需要等待 {wait_time} 秒')
@@ -131,68 +128,87 @@ class SenderFilter(BaseFilter):
         # 如果有可以发送的媒体，作为一个组发送
         files = []
         try:
-            for message in context.media_group_messages:
-                if message.media:
-                    file_path = await message.download_media(os.path.join(os.getcwd(), 'temp'))
-                    if file_path:
-                        files.append(file_path)
-            
-            # 修改：保存下载的文件路径到context.media_files
-            if files:
-                # 初始化 media_files 如果它不存在
-                if not hasattr(context, 'media_files') or context.media_files is None:
-                    context.media_files = []
-                # 将当前下载的文件添加到列表中
-                context.media_files.extend(files)
-                logger.info(f'已将 {len(files)} 个下载的媒体文件路径保存到context.media_files')
-                
-                # 添加发送者信息和消息文本
-                caption_text = context.sender_info + context.message_text
-                
-                # 如果有超限文件，添加提示信息
-                for message, size, name in context.skipped_media:
-                    caption_text += f"\n\n⚠️ 媒体文件 {name if name else '未命名文件'} ({size}MB) 超过大小限制"
-                
-                if context.skipped_media:
-                    context.original_link = f"\n原始消息: https://t.me/c/{str(event.chat_id)[4:]}/{event.message.id}"
-                # 添加时间信息和原始链接
-                caption_text += context.time_info + context.original_link
-                
-                # 作为一个组发送所有文件
-                sent_messages = await client.send_file(
-                    target_chat_id,
-                    files,
-                    caption=caption_text,
-                    parse_mode=parse_mode,
-                    buttons=context.buttons,
-                    link_preview={
-                        PreviewMode.ON: True,
-                        PreviewMode.OFF: False,
-                        PreviewMode.FOLLOW: context.event.message.media is not None
-                    }[rule.is_preview]
-                )
-                # 保存发送的消息到上下文
-                if isinstance(sent_messages, list):
-                    context.forwarded_messages = sent_messages
-                else:
-                    context.forwarded_messages = [sent_messages]
-                
-                logger.info(f'媒体组消息已发送，保存了 {len(context.forwarded_messages)} 条已转发消息')
+            sent = False
+            # 不需要文件内容时直接引用原消息媒体发送
+            group_media = [message for message in context.media_group_messages if message.media]
+            reference = None
+            if group_media and not media_bytes_required(rule):
+                reference = await get_reference_messages(client, group_media)
+            if reference:
+                try:
+                    await self._send_media_group_files(
+                        context, target_chat_id, parse_mode, [message.media for message in reference]
+                    )
+                    sent = True
+                    logger.info('媒体组已直接引用原消息媒体发送')
+                except REFERENCE_ERRORS as e:
+                    logger.warning(f'引用原消息媒体发送失败，改为下载后发送: {str(e)}')
+
+            if not sent:
+                # 并发下载，下载完成的文件立即上传
+                files, album_media = await prepare_album(client, target_chat_id, group_media)
+
+                # 修改：保存下载的文件路径到context.media_files
+                if files:
+                    # 初始化 media_files 如果它不存在
+                    if not hasattr(context, 'media_files') or context.media_files is None:
+                        context.media_files = []
+                    # 将当前下载的文件添加到列表中
+                    context.media_files.extend(files)
+                    logger.info(f'已将 {len(files)} 个下载的媒体文件路径保存到context.media_files')
+
+                    await self._send_media_group_files(context, target_chat_id, parse_mode, album_media)
         except Exception as e:
             logger.error(f'发送媒体组消息时出错: {str(e)}')
             raise
         finally:
-            # 删除临时文件，但如果启用了推送则保留
+            # 释放临时文件，但如果启用了推送则保留
             if not rule.enable_push:
                 for file_path in files:
-                    try:
-                        os.remove(file_path)
-                        logger.info(f'删除临时文件: {file_path}')
-                    except Exception as e:
-                        logger.error(f'删除临时文件失败: {str(e)}')
+                    media_cache.release(file_path)
             else:
                 logger.info(f'推送功能已启用，保留临时文件')
     
+    async def _send_media_group_files(self, context, target_chat_id, parse_mode, files):
+        """将文件或原消息媒体作为一个组发送"""
+        rule = context.rule
+        client = context.client
+        event = context.event
+
+        # 添加发送者信息和消息文本
+        caption_text = context.sender_info + context.message_text
+        
+        # 如果有超限文件，添加提示信息
+        for message, size, name in context.skipped_media:
+            caption_text += f"\n\n⚠️ 媒体文件 {name if name else '未命名文件'} ({size}MB) 超过大小限制"
+        
+        if context.skipped_media:
+            context.original_link = f"\n原始消息: https://t.me/c/{str(event.chat_id)[4:]}/{event.message.id}"
+        # 添加时间信息和原始链接
+        caption_text += context.time_info + context.original_link
+        
+        # 作为一个组发送所有文件
+        sent_messages = await send_scheduler.send_file(
+            client,
+            target_chat_id,
+            files,
+            caption=caption_text,
+            parse_mode=parse_mode,
+            buttons=context.buttons,
+            link_preview={
+                PreviewMode.ON: True,
+                PreviewMode.OFF: False,
+                PreviewMode.FOLLOW: context.event.message.media is not None
+            }[rule.is_preview]
+        )
+        # 保存发送的消息到上下文
+        if isinstance(sent_messages, list):
+            context.forwarded_messages = sent_messages
+        else:
+            context.forwarded_messages = [sent_messages]
+        
+        logger.info(f'媒体组消息已发送，保存了 {len(context.forwarded_messages)} 条已转发消息')
+    
     async def _send_single_media(self, context, target_chat_id, parse_mode):
         """发送单条媒体消息"""
         rule = context.rule
@@ -214,7 +230,8 @@ class SenderFilter(BaseFilter):
             
             text_to_send += original_link
                 
-            await client.send_message(
+            await send_scheduler.send_message(
+                client,
                 target_chat_id,
                 text_to_send,
                 parse_mode=parse_mode,
@@ -228,6 +245,30 @@ class SenderFilter(BaseFilter):
         if not hasattr(context, 'media_files') or context.media_files is None:
             context.media_files = []
         
+        # 直接引用原消息媒体发送，失败时改为下载后发送
+        if context.reference_send and not context.media_files:
+            try:
+                await send_scheduler.send_file(
+                    client,
+                    target_chat_id,
+                    context.reference_media,
+                    caption=context.sender_info + context.message_text + context.time_info + context.original_link,
+                    parse_mode=parse_mode,
+                    buttons=context.buttons,
+                    link_preview={
+                        PreviewMode.ON: True,
+                        PreviewMode.OFF: False,
+                        PreviewMode.FOLLOW: context.event.message.media is not None
+                    }[rule.is_preview]
+                )
+                logger.info(f'媒体消息已直接引用原消息媒体发送')
+                return
+            except REFERENCE_ERRORS as e:
+                logger.warning(f'引用原消息媒体发送失败，改为下载后发送: {str(e)}')
+                file_path = await media_cache.acquire(event.message)
+                if file_path:
+                    context.media_files.append(file_path)
+        
         # 发送媒体文件
         for file_path in context.media_files:
             try:
@@ -237,10 +278,18 @@ class SenderFilter(BaseFilter):
                     context.time_info + 
                     context.original_link
                 )
+
+                # 同一事件发往其他目标的规则复用已上传的媒体
+                try:
+                    media = await upload_cached(client, target_chat_id, event.message, file_path)
+                except Exception as e:
+                    logger.warning(f'预先上传媒体文件失败，发送时重新上传: {file_path}, {str(e)}')
+                    media = file_path
                 
-                await client.send_file(
+                await send_scheduler.send_file(
+                    client,
                     target_chat_id,
-                    file_path,
+                    media,
                     caption=caption,
                     parse_mode=parse_mode,
                     buttons=context.buttons,
@@ -255,13 +304,9 @@ class SenderFilter(BaseFilter):
                 logger.error(f'发送媒体消息时出错: {str(e)}')
                 raise
             finally:
-                # 删除临时文件，但如果启用了推送则保留
+                # 释放临时文件，但如果启用了推送则保留
                 if not rule.enable_push:
-                    try:
-                        os.remove(file_path)
-                        logger.info(f'删除临时文件: {file_path}')
-                    except Exception as e:
-                        logger.error(f'删除临时文件失败: {str(e)}')
+                    media_cache.release(file_path)
                 else:
                     logger.info(f'推送功能已启用，保留临时文件: {file_path}')
     
@@ -284,7 +329,8 @@ class SenderFilter(BaseFilter):
         # 组合消息文本
         message_text = context.sender_info + context.message_text + context.time_info + context.original_link
         
-        await client.send_message(
+        await send_scheduler.send_message(
+            client,
             target_chat_id,
             str(message_text),
             parse_mode=parse_mode,
@@ -978,9 +978,8 @@ async def handle_import_command(event, command):
 
                 else:
                     # 处理关键字导入
-                    success_count = 0
-                    duplicate_count = 0
                     is_regex = (command == 'import_regex_keyword')
+                    rows = []
                     for i, line in enumerate(lines, 1):
                         try:
                             # 按空格分割，提取关键字和标志
@@ -994,31 +993,18 @@ async def handle_import_command(event, command):
                             keyword = ' '.join(parts[:-1])  # 前面的部分组合为关键字
                             if not keyword:
                                 raise ValueError("关键字为空")
-                            # 检查是否已存在相同的关键字
-                            existing = session.query(Keyword).filter_by(
-                                rule_id=rule.id,
-                                keyword=keyword,
-                                is_regex=is_regex
-                            ).first()
-
-                            if existing:
-                                duplicate_count += 1
-                                continue
-
-                            # 创建新的 Keyword 对象
-                            new_keyword = Keyword(
-                                rule_id=rule.id,
-                                keyword=keyword,
-                                is_regex=is_regex,
-                                is_blacklist=is_blacklist
-                            )
-                            session.add(new_keyword)
-                            success_count += 1
+                            rows.append((keyword, is_regex, is_blacklist))
 
                         except Exception as e:
                             logger.error(f'处理第 {i} 行时出错: {line}\n{str(e)}')
                             continue
 
+                    # 一次性去重并批量写入，相同关键字和类型视为重复
+                    db_ops = await get_db_ops()
+                    success_count, duplicate_count = await db_ops.bulk_add_keywords(
+                        session, rule.id, rows, match_fields=('is_regex',)
+                    )
+
                     session.commit()
                     keyword_type = "正则表达式" if is_regex else "关键字"
                     result_text = f'成功导入 {success_count} 个{keyword_type}'
@@ -1302,26 +1288,13 @@ async def handle_copy_keywords_command(event, command):
             await reply_and_delete(event,f'找不到规则ID: {source_rule_id}')
             return
 
-        # 复制关键字
-        success_count = 0
-        skip_count = 0
-
-        for keyword in source_rule.keywords:
-            if not keyword.is_regex:  # 只复制普通关键字
-                # 检查是否已存在
-                exists = any(k.keyword == keyword.keyword and not k.is_regex
-                             for k in target_rule.keywords)
-                if not exists:
-                    new_keyword = Keyword(
-                        rule_id=target_rule.id,
-                        keyword=keyword.keyword,
-                        is_regex=False,
-                        is_blacklist=keyword.is_blacklist
-                    )
-                    session.add(new_keyword)
-                    success_count += 1
-                else:
-                    skip_count += 1
+        # 只复制普通关键字，与目标规则已有的同类关键字重复时跳过
+        rows = [(keyword.keyword, False, keyword.is_blacklist)
+                for keyword in source_rule.keywords if not keyword.is_regex]
+        db_ops = await get_db_ops()
+        success_count, skip_count = await db_ops.bulk_add_keywords(
+            session, target_rule.id, rows, match_fields=('is_regex',)
+        )
 
         session.commit()
 
@@ -1372,26 +1345,13 @@ async def handle_copy_keywords_regex_command(event, command):
             await reply_and_delete(event,f'找不到规则ID: {source_rule_id}')
             return
 
-        # 复制正则关键字
-        success_count = 0
-        skip_count = 0
-
-        for keyword in source_rule.keywords:
-            if keyword.is_regex:  # 只复制正则关键字
-                # 检查是否已存在
-                exists = any(k.keyword == keyword.keyword and k.is_regex
-                             for k in target_rule.keywords)
-                if not exists:
-                    new_keyword = Keyword(
-                        rule_id=target_rule.id,
-                        keyword=keyword.keyword,
-                        is_regex=True,
-                        is_blacklist=keyword.is_blacklist
-                    )
-                    session.add(new_keyword)
-                    success_count += 1
-                else:
-                    skip_count += 1
+        # 只复制正则关键字，与目标规则已有的同类关键字重复时跳过
+        rows = [(keyword.keyword, True, keyword.is_blacklist)
+                for keyword in source_rule.keywords if keyword.is_regex]
+        db_ops = await get_db_ops()
+        success_count, skip_count = await db_ops.bulk_add_keywords(
+            session, target_rule.id, rows, match_fields=('is_regex',)
+        )
 
         session.commit()
 
@@ -3,6 +3,8 @@ import os
 import logging
 from utils.common import get_main_module, get_user_id
 from utils.constants import TEMP_DIR
+from utils.media_cache import media_cache
+from utils.media_pipeline import prepare_album
 
 logger = logging.getLogger(__name__)
 
@@ -77,22 +79,18 @@ async def handle_media_group(client, user_client, chat_id, message, event):
                     buttons = grouped_message.buttons if hasattr(grouped_message, 'buttons') else None
 
         if media_group_messages:
-            # 下载所有媒体文件
-            for msg in media_group_messages:
-                if msg.media:
-                    try:
-                        file_path = await msg.download_media(TEMP_DIR)
-                        if file_path:
-                            files.append(file_path)
-                            logger.info(f'已下载媒体文件: {file_path}')
-                    except Exception as e:
-                        logger.error(f'下载媒体文件失败: {str(e)}')
+            # iter_messages 按ID倒序返回，按ID排序恢复媒体组顺序
+            media_group_messages.sort(key=lambda msg: msg.id)
+            # 并发下载，下载完成的文件立即上传
+            files, album_media = await prepare_album(client, event.chat_id, media_group_messages)
+            for file_path in files:
+                logger.info(f'已下载媒体文件: {file_path}')
 
             if files:
                 # 发送媒体组
                 await client.send_file(
                     event.chat_id,
-                    files,
+                    album_media,
                     caption=caption,
                     parse_mode='Markdown',
                     buttons=buttons
@@ -105,12 +103,7 @@ async def handle_media_group(client, user_client, chat_id, message, event):
     finally:
         # 确保清理所有临时文件
         for file_path in files:
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    logger.info(f'已删除临时文件: {file_path}')
-            except Exception as e:
-                logger.error(f'删除临时文件失败 {file_path}: {str(e)}')
+            media_cache.release(file_path)
 
 async def handle_single_message(client, message, event):
     """处理单条消息"""
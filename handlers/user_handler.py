@@ -3,6 +3,7 @@ import re
 import logging
 import asyncio
 from utils.common import check_keywords, get_sender_info
+from managers.send_scheduler import send_scheduler
 
 
 logger = logging.getLogger(__name__)
@@ -10,7 +11,7 @@ logger = logging.getLogger(__name__)
 async def process_forward_rule(client, event, chat_id, rule, metadata=None):
     """处理转发规则（用户模式）
 
-    注意：用户模式的转发不使用过滤器链，metadata 参数仅用于接口一致性
+    注意：用户模式的转发不使用过滤器链，metadata 中仅使用媒体组消息列表 album_messages
     """
 
     
@@ -46,26 +47,14 @@ async def process_forward_rule(client, event, chat_id, rule, metadata=None):
             
             
             if event.message.grouped_id:
-                # 等待一段时间以确保收到所有媒体组消息
-                await asyncio.sleep(1)
-                
-                # 收集媒体组的所有消息
-                messages = []
-                async for message in client.iter_messages(
-                    event.chat_id,
-                    limit=20,  # 限制搜索范围
-                    min_id=event.message.id - 10,
-                    max_id=event.message.id + 10
-                ):
-                    if message.grouped_id == event.message.grouped_id:
-                        messages.append(message.id)
-                        logger.info(f'找到媒体组消息: ID={message.id}')
-                
-                # 按照ID排序，确保转发顺序正确
-                messages.sort()
+                # 媒体组的完整消息由聚合器提供，已按ID排序
+                album_messages = (metadata or {}).get('album_messages') or [event.message]
+                messages = [message.id for message in album_messages]
+                logger.info(f'媒体组消息: {messages}')
                 
                 # 一次性转发所有消息
-                await client.forward_messages(
+                await send_scheduler.forward_messages(
+                    client,
                     target_chat_id,
                     messages,
                     event.chat_id
@@ -74,7 +63,8 @@ async def process_forward_rule(client, event, chat_id, rule, metadata=None):
                 
             else:
                 # 处理单条消息
-                await client.forward_messages(
+                await send_scheduler.forward_messages(
+                    client,
                     target_chat_id,
                     event.message.id,
                     event.chat_id
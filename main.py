@@ -5,6 +5,7 @@ from models.models import init_db
 from dotenv import load_dotenv
 from message_listener import setup_listeners
 import os
+import shutil
 import asyncio
 import logging
 import uvicorn
@@ -15,6 +16,9 @@ from scheduler.chat_updater import ChatUpdater
 from handlers.bot_handler import send_welcome_message
 from rss.main import app as rss_app
 from utils.log_config import setup_logging
+from managers.rss_ingest_client import rss_ingest_client
+from managers.push_dispatcher import push_dispatcher
+from utils.constants import SHUTDOWN_FLUSH_TIMEOUT
 
 # 设置Docker日志的默认配置，如果docker-compose.yml中没有配置日志选项将使用这些值
 os.environ.setdefault('DOCKER_LOG_MAX_SIZE', '10m')
@@ -57,7 +61,11 @@ os.makedirs('./temp', exist_ok=True)
 # 清空./temp文件夹
 def clear_temp_dir():
     for file in os.listdir('./temp'):
-        os.remove(os.path.join('./temp', file))
+        path = os.path.join('./temp', file)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
 
 
 # 创建客户端
@@ -121,6 +129,8 @@ async def start_clients():
                 )
                 rss_process.start()
                 logger.info("RSS 服务启动成功")
+                if os.getenv('RSS_INGEST_MODE', 'http').lower() == 'local':
+                    logger.info("RSS 条目由机器人进程直接写入，RSS 服务只负责读取")
             except Exception as e:
                 logger.error(f"启动 RSS 服务失败: {str(e)}")
                 logger.exception(e)
@@ -136,6 +146,17 @@ async def start_clients():
             bot_client.run_until_disconnected()
         )
     finally:
+        # 提交队列中剩余的RSS条目，RSS服务需要在此之后停止
+        try:
+            await asyncio.wait_for(rss_ingest_client.flush(), SHUTDOWN_FLUSH_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("等待RSS条目提交超时，剩余条目将被丢弃")
+        await rss_ingest_client.close()
+        # 等待后台队列中的推送完成
+        try:
+            await asyncio.wait_for(push_dispatcher.flush(), SHUTDOWN_FLUSH_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("等待后台推送完成超时，剩余推送将被丢弃")
         # 关闭 DBOperations
         if db_ops and hasattr(db_ops, 'close'):
             await db_ops.close()
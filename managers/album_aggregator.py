@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from utils.constants import ALBUM_QUIET_PERIOD, ALBUM_MAX_WAIT
+
+logger = logging.getLogger(__name__)
+
+# 媒体组发送完成后，迟到的同组消息在该时间内直接忽略
+FLUSHED_ALBUM_TTL = 60
+
+# Telegram 单个媒体组最多包含的消息数，同组消息的ID连续
+MAX_ALBUM_SIZE = 10
+
+
+class _PendingAlbum:
+    """正在收集中的媒体组"""
+
+    __slots__ = ('messages', 'started_at', 'last_seen_at')
+
+    def __init__(self, message):
+        now = time.monotonic()
+        self.messages = {message.id: message}
+        self.started_at = now
+        self.last_seen_at = now
+
+    def add(self, message) -> None:
+        self.messages[message.id] = message
+        self.last_seen_at = time.monotonic()
+
+
+class AlbumAggregator:
+    """
+    媒体组聚合器
+
+    按 (聊天ID, grouped_id) 缓存同一媒体组的 NewMessage 事件，最后一条消息到达后
+    静默 quiet_period 秒（最长等待 max_wait 秒）再把按ID排序的完整消息列表交给
+    第一条消息的处理协程，其余消息的处理协程直接返回。
+    交付前按ID范围从服务器补齐静默期内未收到的同组消息（上传较慢或断线重连后补发的消息）。
+    """
+
+    def __init__(self, quiet_period: float = ALBUM_QUIET_PERIOD, max_wait: float = ALBUM_MAX_WAIT):
+        self.quiet_period = quiet_period
+        self.max_wait = max_wait
+        self._pending: Dict[Tuple[int, int], _PendingAlbum] = {}
+        # 最近已交付的媒体组 {key: 交付时间}
+        self._flushed: "OrderedDict[Tuple[int, int], float]" = OrderedDict()
+        logger.info(f"AlbumAggregator 初始化，静默时间: {quiet_period}秒，最长等待: {max_wait}秒")
+
+    async def collect(self, client, chat_id, message) -> Optional[List]:
+        """
+        收集媒体组消息
+
+        Args:
+            client: 用于补齐媒体组的客户端
+            chat_id: 聊天ID
+            message: 媒体组中的一条消息
+
+        Returns:
+            Optional[List]: 第一条消息返回按ID排序的完整媒体组，其余消息返回 None
+        """
+        key = (chat_id, message.grouped_id)
+        self._prune_flushed()
+
+        if key in self._flushed:
+            logger.info(f'媒体组 {message.grouped_id} 已处理，忽略迟到的消息 ID: {message.id}')
+            return None
+
+        album = self._pending.get(key)
+        if album is not None:
+            album.add(message)
+            return None
+
+        album = _PendingAlbum(message)
+        self._pending[key] = album
+        try:
+            while True:
+                now = time.monotonic()
+                wait = min(
+                    album.last_seen_at + self.quiet_period - now,
+                    album.started_at + self.max_wait - now
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            await self._fill_missing(client, message, album)
+        finally:
+            del self._pending[key]
+            self._flushed[key] = time.monotonic()
+
+        messages = [album.messages[message_id] for message_id in sorted(album.messages)]
+        logger.info(f'媒体组 {message.grouped_id} 收集完成，共 {len(messages)} 条消息')
+        return messages
+
+    @staticmethod
+    async def _fill_missing(client, message, album: _PendingAlbum) -> None:
+        """按ID范围获取可能属于该媒体组的消息，补齐尚未收到的部分"""
+        grouped_id = message.grouped_id
+        if len(album.messages) >= MAX_ALBUM_SIZE:
+            return
+        first_id, last_id = min(album.messages), max(album.messages)
+        ids = [
+            message_id for message_id in range(max(1, last_id - MAX_ALBUM_SIZE + 1), first_id + MAX_ALBUM_SIZE)
+            if message_id not in album.messages
+        ]
+        try:
+            fetched = await client.get_messages(message.peer_id, ids=ids)
+        except Exception as e:
+            logger.warning(f'补齐媒体组 {grouped_id} 时出错，使用已收到的 {len(album.messages)} 条消息: {str(e)}')
+            return
+        missing = [item for item in fetched if item is not None and item.grouped_id == grouped_id]
+        for item in missing:
+            album.messages[item.id] = item
+        if missing:
+            logger.info(f'媒体组 {grouped_id} 从服务器补齐了 {len(missing)} 条未收到的消息')
+
+    def _prune_flushed(self) -> None:
+        """清理过期的已交付记录"""
+        expire_before = time.monotonic() - FLUSHED_ALBUM_TTL
+        while self._flushed:
+            key, flushed_at = next(iter(self._flushed.items()))
+            if flushed_at > expire_before:
+                break
+            self._flushed.popitem(last=False)
+
+
+# 创建全局实例
+album_aggregator = AlbumAggregator()
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from utils.constants import CHAT_HISTORY_SIZE, CHAT_HISTORY_MAX_CHATS
+
+logger = logging.getLogger(__name__)
+
+
+def _account_id(client) -> Optional[int]:
+    """客户端登录的账号ID，未知时为 None"""
+    return getattr(client, '_self_id', None)
+
+
+class _ChatBuffer:
+    """单个聊天最近的消息 {message_id: (date, text)}，按到达顺序排列"""
+
+    __slots__ = ('messages', 'warm', 'lock', 'owner_id')
+
+    def __init__(self, owner_id: Optional[int] = None):
+        self.messages: "OrderedDict[int, Tuple[Optional[datetime], str]]" = OrderedDict()
+        # 拉取历史消息的账号ID，私聊和普通群组只记录该账号看到的消息
+        self.owner_id = owner_id
+        # 是否已从 Telegram 拉取过历史消息
+        self.warm = False
+        self.lock = asyncio.Lock()
+
+
+class ChatHistory:
+    """
+    聊天记录环形缓冲区，供AI提示词中的聊天记录占位符使用
+
+    某个聊天第一次被占位符使用时从 Telegram 拉取一次最近的 size 条消息，
+    之后由消息监听器（源聊天及其他用户发送的消息）和发送调度器（我们自己发出的消息）持续写入，
+    占位符直接从内存读取。每个聊天最多保留 size 条消息，最多缓存 max_chats 个聊天，超出时淘汰最久未使用的聊天。
+    """
+
+    def __init__(self, size: int = CHAT_HISTORY_SIZE, max_chats: int = CHAT_HISTORY_MAX_CHATS):
+        self.size = max(1, size)
+        self.max_chats = max(1, max_chats)
+        self._buffers: "OrderedDict[int, _ChatBuffer]" = OrderedDict()
+        logger.info(f"ChatHistory 初始化，每个聊天保留 {self.size} 条消息，最多缓存 {self.max_chats} 个聊天")
+
+    def record(self, chat_id, message) -> None:
+        """
+        记录新消息，只记录已被占位符使用过的聊天
+
+        频道和超级群组 (-100) 的消息ID对所有账号相同，按ID去重；私聊和普通群组的消息ID按账号分别编号，
+        同一条消息在不同账号中的ID不同，只记录拉取历史消息的账号看到的消息
+        """
+        buffer = self._buffers.get(chat_id)
+        if buffer is None or message is None or getattr(message, 'id', None) is None:
+            return
+        if not str(chat_id).startswith('-100') and buffer.owner_id is not None \
+                and _account_id(getattr(message, '_client', None)) != buffer.owner_id:
+            return
+        self._append(buffer, message)
+
+    def record_sent(self, result) -> None:
+        """记录发送结果中的消息（单条消息或消息列表）"""
+        for message in (result if isinstance(result, (list, tuple)) else [result]):
+            chat_id = getattr(message, 'chat_id', None)
+            if chat_id is not None:
+                self.record(chat_id, message)
+
+    def _append(self, buffer: _ChatBuffer, message) -> None:
+        buffer.messages[message.id] = (message.date, message.text or '')
+        while len(buffer.messages) > self.size:
+            buffer.messages.popitem(last=False)
+
+    def _get_buffer(self, client, chat_id: int) -> _ChatBuffer:
+        buffer = self._buffers.get(chat_id)
+        if buffer is None:
+            buffer = _ChatBuffer(_account_id(client))
+            self._buffers[chat_id] = buffer
+        self._buffers.move_to_end(chat_id)
+        while len(self._buffers) > self.max_chats:
+            evicted, _ = self._buffers.popitem(last=False)
+            logger.info(f"聊天记录缓冲区已满，淘汰聊天 {evicted}")
+        return buffer
+
+    async def _warm_up(self, client, chat_id: int, buffer: _ChatBuffer) -> None:
+        """首次使用时拉取最近的消息，拉取期间监听器写入的新消息排在后面"""
+        async with buffer.lock:
+            if buffer.warm:
+                return
+            history = []
+            async for message in client.iter_messages(chat_id, limit=self.size):
+                history.append(message)
+            recorded = list(buffer.messages.items())
+            buffer.messages.clear()
+            for message in reversed(history):
+                self._append(buffer, message)
+            for message_id, item in recorded:
+                buffer.messages[message_id] = item
+                buffer.messages.move_to_end(message_id)
+            while len(buffer.messages) > self.size:
+                buffer.messages.popitem(last=False)
+            buffer.warm = True
+            logger.info(f"已加载聊天 {chat_id} 最近的 {len(history)} 条消息到聊天记录缓冲区")
+
+    async def get_texts(self, client, chat_id: int, count: Optional[int] = None,
+                        minutes: Optional[int] = None) -> Optional[List[str]]:
+        """
+        获取聊天最近的消息文本
+
+        Args:
+            client: 首次使用时用于拉取历史消息的客户端
+            chat_id: 聊天ID
+            count: 最新的几条消息，按从新到旧排列
+            minutes: 最近几分钟的消息，按从旧到新排列
+
+        Returns:
+            Optional[List[str]]: 消息文本（不含无文本的消息）；请求的条数超过缓冲区大小，
+                或请求的时间范围早于缓冲区中最早的消息时返回 None，由调用方直接拉取
+        """
+        if count is not None and count > self.size:
+            return None
+
+        buffer = self._get_buffer(client, chat_id)
+        if not buffer.warm:
+            await self._warm_up(client, chat_id, buffer)
+
+        items = list(buffer.messages.values())
+        if count is not None:
+            return [text for _, text in reversed(items[-count:]) if text] if count > 0 else []
+
+        start_time = datetime.now(timezone.utc) - timedelta(minutes=minutes or 0)
+        # 缓冲区已满且最早的消息晚于起始时间，更早的消息已被淘汰
+        if len(items) >= self.size and (items[0][0] is None or items[0][0] > start_time):
+            return None
+        return [text for date, text in items if text and date is not None and date >= start_time]
+
+
+# 创建全局实例
+chat_history = ChatHistory()
@@ -0,0 +1,143 @@
+import logging
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models.models import get_session
+from utils.constants import ENTITY_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+def candidate_chat_ids(telegram_chat_id) -> List[int]:
+    """
+    获取聊天ID可能的几种形式：原始ID、超级群组/频道格式(-100前缀)、普通群组格式(-前缀)
+    """
+    chat_id = int(telegram_chat_id)
+    candidates = [chat_id]
+    chat_id_str = str(chat_id)
+    if not chat_id_str.startswith('-100'):
+        candidates.append(int(f'-100{abs(chat_id)}'))
+    if not chat_id_str.startswith('-'):
+        candidates.append(int(f'-{abs(chat_id)}'))
+    return candidates
+
+
+class _CachedEntity:
+    __slots__ = ('chat_id', 'entity', 'is_full', 'expires_at')
+
+    def __init__(self, chat_id: int, entity, is_full: bool):
+        self.chat_id = chat_id
+        self.entity = entity
+        self.is_full = is_full
+        self.expires_at = time.monotonic() + ENTITY_CACHE_TTL
+
+
+class EntityCache:
+    """
+    聊天实体缓存
+
+    以数据库中保存的 telegram_chat_id 为键，记录实际可以解析的ID形式及实体：
+    - 首次解析时依次尝试原始ID、-100前缀、-前缀，成功的ID形式写回 Chat.resolved_chat_id
+    - 之后在有效期内直接使用缓存，不再发起解析请求
+    - 缓存在 ENTITY_CACHE_TTL 秒后过期，发送时遇到 ChannelPrivateError 等错误时立即失效
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[int, str], _CachedEntity] = {}
+        logger.info(f"EntityCache 初始化，有效期: {ENTITY_CACHE_TTL}秒")
+
+    async def resolve(self, client, telegram_chat_id, chat=None, full: bool = False):
+        """
+        解析聊天实体
+
+        Args:
+            client: Telethon 客户端
+            telegram_chat_id: 数据库中保存的聊天ID
+            chat: 对应的 Chat 记录，提供时会优先使用并写回可解析的ID形式
+            full: 是否需要完整实体（用户名等信息），否则只解析 InputPeer
+
+        Returns:
+            Tuple[int, object]: (可用的聊天ID, 实体)
+
+        Raises:
+            最后一次解析失败的异常
+        """
+        key = (id(client), str(telegram_chat_id))
+        cached = self._entries.get(key)
+        if cached is not None and cached.expires_at > time.monotonic():
+            if cached.is_full or not full:
+                return cached.chat_id, cached.entity
+            # 只缓存了 InputPeer，用已知可用的ID获取完整实体
+            candidates = [cached.chat_id]
+        else:
+            candidates = candidate_chat_ids(telegram_chat_id)
+            resolved_chat_id = getattr(chat, 'resolved_chat_id', None)
+            if resolved_chat_id:
+                # 优先使用上次解析成功的ID形式
+                resolved_chat_id = int(resolved_chat_id)
+                if resolved_chat_id in candidates:
+                    candidates.remove(resolved_chat_id)
+                candidates.insert(0, resolved_chat_id)
+
+        last_error = None
+        for chat_id in candidates:
+            try:
+                if full:
+                    entity = await client.get_entity(chat_id)
+                else:
+                    entity = await client.get_input_entity(chat_id)
+            except Exception as e:
+                last_error = e
+                continue
+
+            self._entries[key] = _CachedEntity(chat_id, entity, full)
+            if chat_id != int(telegram_chat_id):
+                logger.info(f'聊天 {telegram_chat_id} 使用ID格式 {chat_id} 解析成功')
+            if chat is not None and str(chat_id) != (getattr(chat, 'resolved_chat_id', None) or ''):
+                self._save_resolved_chat_id(chat, chat_id)
+            return chat_id, entity
+
+        self._entries.pop(key, None)
+        raise last_error
+
+    async def get_entity(self, client, telegram_chat_id, chat=None):
+        """获取完整的聊天实体"""
+        _, entity = await self.resolve(client, telegram_chat_id, chat=chat, full=True)
+        return entity
+
+    def invalidate(self, telegram_chat_id, client=None) -> None:
+        """使聊天的缓存失效"""
+        for key in list(self._entries):
+            if key[1] == str(telegram_chat_id) and (client is None or key[0] == id(client)):
+                del self._entries[key]
+        logger.info(f'聊天 {telegram_chat_id} 的实体缓存已失效')
+
+    @staticmethod
+    def _save_resolved_chat_id(chat, chat_id: int) -> None:
+        """
+        将可解析的ID形式写回数据库，并同步到传入的 Chat 对象（可能是规则快照中的对象）
+
+        resolved_chat_id 只是解析时的提示，路由索引和规则快照不依赖它，
+        因此直接执行 UPDATE 而不记录数据变更，避免整个路由索引和规则快照失效
+        """
+        # 不把对象标记为已修改，避免所属会话提交时再次写入
+        set_committed_value(chat, 'resolved_chat_id', str(chat_id))
+        session = get_session()
+        try:
+            session.execute(
+                text("UPDATE chats SET resolved_chat_id = :resolved_chat_id WHERE id = :id"),
+                {'resolved_chat_id': str(chat_id), 'id': chat.id}
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.warning(f'保存聊天 {chat.id} 的解析ID时出错: {str(e)}')
+        finally:
+            session.close()
+
+
+# 创建全局实例
+entity_cache = EntityCache()
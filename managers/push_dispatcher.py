@@ -0,0 +1,226 @@
+import asyncio
+import contextvars
+import logging
+import os
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Set, Tuple, Union
+
+import apprise
+
+from utils.constants import PUSH_CONCURRENCY, PUSH_BACKGROUND, PUSH_QUEUE_SIZE, PUSH_MAX_RETRIES
+from utils.media_cache import media_cache
+
+logger = logging.getLogger(__name__)
+
+# 最多缓存的推送渠道数量
+MAX_CACHED_CHANNELS = 256
+
+# 附件：单个文件路径或文件路径列表
+Attachment = Union[None, str, List[str]]
+
+
+class PushTarget:
+    """推送配置的快照，数据库会话关闭后仍可在后台队列中使用"""
+
+    __slots__ = ('config_id', 'push_channel', 'media_send_mode')
+
+    def __init__(self, config_id: int, push_channel: str, media_send_mode: str):
+        self.config_id = config_id
+        self.push_channel = push_channel
+        self.media_send_mode = media_send_mode
+
+    @classmethod
+    def from_config(cls, config) -> 'PushTarget':
+        return cls(config.id, config.push_channel, config.media_send_mode)
+
+
+class _Channel:
+    """已配置的推送渠道"""
+
+    __slots__ = ('url', 'apprise', 'lock')
+
+    def __init__(self):
+        self.url: Optional[str] = None
+        self.apprise: Optional[apprise.Apprise] = None
+        # 同一渠道的推送按顺序发送
+        self.lock = asyncio.Lock()
+
+
+class _PushJob:
+    __slots__ = ('items', 'retained')
+
+    def __init__(self, items, retained):
+        self.items = items
+        self.retained = retained
+
+
+class PushDispatcher:
+    """
+    推送分发器
+
+    - 按推送配置ID缓存已解析服务地址的 Apprise 对象，配置的地址被修改后自动重建，已删除的配置按最久未使用淘汰
+    - 一次推送的所有渠道并发发送，最多同时发送 concurrency 个，同一渠道仍按顺序发送
+    - background 为 True 时推送放入后台队列后立即返回，失败的渠道按指数退避重试 max_retries 次，
+      每个推送在各自的协程中重试，某个渠道不可用不会阻塞队列中的其他推送
+    - 推送地址无法解析的渠道视为永久失败，不再重试
+    """
+
+    def __init__(self, concurrency: int = PUSH_CONCURRENCY, background: bool = PUSH_BACKGROUND,
+                 queue_size: int = PUSH_QUEUE_SIZE, max_retries: int = PUSH_MAX_RETRIES):
+        self.concurrency = max(1, concurrency)
+        self.background = background
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self._channels: "OrderedDict[int, _Channel]" = OrderedDict()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # 已从队列取出但尚未完成（包括等待重试）的推送，数量不超过 queue_size
+        self._jobs: Set[asyncio.Task] = set()
+        self._job_slots: Optional[asyncio.Semaphore] = None
+        logger.info(
+            f"PushDispatcher 初始化，并发数: {self.concurrency}，后台推送: {self.background}，"
+            f"重试次数: {self.max_retries}"
+        )
+
+    def _get_channel(self, target: PushTarget) -> _Channel:
+        channel = self._channels.get(target.config_id)
+        if channel is None:
+            channel = _Channel()
+            self._channels[target.config_id] = channel
+        self._channels.move_to_end(target.config_id)
+        while len(self._channels) > MAX_CACHED_CHANNELS:
+            self._channels.popitem(last=False)
+
+        if channel.url != target.push_channel:
+            apobj = apprise.Apprise()
+            if apobj.add(target.push_channel):
+                logger.info(f'成功添加推送服务: {target.push_channel}')
+                channel.apprise = apobj
+            else:
+                logger.error(f'添加推送服务失败: {target.push_channel}')
+                channel.apprise = None
+            channel.url = target.push_channel
+        return channel
+
+    async def _notify(self, target: PushTarget, body: str, attach: Attachment) -> Optional[bool]:
+        """推送到单个渠道，返回是否成功，推送地址无法解析时返回 None"""
+        channel = self._get_channel(target)
+        if channel.apprise is None:
+            return None
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with channel.lock, self._semaphore:
+            try:
+                if attach:
+                    result = await asyncio.to_thread(channel.apprise.notify, body=body, attach=attach)
+                else:
+                    result = await asyncio.to_thread(channel.apprise.notify, body=body)
+            except Exception as e:
+                logger.error(f'发送推送时出错: {target.push_channel}, {str(e)}', exc_info=True)
+                return False
+
+        if result:
+            logger.info(f'推送发送成功: {target.push_channel}')
+        else:
+            logger.error(f'推送发送失败: {target.push_channel}')
+        return bool(result)
+
+    async def deliver(self, items: Sequence[Tuple[PushTarget, str, Attachment]], retries: int = 0) -> int:
+        """
+        并发推送到所有渠道
+
+        Args:
+            items: [(推送目标, 推送内容, 附件), ...]
+            retries: 失败渠道的重试次数，推送地址无法解析的渠道不重试
+
+        Returns:
+            int: 推送成功的渠道数
+        """
+        pending = list(items)
+        succeeded = 0
+        for attempt in range(retries + 1):
+            results = await asyncio.gather(*(self._notify(*item) for item in pending))
+            succeeded += sum(1 for result in results if result)
+            pending = [item for item, result in zip(pending, results) if result is False]
+            if not pending or attempt >= retries:
+                break
+            delay = 2 ** attempt
+            logger.info(f'{delay} 秒后重试 {len(pending)} 个推送渠道 (第 {attempt + 1}/{retries} 次)')
+            await asyncio.sleep(delay)
+        return succeeded
+
+    async def send(self, items: Sequence[Tuple[PushTarget, str, Attachment]]) -> None:
+        """
+        推送消息，后台模式下放入队列后立即返回
+
+        后台推送会为附件增加引用，调用方可以照常释放自己持有的媒体文件
+        """
+        items = [item for item in items if item[1] or item[2]]
+        if not items:
+            return
+        if not self.background:
+            await self.deliver(items)
+            return
+
+        retained = []
+        for _, _, attach in items:
+            for path in ([attach] if isinstance(attach, str) else attach or []):
+                if media_cache.retain(path):
+                    retained.append(path)
+                elif os.path.exists(str(path)):
+                    # 不受缓存管理的文件可能在返回后被删除，直接推送
+                    self._release(retained)
+                    await self.deliver(items)
+                    return
+
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(_PushJob(items, retained))
+        except asyncio.QueueFull:
+            logger.warning(f'推送队列已满({self.queue_size})，直接推送')
+            self._release(retained)
+            await self.deliver(items)
+
+    def _ensure_worker(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._job_slots = asyncio.Semaphore(max(1, self.queue_size))
+        if self._worker is None or self._worker.done():
+            # 后台协程不继承当前事件的媒体缓存作用域
+            self._worker = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def _run(self) -> None:
+        while True:
+            await self._job_slots.acquire()
+            job = await self._queue.get()
+            task = asyncio.create_task(self._deliver_job(job))
+            self._jobs.add(task)
+            task.add_done_callback(self._jobs.discard)
+
+    async def _deliver_job(self, job: _PushJob) -> None:
+        """在独立协程中推送并重试，重试等待期间不占用推送并发名额"""
+        try:
+            await self.deliver(job.items, retries=self.max_retries)
+        except Exception as e:
+            logger.error(f'后台推送时出错: {str(e)}', exc_info=True)
+        finally:
+            self._release(job.retained)
+            self._job_slots.release()
+            self._queue.task_done()
+
+    @staticmethod
+    def _release(paths: List[str]) -> None:
+        """释放 retain 增加的引用，在空上下文中执行以免计入当前事件的作用域"""
+        for path in paths:
+            contextvars.Context().run(media_cache.release, path)
+
+    async def flush(self) -> None:
+        """等待后台队列中的推送全部完成（包括正在重试的推送）"""
+        if self._queue is not None:
+            await self._queue.join()
+
+
+# 创建全局实例
+push_dispatcher = PushDispatcher()
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+import aiohttp
+
+from utils.constants import (
+    RSS_HOST, RSS_PORT, RSS_INGEST_MODE, RSS_INGEST_BATCH_SIZE, RSS_INGEST_WINDOW,
+    RSS_INGEST_QUEUE_SIZE, RSS_INGEST_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RSSIngestClient:
+    """
+    RSS条目提交客户端
+
+    RSS过滤器生成的条目先进入有界队列，由后台协程在 window 秒内收集最多 batch_size 个条目，
+    通过长连接一次提交到 RSS 服务的批量接口：
+    - 所有请求复用同一个 aiohttp 连接池，不再为每条消息建立新连接
+    - 队列满时直接丢弃新条目并返回 False，RSS 服务变慢不会阻塞转发流程
+    - 提交失败时按指数退避重试 max_retries 次；请求超时时RSS服务可能已经写入，不再重试
+    RSS服务按 (规则ID, 来源聊天ID, 消息ID) 生成条目ID，重试时重复提交的条目会替换原有条目而不会重复。
+
+    mode 为 local 时不经过 HTTP，直接调用与RSS服务相同的条目处理逻辑写入共享的条目存储。
+    """
+
+    def __init__(self, base_url: str = None, mode: str = RSS_INGEST_MODE, batch_size: int = RSS_INGEST_BATCH_SIZE,
+                 window: float = RSS_INGEST_WINDOW, queue_size: int = RSS_INGEST_QUEUE_SIZE,
+                 max_retries: int = RSS_INGEST_MAX_RETRIES):
+        self.base_url = base_url or f"http://{RSS_HOST}:{RSS_PORT}"
+        self.mode = mode
+        self.batch_size = max(1, batch_size)
+        self.window = window
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        logger.info(
+            f"RSSIngestClient 初始化，写入方式: {self.mode}，每批最多 {self.batch_size} 个条目，"
+            f"收集时间: {self.window}秒，队列长度: {self.queue_size}"
+        )
+
+    def _ensure_worker(self) -> None:
+        # 延迟创建，确保绑定到运行中的事件循环
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=120)
+            )
+        return self._session
+
+    def submit(self, rule_id: int, entry_data: dict) -> bool:
+        """
+        提交条目，立即返回
+
+        Returns:
+            bool: 是否已加入队列，队列已满时返回 False
+        """
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((rule_id, entry_data))
+            return True
+        except asyncio.QueueFull:
+            logger.error(f"RSS提交队列已满({self.queue_size})，丢弃规则 {rule_id} 的条目")
+            return False
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                if self.mode == 'local':
+                    await self._ingest_local(batch)
+                else:
+                    await self._send_batch(batch)
+            except Exception as e:
+                logger.error(f"提交RSS条目时出错: {str(e)}", exc_info=True)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _ingest_local(self, batch: List[Tuple[int, dict]]) -> None:
+        """在本进程内直接写入条目存储"""
+        from rss.app.services import entry_service
+
+        failed = 0
+        for rule_id, entry in batch:
+            try:
+                await entry_service.add_entry(rule_id, entry)
+            except Exception as e:
+                failed += 1
+                logger.error(f"添加RSS条目失败: 规则ID={rule_id}, {str(e)}")
+        logger.info(f"已写入 {len(batch)} 个RSS条目，失败 {failed} 个")
+
+    async def _send_batch(self, batch: List[Tuple[int, dict]]) -> None:
+        url = f"{self.base_url}/api/entries/batch"
+        payload = {"entries": [{"rule_id": rule_id, "entry": entry} for rule_id, entry in batch]}
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._get_session().post(url, json=payload) as response:
+                    if response.status == 200:
+                        result = await response.json()
+                        failed = [r for r in result.get("results", []) if r.get("status") != "success"]
+                        for item in failed:
+                            logger.error(f"RSS服务添加条目失败: 规则ID={item.get('rule_id')}, {item.get('detail')}")
+                        logger.info(f"已提交 {len(batch)} 个RSS条目，失败 {len(failed)} 个")
+                        return
+                    logger.error(f"批量提交到RSS服务失败: {response.status} - {await response.text()}")
+            except asyncio.TimeoutError:
+                logger.error(f"提交RSS条目超时，RSS服务可能已写入，不再重试 {len(batch)} 个条目")
+                return
+            except aiohttp.ClientError as e:
+                logger.error(f"连接RSS服务失败: {str(e)}")
+
+            if attempt < self.max_retries:
+                delay = 2 ** attempt
+                logger.info(f"{delay} 秒后重试提交RSS条目 (第 {attempt + 1}/{self.max_retries} 次)")
+                await asyncio.sleep(delay)
+
+        logger.error(f"提交RSS条目失败，已重试 {self.max_retries} 次，丢弃 {len(batch)} 个条目")
+
+    async def flush(self) -> None:
+        """等待队列中的条目全部提交"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+# 创建全局实例
+rss_ingest_client = RSSIngestClient()
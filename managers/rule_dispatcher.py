@@ -0,0 +1,129 @@
+import asyncio
+import contextvars
+import logging
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+from utils.constants import RULE_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+
+class _Slot:
+    """规则任务占用的并发名额"""
+
+    __slots__ = ('semaphore', 'held')
+
+    def __init__(self, semaphore: asyncio.Semaphore):
+        self.semaphore = semaphore
+        self.held = False
+
+
+# 当前规则任务的并发名额，规则任务内创建的子任务共用同一个名额
+_current_slot: contextvars.ContextVar[Optional[_Slot]] = contextvars.ContextVar('rule_dispatcher_slot', default=None)
+
+
+class RuleDispatcher:
+    """
+    规则并发分发器
+
+    同一条消息匹配到的多条规则以任务方式并发执行：
+    - 全局信号量限制同时执行的规则数量
+    - 同一目标聊天的规则按提交顺序逐条执行，保证目标聊天内的消息顺序
+
+    max_concurrency 为 1 时退化为逐条顺序执行。
+    规则等待发送（如目标聊天触发 FloodWait）时通过 released() 让出名额，不阻塞其他聊天的规则。
+    """
+
+    def __init__(self, max_concurrency: int = RULE_CONCURRENCY):
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # 每个目标聊天最后提交的任务 {target_key: task}，新任务需等待其完成
+        self._tails: Dict[Hashable, asyncio.Task] = {}
+        logger.info(f"RuleDispatcher 初始化，最大并发规则数: {self.max_concurrency}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 1
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # 延迟创建，确保绑定到运行中的事件循环
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def submit(self, target_key: Hashable, job: Callable[[], Awaitable]) -> asyncio.Task:
+        """
+        提交一个规则任务
+
+        Args:
+            target_key: 目标聊天标识，相同标识的任务按提交顺序执行
+            job: 无参协程函数
+
+        Returns:
+            asyncio.Task: 规则任务
+        """
+        previous = self._tails.get(target_key)
+        task = asyncio.create_task(self._run(target_key, previous, job))
+        self._tails[target_key] = task
+        return task
+
+    async def _run(self, target_key, previous: Optional[asyncio.Task], job):
+        try:
+            if previous is not None and not previous.done():
+                # 只等待前一个任务结束，不关心其结果
+                await asyncio.wait([previous])
+            slot = _Slot(self._get_semaphore())
+            _current_slot.set(slot)
+            await slot.semaphore.acquire()
+            slot.held = True
+            try:
+                return await job()
+            finally:
+                if slot.held:
+                    slot.held = False
+                    slot.semaphore.release()
+        finally:
+            if self._tails.get(target_key) is asyncio.current_task():
+                del self._tails[target_key]
+
+    @asynccontextmanager
+    async def released(self):
+        """
+        在上下文中暂时让出当前规则任务的并发名额，退出时重新获取
+
+        不在规则任务中，或名额已被同一规则的其他子任务让出时不做任何处理
+        """
+        slot = _current_slot.get()
+        if slot is None or not slot.held:
+            yield
+            return
+        slot.held = False
+        slot.semaphore.release()
+        try:
+            yield
+        finally:
+            await slot.semaphore.acquire()
+            slot.held = True
+
+    async def run_all(self, jobs: List[tuple]) -> None:
+        """
+        执行一批规则任务并等待全部完成
+
+        Args:
+            jobs: [(target_key, job), ...]，按规则顺序排列
+        """
+        if not self.enabled:
+            for _, job in jobs:
+                await job()
+            return
+
+        tasks = [self.submit(target_key, job) for target_key, job in jobs]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.error(f"规则任务执行出错: {str(result)}", exc_info=result)
+
+
+# 创建全局实例
+rule_dispatcher = RuleDispatcher()
@@ -0,0 +1,181 @@
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from models.models import get_session, Chat, ForwardRule, ChannelCommentMapping
+from models.change_tracker import change_tracker
+
+logger = logging.getLogger(__name__)
+
+# 路由索引依赖的表，任意一张表变更后索引在下次访问时重建
+ROUTING_TABLES = ('forward_rules', 'chats', 'channel_comment_mappings')
+
+# 规则快照额外依赖的表（随快照一起预加载的关联数据）
+RULE_SNAPSHOT_TABLES = ROUTING_TABLES + ('replace_rules',)
+
+
+class ChatRoute:
+    """单个源聊天的路由信息"""
+
+    __slots__ = (
+        'chat_db_id', 'name', 'direct_rule_ids', 'has_comment_forward',
+        'comment_rule_ids', 'parent_channel_db_id', 'parent_channel_telegram_id'
+    )
+
+    def __init__(self, chat_db_id: int, name: Optional[str]):
+        self.chat_db_id = chat_db_id
+        self.name = name
+        # 当前聊天作为源的规则
+        self.direct_rule_ids: List[int] = []
+        # 直接规则中是否有启用评论区转发的
+        self.has_comment_forward = False
+        # 当前聊天作为评论区时，父频道上启用了评论区转发的规则
+        self.comment_rule_ids: List[int] = []
+        self.parent_channel_db_id: Optional[int] = None
+        self.parent_channel_telegram_id: Optional[int] = None
+
+    @property
+    def rule_ids(self) -> List[int]:
+        return self.direct_rule_ids + self.comment_rule_ids
+
+
+class RuleRoutingIndex:
+    """
+    规则路由索引，将 telegram_chat_id 映射到预先计算好的直接规则和评论区规则
+
+    没有任何规则的聊天在索引中不存在，消息处理时无需访问数据库即可直接返回。
+    索引通过 change_tracker 的版本号判断是否过期，规则、聊天或评论区映射
+    在本进程内提交修改后会在下一条消息到达时自动重建。
+
+    同时缓存启用规则的快照（已脱离会话的 ForwardRule，预加载源聊天、目标聊天和替换规则），
+    匹配到规则的消息也不必查询数据库。快照在多个事件间共享，使用方不能修改其属性。
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, ChatRoute] = {}
+        self._version: Optional[Tuple[int, ...]] = None
+        self._rules: Dict[int, ForwardRule] = {}
+        self._rules_version: Optional[Tuple[int, ...]] = None
+        # 评论区映射上次确认时间 {chat_db_id: timestamp}
+        self._comment_checked: Dict[int, float] = {}
+        logger.info("RuleRoutingIndex 初始化")
+
+    def invalidate(self) -> None:
+        """手动使索引失效"""
+        self._version = None
+        self._rules_version = None
+
+    def get_route(self, telegram_chat_id) -> Optional[ChatRoute]:
+        """获取聊天的路由信息，没有任何规则时返回 None"""
+        version = change_tracker.versions(*ROUTING_TABLES)
+        if version != self._version:
+            self._rebuild()
+            self._version = version
+        return self._routes.get(str(telegram_chat_id))
+
+    def get_rules(self, route: ChatRoute) -> Dict[int, ForwardRule]:
+        """获取路由中启用规则的快照 {rule_id: rule}"""
+        version = change_tracker.versions(*RULE_SNAPSHOT_TABLES)
+        if version != self._rules_version:
+            self._load_rules()
+            self._rules_version = version
+        return {rule_id: self._rules[rule_id] for rule_id in route.rule_ids if rule_id in self._rules}
+
+    def should_check_comment_mapping(self, chat_db_id: int, max_age: float) -> bool:
+        """判断是否需要重新确认频道的评论区映射"""
+        last_checked = self._comment_checked.get(chat_db_id)
+        return last_checked is None or time.monotonic() - last_checked >= max_age
+
+    def mark_comment_mapping_checked(self, chat_db_id: int) -> None:
+        """记录频道的评论区映射已确认"""
+        self._comment_checked[chat_db_id] = time.monotonic()
+
+    def _rebuild(self) -> None:
+        """从数据库重建索引"""
+        session = get_session()
+        try:
+            chats = {
+                chat_id: (telegram_chat_id, name)
+                for chat_id, telegram_chat_id, name in session.query(
+                    Chat.id, Chat.telegram_chat_id, Chat.name
+                ).all()
+            }
+
+            routes: Dict[str, ChatRoute] = {}
+
+            def route_for(chat_db_id):
+                telegram_chat_id, name = chats[chat_db_id]
+                route = routes.get(telegram_chat_id)
+                if route is None:
+                    route = ChatRoute(chat_db_id, name)
+                    routes[telegram_chat_id] = route
+                return route
+
+            # 按频道汇总启用了评论区转发的规则
+            comment_rules_by_channel: Dict[int, List[int]] = {}
+
+            rules = session.query(
+                ForwardRule.id, ForwardRule.source_chat_id, ForwardRule.enable_comment_forward
+            ).filter(
+                ForwardRule.enable_rule == True
+            ).order_by(ForwardRule.id).all()
+
+            for rule_id, source_chat_id, enable_comment_forward in rules:
+                if source_chat_id not in chats:
+                    continue
+                route = route_for(source_chat_id)
+                route.direct_rule_ids.append(rule_id)
+                if enable_comment_forward:
+                    route.has_comment_forward = True
+                    comment_rules_by_channel.setdefault(source_chat_id, []).append(rule_id)
+
+            # 评论区 -> 父频道规则
+            mappings = session.query(
+                ChannelCommentMapping.channel_chat_id, ChannelCommentMapping.linked_chat_id
+            ).filter(
+                ChannelCommentMapping.linked_chat_id != None
+            ).all()
+
+            for channel_chat_id, linked_chat_id in mappings:
+                comment_rule_ids = comment_rules_by_channel.get(channel_chat_id)
+                if not comment_rule_ids or linked_chat_id not in chats:
+                    continue
+                route = route_for(linked_chat_id)
+                if route.parent_channel_db_id is not None:
+                    continue
+                route.comment_rule_ids = list(comment_rule_ids)
+                route.parent_channel_db_id = channel_chat_id
+                try:
+                    route.parent_channel_telegram_id = int(chats[channel_chat_id][0])
+                except (KeyError, TypeError, ValueError):
+                    route.parent_channel_telegram_id = None
+
+            self._routes = routes
+            logger.info(f"规则路由索引已重建，共 {len(routes)} 个源聊天，{len(rules)} 条启用的规则")
+        finally:
+            session.close()
+
+
+    def _load_rules(self) -> None:
+        """从数据库加载所有启用规则的快照"""
+        session = get_session()
+        try:
+            rules = session.query(ForwardRule).options(
+                joinedload(ForwardRule.source_chat),
+                joinedload(ForwardRule.target_chat),
+                selectinload(ForwardRule.replace_rules)
+            ).filter(
+                ForwardRule.enable_rule == True
+            ).all()
+            # 脱离会话后已加载的属性仍可访问
+            session.expunge_all()
+            self._rules = {rule.id: rule for rule in rules}
+            logger.info(f"规则快照已加载，共 {len(rules)} 条启用的规则")
+        finally:
+            session.close()
+
+
+# 创建全局实例
+rule_index = RuleRoutingIndex()
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Hashable, Tuple
+
+from telethon import utils
+from telethon.errors import FloodWaitError
+
+from managers.chat_history import chat_history
+from managers.entity_cache import entity_cache
+from managers.rule_dispatcher import rule_dispatcher
+from utils.constants import (
+    SEND_GLOBAL_RATE, SEND_CHAT_RATE_PER_MINUTE, SEND_CHAT_BURST, SEND_FLOOD_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """令牌桶限速器"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, cost: float) -> float:
+        """获取可以取出 cost 个令牌前需要等待的秒数"""
+        self._refill()
+        cost = min(cost, self.capacity)
+        if self.tokens >= cost:
+            return 0
+        return (cost - self.tokens) / self.rate
+
+    def consume(self, cost: float) -> None:
+        self._refill()
+        self.tokens -= min(cost, self.capacity)
+
+
+class _SendJob:
+    __slots__ = ('func', 'args', 'kwargs', 'cost', 'future', 'attempts')
+
+    def __init__(self, func, args, kwargs, cost, future):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.cost = cost
+        self.future = future
+        self.attempts = 0
+
+
+class _ChatQueue:
+    """单个目标聊天的发送队列"""
+
+    __slots__ = ('jobs', 'bucket', 'blocked_until', 'worker')
+
+    def __init__(self):
+        self.jobs = deque()
+        self.bucket = TokenBucket(SEND_CHAT_RATE_PER_MINUTE / 60, SEND_CHAT_BURST)
+        # FloodWait 解除时间
+        self.blocked_until = 0.0
+        self.worker = None
+
+
+class SendScheduler:
+    """
+    发送调度器
+
+    所有发往 Telegram 的消息按 (客户端, 目标聊天) 进入各自的队列，由独立的协程按顺序发送：
+    - 每个客户端一个全局令牌桶，每个目标聊天一个令牌桶，与 Telegram 的频率限制对应
+    - 发生 FloodWait 时只暂停该目标聊天的队列，等待结束后自动重试，其他聊天不受影响
+    """
+
+    def __init__(self):
+        self._queues: Dict[Tuple[int, Hashable], _ChatQueue] = {}
+        self._global_buckets: Dict[int, TokenBucket] = {}
+        logger.info(
+            f"SendScheduler 初始化，全局速率: {SEND_GLOBAL_RATE}条/秒，"
+            f"单聊天速率: {SEND_CHAT_RATE_PER_MINUTE}条/分钟 (突发 {SEND_CHAT_BURST} 条)"
+        )
+
+    async def submit(self, client, chat_id, func, *args, cost: float = 1, **kwargs):
+        """
+        将一次发送请求加入目标聊天的队列，并等待发送完成
+
+        Args:
+            client: 发送消息的客户端
+            chat_id: 目标聊天ID
+            func: 实际发送的协程函数
+            cost: 本次发送占用的令牌数（媒体组按文件数量计算）
+
+        Returns:
+            发送函数的返回值
+        """
+        key = (id(client), await self._normalize_chat_id(client, chat_id))
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = _ChatQueue()
+            self._queues[key] = queue
+
+        future = asyncio.get_running_loop().create_future()
+        queue.jobs.append(_SendJob(func, args, kwargs, cost, future))
+        if queue.worker is None:
+            queue.worker = asyncio.create_task(self._drain(key, queue, client))
+        # 等待期间让出规则并发名额，某个聊天被限流时其他聊天的规则照常处理
+        async with rule_dispatcher.released():
+            result = await future
+        # 发出的消息写入聊天记录缓冲区，供AI提示词的目标聊天记录占位符使用
+        chat_history.record_sent(result)
+        return result
+
+    @staticmethod
+    async def _normalize_chat_id(client, chat_id):
+        """
+        将目标聊天统一为完整ID，同一聊天不论传入原始ID、-100前缀ID还是实体都使用同一个队列和令牌桶
+        """
+        try:
+            entity = chat_id
+            if isinstance(chat_id, (int, str)):
+                _, entity = await entity_cache.resolve(client, chat_id)
+            return utils.get_peer_id(entity)
+        except Exception:
+            return chat_id
+
+    async def send_message(self, client, entity, *args, **kwargs):
+        return await self.submit(client, entity, client.send_message, entity, *args, **kwargs)
+
+    async def send_file(self, client, entity, file, *args, **kwargs):
+        cost = len(file) if isinstance(file, (list, tuple)) else 1
+        return await self.submit(client, entity, client.send_file, entity, file, *args, cost=cost, **kwargs)
+
+    async def forward_messages(self, client, entity, messages, *args, **kwargs):
+        cost = len(messages) if isinstance(messages, (list, tuple)) else 1
+        return await self.submit(client, entity, client.forward_messages, entity, messages, *args, cost=cost, **kwargs)
+
+    def _global_bucket(self, client) -> TokenBucket:
+        bucket = self._global_buckets.get(id(client))
+        if bucket is None:
+            bucket = TokenBucket(SEND_GLOBAL_RATE, SEND_GLOBAL_RATE)
+            self._global_buckets[id(client)] = bucket
+        return bucket
+
+    async def _drain(self, key, queue: _ChatQueue, client) -> None:
+        """按顺序发送队列中的消息，队列清空后退出"""
+        global_bucket = self._global_bucket(client)
+        try:
+            while queue.jobs:
+                job = queue.jobs[0]
+                if job.future.done():
+                    # 调用方已取消
+                    queue.jobs.popleft()
+                    continue
+
+                blocked = queue.blocked_until - time.monotonic()
+                if blocked > 0:
+                    await asyncio.sleep(blocked)
+                    continue
+
+                wait = max(queue.bucket.wait_time(job.cost), global_bucket.wait_time(job.cost))
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                queue.bucket.consume(job.cost)
+                global_bucket.consume(job.cost)
+
+                try:
+                    result = await job.func(*job.args, **job.kwargs)
+                except FloodWaitError as e:
+                    job.attempts += 1
+                    queue.blocked_until = time.monotonic() + e.seconds + 1
+                    if job.attempts > SEND_FLOOD_MAX_RETRIES:
+                        logger.error(f'发送到 {key[1]} 触发频率限制，已重试 {SEND_FLOOD_MAX_RETRIES} 次，放弃发送')
+                        queue.jobs.popleft()
+                        if not job.future.done():
+                            job.future.set_exception(e)
+                    else:
+                        logger.warning(
+                            f'发送到 {key[1]} 触发频率限制，{e.seconds} 秒后重试 '
+                            f'(第 {job.attempts}/{SEND_FLOOD_MAX_RETRIES} 次)，队列中还有 {len(queue.jobs)} 条消息'
+                        )
+                    continue
+                except Exception as e:
+                    queue.jobs.popleft()
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                    continue
+
+                queue.jobs.popleft()
+                if not job.future.done():
+                    job.future.set_result(result)
+        finally:
+            queue.worker = None
+            # 被取消（如程序退出）时，剩余的发送请求一并取消，避免调用方一直等待
+            while queue.jobs:
+                job = queue.jobs.popleft()
+                if not job.future.done():
+                    job.future.cancel()
+            if queue.blocked_until <= time.monotonic():
+                self._queues.pop(key, None)
+
+
+# 创建全局实例
+send_scheduler = SendScheduler()
@@ -1,25 +1,28 @@
 from telethon import events
-from models.models import get_session, Chat, ForwardRule, ChannelCommentMapping
 import logging
 from handlers import user_handler, bot_handler
 from handlers.prompt_handlers import handle_prompt_setting
 import asyncio
+import functools
 import os
 from dotenv import load_dotenv
 from telethon.tl.types import ChannelParticipantsAdmins
 from managers.state_manager import state_manager
+from managers.rule_index import rule_index
+from managers.rule_dispatcher import rule_dispatcher
+from managers.album_aggregator import album_aggregator
 from telethon.tl import types
 from filters.process import process_forward_rule
+from filters.context import build_media_infos
 from utils.comment_manager import CommentManager
+from utils.media_cache import media_cache
+from managers.chat_history import chat_history
 # 加载环境变量
 load_dotenv()
 
 # 获取logger
 logger = logging.getLogger(__name__)
 
-# 添加一个缓存来存储已处理的媒体组
-PROCESSED_GROUPS = set()
-
 BOT_ID = None
 
 async def setup_listeners(user_client, bot_client):
@@ -72,6 +75,9 @@ async def setup_listeners(user_client, bot_client):
 async def handle_user_message(event, user_client, bot_client):
     """处理用户客户端收到的消息"""
     # logger.info("handle_user_message:开始处理用户消息")
+
+    # 记录到聊天记录缓冲区（只记录AI提示词占位符使用过的聊天）
+    chat_history.record(event.chat_id, event.message)
     
     chat = await event.get_chat()
     chat_id = abs(chat.id)
@@ -103,49 +109,39 @@ async def handle_user_message(event, user_client, bot_client):
             return
         # logger.info("提示词设置处理未完成，继续执行")
 
-    # 检查是否是媒体组消息
+    # 首先通过路由索引检查该聊天是否有转发规则（无规则时不访问数据库）
+    route = rule_index.get_route(chat_id)
+    if not route:
+        return
+
+    # 媒体组消息先聚合，由第一条消息携带完整的媒体组继续处理
+    album_messages = None
     if event.message.grouped_id:
-        # 如果这个媒体组已经处理过，就跳过
-        group_key = f"{chat_id}:{event.message.grouped_id}"
-        if group_key in PROCESSED_GROUPS:
-            return
-        # 标记这个媒体组为已处理
-        PROCESSED_GROUPS.add(group_key)
-        asyncio.create_task(clear_group_cache(group_key))
-    
-    # 首先检查数据库中是否有该聊天的转发规则
-    session = get_session()
-    try:
-        # 查询源聊天
-        source_chat = session.query(Chat).filter(
-            Chat.telegram_chat_id == str(chat_id)
-        ).first()
-        
-        if not source_chat:
+        album_messages = await album_aggregator.collect(event.client, chat_id, event.message)
+        if album_messages is None:
             return
-            
-        logger.info(f'找到源聊天: {source_chat.name} (ID: {source_chat.id})')
 
-        rules_to_process = []
+    # 检查是否有任何规则启用了评论区转发（每个源聊天在缓存有效期内只确认一次）
+    if route.has_comment_forward and rule_index.should_check_comment_mapping(
+        route.chat_db_id, CommentManager.CACHE_DURATION.total_seconds()
+    ):
+        try:
+            comment_manager = CommentManager(user_client)
+            await comment_manager.get_linked_chat_id(route.chat_db_id)
+            rule_index.mark_comment_mapping_checked(route.chat_db_id)
+        except Exception as e:
+            logger.warning(f'建立评论区映射时出错(非致命): {str(e)}', exc_info=True)
 
-        # 1. 查找直接匹配的规则（当前聊天作为源），预加载 target_chat 避免 N+1
-        from sqlalchemy.orm import joinedload
-        direct_rules = session.query(ForwardRule).options(
-            joinedload(ForwardRule.target_chat)
-        ).filter(
-            ForwardRule.source_chat_id == source_chat.id,
-            ForwardRule.enable_rule == True
-        ).all()
+    try:
+        logger.info(f'找到源聊天: {route.name} (ID: {route.chat_db_id})')
 
-        # 检查是否有任何规则启用了评论区转发（每个源聊天只调用一次）
-        has_comment_forward = any(rule.enable_comment_forward for rule in direct_rules)
-        if has_comment_forward:
-            try:
-                comment_manager = CommentManager(user_client)
-                await comment_manager.get_linked_chat_id(source_chat.id)
-            except Exception as e:
-                logger.warning(f'建立评论区映射时出错(非致命): {str(e)}', exc_info=True)
+        # 匹配的规则直接使用索引中的快照（已预加载源聊天和目标聊天），不访问数据库
+        rules_by_id = rule_index.get_rules(route)
 
+        rules_to_process = []
+
+        # 1. 直接匹配的规则（当前聊天作为源）
+        direct_rules = [rules_by_id[rule_id] for rule_id in route.direct_rule_ids if rule_id in rules_by_id]
         for rule in direct_rules:
             rules_to_process.append({
                 'rule': rule,
@@ -156,79 +152,70 @@ async def handle_user_message(event, user_client, bot_client):
         if direct_rules:
             logger.info(f'找到 {len(direct_rules)} 条直接转发规则')
 
-        # 2. 查找评论区匹配的规则
-        mapping = session.query(ChannelCommentMapping).filter(
-            ChannelCommentMapping.linked_chat_id == source_chat.id
-        ).first()
-
-        parent_channel_telegram_id = None  # 缓存父频道 ID，避免重复查询
-        if mapping:
-            logger.info(f'通过评论区映射找到频道 Chat ID: {mapping.channel_chat_id}')
-            # 预加载 target_chat 避免 N+1
-            comment_rules = session.query(ForwardRule).options(
-                joinedload(ForwardRule.target_chat)
-            ).filter(
-                ForwardRule.source_chat_id == mapping.channel_chat_id,
-                ForwardRule.enable_comment_forward == True,
-                ForwardRule.enable_rule == True
-            ).all()
-
-            # 预先获取父频道的 telegram_chat_id（只查询一次）
-            if comment_rules:
-                parent_channel = session.query(Chat).filter(Chat.id == mapping.channel_chat_id).first()
-                parent_channel_telegram_id = int(parent_channel.telegram_chat_id) if parent_channel else None
+        # 2. 评论区匹配的规则
+        comment_rules = [rules_by_id[rule_id] for rule_id in route.comment_rule_ids if rule_id in rules_by_id]
+        if comment_rules:
+            logger.info(f'通过评论区映射找到频道 Chat ID: {route.parent_channel_db_id}')
 
-            for rule in comment_rules:
-                rules_to_process.append({
-                    'rule': rule,
-                    'is_comment': True,
-                    'parent_channel_id': mapping.channel_chat_id,
-                    'parent_channel_telegram_id': parent_channel_telegram_id
-                })
+        for rule in comment_rules:
+            if not rule.enable_comment_forward:
+                continue
+            rules_to_process.append({
+                'rule': rule,
+                'is_comment': True,
+                'parent_channel_id': route.parent_channel_db_id,
+                'parent_channel_telegram_id': route.parent_channel_telegram_id
+            })
 
-            if comment_rules:
-                logger.info(f'找到 {len(comment_rules)} 条评论区转发规则')
+        if comment_rules:
+            logger.info(f'找到 {len(comment_rules)} 条评论区转发规则')
 
         if not rules_to_process:
-            logger.info(f'聊天 {source_chat.name} 没有任何转发规则')
+            logger.info(f'聊天 {route.name} 没有任何转发规则')
             return
 
         # 记录消息信息
         if event.message.grouped_id:
-            logger.info(f'[用户] 收到媒体组消息 来自聊天: {source_chat.name} ({chat_id}) 组ID: {event.message.grouped_id}')
+            logger.info(f'[用户] 收到媒体组消息 来自聊天: {route.name} ({chat_id}) 组ID: {event.message.grouped_id}')
         else:
-            logger.info(f'[用户] 收到新消息 来自聊天: {source_chat.name} ({chat_id}) 内容: {event.message.text}')
+            logger.info(f'[用户] 收到新消息 来自聊天: {route.name} ({chat_id}) 内容: {event.message.text}')
 
-        # 3. 处理所有匹配的规则
+        # 3. 处理所有匹配的规则（同一目标聊天按顺序，不同目标聊天并发）
+        jobs = []
+        # 媒体元数据只解析一次，所有规则共用
+        media_infos = build_media_infos(album_messages or [event.message])
         for item in rules_to_process:
             rule = item['rule']
             target_chat = rule.target_chat
 
             # 构造 metadata
-            metadata = None
+            metadata = {'media_infos': media_infos}
+            if album_messages:
+                metadata['album_messages'] = album_messages
             if item['is_comment']:
-                metadata = {
-                    'comment_metadata': {
-                        'is_comment': True,
-                        'original_channel_chat_id': item['parent_channel_telegram_id'],
-                        'original_message_id': None  # 这个在 InitFilter 中通过 reply_to 获取
-                    }
+                metadata['comment_metadata'] = {
+                    'is_comment': True,
+                    'original_channel_chat_id': item['parent_channel_telegram_id'],
+                    'original_message_id': None  # 这个在 InitFilter 中通过 reply_to 获取
                 }
-                logger.info(f'处理评论区转发规则 ID: {rule.id} (从评论区 {source_chat.name} 转发到: {target_chat.name})')
+                logger.info(f'处理评论区转发规则 ID: {rule.id} (从评论区 {route.name} 转发到: {target_chat.name})')
             else:
-                logger.info(f'处理转发规则 ID: {rule.id} (从 {source_chat.name} 转发到: {target_chat.name})')
+                logger.info(f'处理转发规则 ID: {rule.id} (从 {route.name} 转发到: {target_chat.name})')
 
             # 调用处理函数
             if rule.use_bot:
-                await process_forward_rule(bot_client, event, str(chat_id), rule, metadata)
+                job = functools.partial(process_forward_rule, bot_client, event, str(chat_id), rule, metadata)
             else:
-                await user_handler.process_forward_rule(user_client, event, str(chat_id), rule, metadata)
+                job = functools.partial(user_handler.process_forward_rule, user_client, event, str(chat_id), rule, metadata)
+            jobs.append((target_chat.telegram_chat_id, job))
+
+        # 同一事件的所有规则共用媒体下载缓存，全部规则处理完后释放
+        async with media_cache.scope():
+            await rule_dispatcher.run_all(jobs)
         
     except Exception as e:
         logger.error(f'处理用户消息时发生错误: {str(e)}')
         logger.exception(e)  # 添加详细的错误堆栈
-    finally:
-        session.close()
 
 async def handle_bot_message(event, bot_client):
     """处理机器人客户端收到的消息（命令）"""
@@ -269,9 +256,3 @@ async def handle_bot_message(event, bot_client):
     except Exception as e:
         logger.error(f'处理机器人命令时发生错误: {str(e)}')
         logger.exception(e)
-
-async def clear_group_cache(group_key, delay=300):  # 5分钟后清除缓存
-    """清除已处理的媒体组记录"""
-    await asyncio.sleep(delay)
-    PROCESSED_GROUPS.discard(group_key) 
-
@@ -0,0 +1,144 @@
+"""
+数据库变更追踪模块
+======================================
+
+通过 SQLAlchemy Session 事件为每张表维护单调递增的版本号,
+进程内的内存缓存(规则路由索引、关键字匹配器等)只需比较版本号
+即可判断是否需要重建,而不必在热路径上查询数据库。
+
+版本号粒度:
+- 表级: 表中任意一行发生变化都会递增
+- 规则级: 带 rule_id 的表(以及 forward_rules 自身)按规则 ID 记录版本
+
+批量 query(...).delete()/update() 无法得知具体影响的规则,
+此时直接递增整张表的版本,所有规则的缓存都会失效。
+
+注意: 版本号只在本进程内有效,其他进程(如独立运行的 RSS 服务)
+的写入不会被感知。
+"""
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# 以规则ID作为版本键的表
+_RULE_KEY_ATTRS = {
+    'forward_rules': 'id',
+}
+
+
+class ChangeTracker:
+    """按表/规则记录数据版本号"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counter = 0
+        # 表内任意变更
+        self._table_versions = {}
+        # 整表失效(批量操作)
+        self._table_reset_versions = {}
+        # 规则级变更
+        self._key_versions = {}
+
+    def bump(self, table: str, key: Optional[int] = None) -> None:
+        """递增版本号
+
+        Args:
+            table: 表名
+            key: 规则ID,为 None 时整张表失效
+        """
+        with self._lock:
+            self._counter += 1
+            self._table_versions[table] = self._counter
+            if key is None:
+                self._table_reset_versions[table] = self._counter
+            else:
+                self._key_versions[(table, key)] = self._counter
+
+    def version(self, table: str, key: Optional[int] = None) -> int:
+        """获取版本号
+
+        Args:
+            table: 表名
+            key: 规则ID,为 None 时返回表级版本
+
+        Returns:
+            int: 版本号,数值变化即表示数据已变更
+        """
+        if key is None:
+            return self._table_versions.get(table, 0)
+        return max(
+            self._table_reset_versions.get(table, 0),
+            self._key_versions.get((table, key), 0)
+        )
+
+    def versions(self, *tables: str, key: Optional[int] = None) -> tuple:
+        """获取多张表的版本号组合,可直接用作缓存键"""
+        return tuple(self.version(table, key) for table in tables)
+
+
+def _change_key(instance) -> Optional[int]:
+    """获取变更实例对应的规则ID"""
+    table = instance.__table__.name
+    attr = _RULE_KEY_ATTRS.get(table, 'rule_id')
+    return getattr(instance, attr, None)
+
+
+def mark_changed(session, table: str, key: Optional[int] = None) -> None:
+    """记录无法通过 Session 事件感知的变更(如 INSERT OR IGNORE),提交后递增版本号
+
+    Args:
+        session: 执行写入的会话
+        table: 表名
+        key: 规则ID,为 None 时整张表失效
+    """
+    session.info.setdefault('pending_changes', set()).add((table, key))
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    """在 flush 后记录本次事务涉及的表和规则"""
+    pending = session.info.setdefault('pending_changes', set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(instance, '__table__', None)
+        if table is None:
+            continue
+        pending.add((table.name, _change_key(instance)))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_changes(orm_execute_state):
+    """记录批量 update/delete 涉及的表"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    pending = orm_execute_state.session.info.setdefault('pending_changes', set())
+    pending.add((mapper.local_table.name, None))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    """事务提交后递增版本号"""
+    pending = session.info.pop('pending_changes', None)
+    if not pending:
+        return
+    for table, key in pending:
+        change_tracker.bump(table, key)
+    logger.debug(f"数据变更已提交: {sorted(pending, key=str)}")
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_changes(session, previous_transaction):
+    """事务回滚后丢弃未提交的变更记录"""
+    if previous_transaction.parent is None:
+        session.info.pop('pending_changes', None)
+
+
+# 创建全局实例
+change_tracker = ChangeTracker()
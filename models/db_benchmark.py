@@ -0,0 +1,170 @@
+"""
+SQLite 调优基准测试
+======================================
+
+在临时目录中分别用 SQLite 默认参数和 sqlite_tuning 中的参数建库，对比：
+- 小事务提交速度（每次写入一行并提交，与按钮回调、命令处理的写入方式相同）
+- 按主键读取速度
+- 一个线程持续写入时另一个线程的读取速度及 database is locked 错误数
+
+用法:
+    python -m models.db_benchmark [--commits 2000] [--reads 20000] [--seconds 3]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from models.sqlite_tuning import apply_sqlite_pragmas, get_engine_options, get_sqlite_pragmas
+
+# SQLite 默认参数（与调优前的 get_engine 相同）
+BASELINE_PRAGMAS = {}
+
+
+def _create_engine(path: str, pragmas: dict):
+    if pragmas:
+        engine = create_engine(f'sqlite:///{path}', **get_engine_options())
+        apply_sqlite_pragmas(engine, pragmas)
+    else:
+        engine = create_engine(f'sqlite:///{path}', connect_args={'check_same_thread': False})
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE bench (id INTEGER PRIMARY KEY, rule_id INTEGER, keyword VARCHAR)'
+        ))
+    return engine
+
+
+def bench_commits(engine, count: int) -> float:
+    """每次插入一行并提交，返回每秒提交次数"""
+    start = time.perf_counter()
+    for i in range(count):
+        with engine.begin() as connection:
+            connection.execute(
+                text('INSERT INTO bench (rule_id, keyword) VALUES (:rule_id, :keyword)'),
+                {'rule_id': i % 50, 'keyword': f'keyword_{i}'}
+            )
+    return count / (time.perf_counter() - start)
+
+
+def bench_reads(engine, count: int) -> float:
+    """按主键读取，返回每秒查询次数"""
+    with engine.connect() as connection:
+        total = connection.execute(text('SELECT COUNT(*) FROM bench')).scalar() or 1
+        start = time.perf_counter()
+        for i in range(count):
+            connection.execute(text('SELECT * FROM bench WHERE id = :id'), {'id': i % total + 1}).fetchone()
+    return count / (time.perf_counter() - start)
+
+
+def bench_mixed(path: str, pragmas: dict, seconds: float):
+    """
+    写线程持续提交的同时，读线程用独立的 sqlite3 连接（模拟 RSS 服务进程）读取
+
+    Returns:
+        (写入次数/秒, 读取次数/秒, 锁错误次数)
+    """
+    stop = threading.Event()
+    counters = {'writes': 0, 'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def connect():
+        # 不设置 busy_timeout 时 sqlite3 模块默认等待 5 秒
+        connection = sqlite3.connect(path, timeout=pragmas.get('busy_timeout', 5000) / 1000,
+                                     check_same_thread=False)
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name}={value}')
+        return connection
+
+    def writer():
+        connection = connect()
+        i = 0
+        while not stop.is_set():
+            try:
+                with connection:
+                    connection.execute('INSERT INTO bench (rule_id, keyword) VALUES (?, ?)', (i % 50, f'mixed_{i}'))
+                with lock:
+                    counters['writes'] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counters['errors'] += 1
+            i += 1
+        connection.close()
+
+    def reader():
+        connection = connect()
+        while not stop.is_set():
+            try:
+                connection.execute('SELECT COUNT(*) FROM bench WHERE rule_id = 7').fetchone()
+                with lock:
+                    counters['reads'] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counters['errors'] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return counters['writes'] / seconds, counters['reads'] / seconds, counters['errors']
+
+
+def run(label: str, pragmas: dict, args) -> dict:
+    directory = tempfile.mkdtemp(prefix='forward_db_bench_')
+    try:
+        path = os.path.join(directory, 'bench.db')
+        engine = _create_engine(path, pragmas)
+        try:
+            commits = bench_commits(engine, args.commits)
+            reads = bench_reads(engine, args.reads)
+        except OperationalError as e:
+            print(f'{label}: 测试失败 {e}')
+            return {}
+        finally:
+            engine.dispose()
+        mixed_writes, mixed_reads, errors = bench_mixed(path, pragmas, args.seconds)
+        return {
+            'label': label,
+            'commits': commits,
+            'reads': reads,
+            'mixed_writes': mixed_writes,
+            'mixed_reads': mixed_reads,
+            'errors': errors,
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite 调优前后的读写性能对比')
+    parser.add_argument('--commits', type=int, default=2000, help='小事务提交次数')
+    parser.add_argument('--reads', type=int, default=20000, help='主键读取次数')
+    parser.add_argument('--seconds', type=float, default=3, help='并发读写测试时长 (秒)')
+    args = parser.parse_args()
+
+    results = [
+        run('默认参数', BASELINE_PRAGMAS, args),
+        run('调优参数', get_sqlite_pragmas(), args),
+    ]
+    print(f'调优参数: {get_sqlite_pragmas()}')
+    print(f'{"":<10}{"提交/秒":>12}{"读取/秒":>12}{"并发写/秒":>12}{"并发读/秒":>12}{"锁错误":>8}')
+    for result in results:
+        if not result:
+            continue
+        print(
+            f'{result["label"]:<10}{result["commits"]:>12.0f}{result["reads"]:>12.0f}'
+            f'{result["mixed_writes"]:>12.0f}{result["mixed_reads"]:>12.0f}{result["errors"]:>8}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -10,7 +10,8 @@ from pathlib import Path
 from dotenv import load_dotenv
 from ufb.ufb_client import UFBClient
 from models.models import get_session
-from sqlalchemy import text
+from sqlalchemy import text, insert
+from models.change_tracker import mark_changed
 from enums.enums import ForwardMode, PreviewMode, MessageMode, AddMode, HandleMode
 
 logger = logging.getLogger(__name__)
@@ -240,23 +241,10 @@ class DBOperations:
                             Keyword.rule_id == rule.id
                         ).delete()
                         
-                        # 添加普通关键字
-                        for keyword in keywords_config.get('keywords', []):
-                            new_keyword = Keyword(
-                                rule_id=rule.id,
-                                keyword=keyword,
-                                is_regex=False
-                            )
-                            session.add(new_keyword)
-                            
-                        # 添加正则关键字
-                        for pattern in keywords_config.get('regexPatterns', []):
-                            new_keyword = Keyword(
-                                rule_id=rule.id,
-                                keyword=pattern,
-                                is_regex=True
-                            )
-                            session.add(new_keyword)
+                        # 批量添加普通关键字和正则关键字（is_blacklist 使用列默认值）
+                        rows = [(keyword, False, True) for keyword in keywords_config.get('keywords', [])]
+                        rows += [(pattern, True, True) for pattern in keywords_config.get('regexPatterns', [])]
+                        await self.bulk_add_keywords(session, rule.id, rows, match_fields=('is_regex',))
                         
                         session.commit()
                         logger.info(f"已从JSON同步关键字到规则 {rule.id} (domain: {rule.ufb_domain})")
@@ -277,96 +265,95 @@ class DBOperations:
         Returns:
             tuple: (成功数量, 重复数量)
         """
-        success_count = 0
-        duplicate_count = 0
-
         # 获取当前规则
         rule = session.query(ForwardRule).get(rule_id)
         if not rule:
             logger.error(f"规则ID {rule_id} 不存在")
             return 0, 0
 
-        # 处理单个规则的关键字添加
-        for keyword in keywords:
-            try:
-                # 检查是否存在相同的关键字（考虑黑白名单）
-                existing_keyword = session.query(Keyword).filter(
-                    Keyword.rule_id == rule_id,
-                    Keyword.keyword == keyword,
-                    Keyword.is_blacklist == is_blacklist
-                ).first()
-
-                if existing_keyword:
-                    duplicate_count += 1
-                    continue
-
-                new_keyword = Keyword(
-                    rule_id=rule_id,
-                    keyword=keyword,
-                    is_regex=is_regex,
-                    is_blacklist=is_blacklist
-                )
-                session.add(new_keyword)
-                session.flush()
-                success_count += 1
-            except Exception as e:
-                logger.error(f"添加关键字时出错: {str(e)}")
-                session.rollback()
-                duplicate_count += 1
-                continue
+        rows = [(keyword, is_regex, is_blacklist) for keyword in keywords]
+        success_count, duplicate_count = await self.bulk_add_keywords(session, rule_id, rows)
 
         # 检查是否启用了同步功能
         if rule.enable_sync:
             logger.info(f"规则 {rule_id} 启用了同步功能，正在同步关键字到关联规则")
             # 获取需要同步的规则列表
             sync_rules = session.query(RuleSync).filter(RuleSync.rule_id == rule_id).all()
-            
+
             # 为每个同步规则添加相同的关键字
             for sync_rule in sync_rules:
                 sync_rule_id = sync_rule.sync_rule_id
                 logger.info(f"正在同步关键字到规则 {sync_rule_id}")
-                
+
                 # 获取同步目标规则
                 target_rule = session.query(ForwardRule).get(sync_rule_id)
                 if not target_rule:
                     logger.warning(f"同步目标规则 {sync_rule_id} 不存在，跳过")
                     continue
-                
-                # 为同步目标规则添加关键字
-                sync_success = 0
-                sync_duplicate = 0
-                for keyword in keywords:
-                    try:
-                        # 检查同步规则是否已有此关键字
-                        existing_keyword = session.query(Keyword).filter(
-                            Keyword.rule_id == sync_rule_id,
-                            Keyword.keyword == keyword,
-                            Keyword.is_blacklist == is_blacklist
-                        ).first()
-                        
-                        if existing_keyword:
-                            sync_duplicate += 1
-                            continue
-                            
-                        # 添加新关键字到同步规则
-                        new_keyword = Keyword(
-                            rule_id=sync_rule_id,
-                            keyword=keyword,
-                            is_regex=is_regex,
-                            is_blacklist=is_blacklist
-                        )
-                        session.add(new_keyword)
-                        session.flush()
-                        sync_success += 1
-                    except Exception as e:
-                        logger.error(f"同步关键字到规则 {sync_rule_id} 时出错: {str(e)}")
-                        continue
-                
+
+                try:
+                    sync_success, sync_duplicate = await self.bulk_add_keywords(session, sync_rule_id, rows)
+                except Exception as e:
+                    logger.error(f"同步关键字到规则 {sync_rule_id} 时出错: {str(e)}")
+                    continue
+
                 logger.info(f"同步规则 {sync_rule_id} 的结果: 成功={sync_success}, 重复={sync_duplicate}")
 
         await self.sync_to_server(session, rule_id)
         return success_count, duplicate_count
 
+    async def bulk_add_keywords(self, session, rule_id, rows, match_fields=('is_blacklist',)):
+        """批量添加关键字到单个规则（不处理同步规则和UFB同步）
+
+        先一次性读取规则已有的关键字，在内存中去重，再用一条
+        INSERT OR IGNORE 批量写入，避免逐条查询和 flush
+
+        Args:
+            session: 数据库会话
+            rule_id: 规则ID
+            rows: [(关键字, 是否正则, 是否黑名单), ...]
+            match_fields: 除关键字外判断重复时比较的字段，可选 'is_regex'、'is_blacklist'
+
+        Returns:
+            tuple: (成功数量, 重复数量)
+        """
+        def dedupe_key(keyword, is_regex, is_blacklist):
+            values = {'is_regex': bool(is_regex), 'is_blacklist': bool(is_blacklist)}
+            return (keyword,) + tuple(values[field] for field in match_fields)
+
+        existing = session.query(Keyword.keyword, Keyword.is_regex, Keyword.is_blacklist).filter(
+            Keyword.rule_id == rule_id
+        ).all()
+        seen = {dedupe_key(*row) for row in existing}
+
+        new_rows = []
+        duplicate_count = 0
+        for keyword, is_regex, is_blacklist in rows:
+            key = dedupe_key(keyword, is_regex, is_blacklist)
+            if key in seen:
+                duplicate_count += 1
+                continue
+            seen.add(key)
+            new_rows.append({
+                'rule_id': rule_id,
+                'keyword': keyword,
+                'is_regex': bool(is_regex),
+                'is_blacklist': bool(is_blacklist)
+            })
+
+        if new_rows:
+            # 唯一约束冲突的行直接忽略，不中断整批写入
+            result = session.execute(insert(Keyword.__table__).prefix_with('OR IGNORE'), new_rows)
+            inserted = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(new_rows)
+            duplicate_count += len(new_rows) - inserted
+            # Core 语句不会触发 flush 事件，手动记录变更以便提交后刷新关键字缓存
+            mark_changed(session, 'keywords', rule_id)
+        else:
+            inserted = 0
+
+        logger.info(f"规则 {rule_id} 批量添加关键字: 成功={inserted}, 重复={duplicate_count}")
+        return inserted, duplicate_count
+
     async def get_keywords(self, session, rule_id, add_mode):
         """获取规则的所有关键字
         
@@ -829,6 +816,8 @@ class DBOperations:
                         {"id": extension[0]}
                     )
             
+            # 文本SQL删除不会触发会话事件，手动记录变更使媒体策略缓存失效
+            mark_changed(session, 'media_extensions', rule_id)
             session.commit()
             return True, f"成功删除 {len(indices)} 个媒体扩展名"
         except Exception as e:
@@ -6,6 +6,7 @@ from datetime import datetime
 import logging
 import os
 from dotenv import load_dotenv
+from models.sqlite_tuning import apply_sqlite_pragmas, get_engine_options
 
 load_dotenv()
 Base = declarative_base()
@@ -21,6 +22,8 @@ class Chat(Base):
     telegram_chat_id = Column(String, unique=True, nullable=False)
     name = Column(String, nullable=True)
     current_add_id = Column(String, nullable=True)
+    # 发送时实际可以解析的ID形式（如补上 -100 前缀），由实体缓存写回
+    resolved_chat_id = Column(String, nullable=True)
 
     # 关系
     source_rules = relationship('ForwardRule', foreign_keys='ForwardRule.source_chat_id', back_populates='source_chat')
@@ -406,6 +409,10 @@ def migrate_db(engine):
         'is_blacklist': 'ALTER TABLE keywords ADD COLUMN is_blacklist BOOLEAN DEFAULT TRUE',
     }
 
+    chats_new_columns = {
+        'resolved_chat_id': 'ALTER TABLE chats ADD COLUMN resolved_chat_id VARCHAR DEFAULT NULL',
+    }
+
     # 添加缺失的列
     with engine.connect() as connection:
         # 添加forward_rules表的列
@@ -427,6 +434,16 @@ def migrate_db(engine):
                 except Exception as e:
                     logging.error(f'添加列 {column} 时出错: {str(e)}')
 
+        # 添加chats表的列
+        chat_columns = {column['name'] for column in inspector.get_columns('chats')}
+        for column, sql in chats_new_columns.items():
+            if column not in chat_columns:
+                try:
+                    connection.execute(text(sql))
+                    logging.info(f'已添加列: {column}')
+                except Exception as e:
+                    logging.error(f'添加列 {column} 时出错: {str(e)}')
+
         #先检查forward_rules表的列的forward_mode是否存在
         if 'forward_mode' not in forward_rules_columns:
             # 修改forward_rules表的列mode为forward_mode
@@ -504,8 +521,10 @@ def get_engine():
         _engine = create_engine(
             'sqlite:///./db/forward.db',
             # SQLite是本地文件数据库,不需要pool_pre_ping(仅用于网络数据库)
-            connect_args={'check_same_thread': False}  # SQLite多线程支持
+            **get_engine_options()
         )
+        # 开启WAL并设置PRAGMA,避免与RSS服务同时写入时出现 database is locked
+        apply_sqlite_pragmas(_engine)
         logging.info("创建全局单例数据库engine")
     return _engine
 
@@ -527,6 +546,9 @@ def get_session():
 # 添加上下文管理器便于事务控制
 from contextlib import contextmanager
 
+# 注册会话事件，记录数据变更版本供内存缓存失效使用
+import models.change_tracker  # noqa: F401
+
 @contextmanager
 def session_scope():
     """提供事务上下文管理器
@@ -1,98 +1,107 @@
-import json
+import asyncio
 import logging
+import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from ..models.entry import Entry
 from ..core.config import settings
+from .entry_store import entry_store
+from ..services.feed_cache import feed_cache
 
 logger = logging.getLogger(__name__)
 
+# 条目存储的读写（SQLite、删除媒体文件）都在这个线程中依次执行，不阻塞事件循环
+_store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='entry-store')
+
+async def _run_in_store(func, *args):
+    """在条目存储线程中执行同步操作"""
+    return await asyncio.get_running_loop().run_in_executor(_store_executor, func, *args)
+
 # 确保数据存储目录存在
 def ensure_storage_exists():
     """确保数据存储目录存在"""
     entries_dir = Path(settings.DATA_PATH)
     entries_dir.mkdir(parents=True, exist_ok=True)
 
-# 获取规则对应的条目存储文件路径
-def get_rule_entries_path(rule_id: int) -> Path:
-    """获取规则对应的条目存储文件路径"""
-    # 使用规则特定的数据目录
-    rule_data_path = settings.get_rule_data_path(rule_id)
-    return Path(rule_data_path) / "entries.json"
-
 async def get_entries(rule_id: int, limit: int = 100, offset: int = 0) -> List[Entry]:
-    """获取规则对应的条目"""
+    """获取规则对应的条目（按发布时间倒序）"""
     try:
-        file_path = get_rule_entries_path(rule_id)
-        
-        # 如果文件不存在，返回空列表
-        if not file_path.exists():
-            return []
-        
-        # 读取文件内容
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            
-        # 将数据转换为Entry对象
-        entries = [Entry(**entry) for entry in data]
-        
-        # 按发布时间排序（新的在前）
-        entries.sort(key=lambda x: x.published, reverse=True)
-        
-        # 应用分页
-        return entries[offset:offset + limit]
+        return [Entry(**entry) for entry in await _run_in_store(entry_store.list, rule_id, limit, offset)]
     except Exception as e:
         logger.error(f"获取条目时出错: {str(e)}")
         return []
 
-async def create_entry(entry: Entry) -> bool:
-    """创建新条目"""
+async def count_entries(rule_id: int) -> int:
+    """获取规则对应的条目数量"""
+    try:
+        return await _run_in_store(entry_store.count, rule_id)
+    except Exception as e:
+        logger.error(f"获取条目数量时出错: {str(e)}")
+        return 0
+
+def _delete_entry_media(rule_id: int, entries: List[dict]) -> None:
+    """删除被清理条目的媒体文件"""
+    media_dir = Path(settings.get_rule_media_path(rule_id))
+    for entry in entries:
+        for media in entry.get('media') or []:
+            filename = media.get('filename') if isinstance(media, dict) else None
+            if not filename:
+                continue
+            media_path = media_dir / filename
+            if media_path.exists():
+                try:
+                    os.remove(media_path)
+                    logger.info(f"已删除媒体文件: {media_path}")
+                except Exception as e:
+                    logger.error(f"删除媒体文件失败: {media_path}, 错误: {str(e)}")
+        logger.info(f"已删除条目: {entry.get('id')}")
+
+def _get_max_items(rule_id: int) -> int:
+    """获取规则的RSS配置中的最大条目数量"""
+    try:
+        from models.models import get_session, RSSConfig
+        session = get_session()
+        try:
+            rss_config = session.query(RSSConfig).filter(RSSConfig.rule_id == rule_id).first()
+            return rss_config.max_items if rss_config and hasattr(rss_config, 'max_items') else 50
+        finally:
+            session.close()
+    except Exception as e:
+        logger.warning(f"获取RSS配置失败，使用默认最大条目数量(50): {str(e)}")
+        return 50
+
+def _store_entry(rule_id: int, data: dict, max_items: Optional[int]) -> None:
+    """写入条目并只保留最新的 max_items 个条目，在条目存储线程中执行"""
+    entry_store.append(rule_id, data)
+
+    # 限制条目数量，保留最新的N条
+    if max_items is None:
+        max_items = _get_max_items(rule_id)
+    removed = entry_store.trim(rule_id, max_items)
+    if removed:
+        logger.info(f"条目数量超过限制({max_items})，已删除 {len(removed)} 个最早的条目")
+        _delete_entry_media(rule_id, removed)
+
+async def create_entry(entry: Entry, max_items: Optional[int] = None) -> bool:
+    """创建新条目，超出最大条目数量时删除最早的条目及其媒体文件
+
+    Args:
+        entry: 条目
+        max_items: 最大条目数量，未提供时从规则的RSS配置中读取
+    """
     try:
         # 设置条目ID和创建时间
         if not entry.id:
             entry.id = str(uuid.uuid4())
         
         entry.created_at = datetime.now().isoformat()
-        
-        # 获取规则对应的条目
-        file_path = get_rule_entries_path(entry.rule_id)
-        
-        entries = []
-        # 如果文件已存在，读取现有条目
-        if file_path.exists():
-            with open(file_path, 'r', encoding='utf-8') as file:
-                try:
-                    entries = json.load(file)
-                except json.JSONDecodeError:
-                    logger.warning(f"解析条目文件时出错，将创建新文件: {file_path}")
-                    entries = []
-        
-        # 转换Entry对象为字典并添加到列表
-        entries.append(entry.dict())
-        
-        # 获取规则的RSS配置，获取最大条目数量
-        try:
-            from models.models import get_session, RSSConfig
-            session = get_session()
-            rss_config = session.query(RSSConfig).filter(RSSConfig.rule_id == entry.rule_id).first()
-            max_items = rss_config.max_items if rss_config and hasattr(rss_config, 'max_items') else 50
-            session.close()
-        except Exception as e:
-            logger.warning(f"获取RSS配置失败，使用默认最大条目数量(50): {str(e)}")
-            max_items = 50
-        
-        # 限制条目数量，保留最新的N条
-        if len(entries) > max_items:
-            # 按发布时间排序（新的在前）
-            entries.sort(key=lambda x: x.get('published', ''), reverse=True)
-            entries = entries[:max_items]
-        
-        # 保存到文件
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump(entries, file, ensure_ascii=False, indent=2)
-        
+
+        await _run_in_store(_store_entry, entry.rule_id, entry.dict(), max_items)
+        feed_cache.invalidate(entry.rule_id)
+
         return True
     except Exception as e:
         logger.error(f"创建条目时出错: {str(e)}")
@@ -101,32 +110,10 @@ async def create_entry(entry: Entry) -> bool:
 async def update_entry(rule_id: int, entry_id: str, updated_data: Dict[str, Any]) -> bool:
     """更新条目"""
     try:
-        file_path = get_rule_entries_path(rule_id)
-        
-        # 如果文件不存在，返回False
-        if not file_path.exists():
-            return False
-        
-        # 读取文件内容
-        with open(file_path, 'r', encoding='utf-8') as file:
-            entries = json.load(file)
-        
-        # 查找并更新条目
-        found = False
-        for i, entry in enumerate(entries):
-            if entry.get('id') == entry_id:
-                entries[i].update(updated_data)
-                found = True
-                break
-        
-        if not found:
-            return False
-        
-        # 保存到文件
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump(entries, file, ensure_ascii=False, indent=2)
-        
-        return True
+        updated = await _run_in_store(entry_store.update, rule_id, entry_id, updated_data)
+        if updated:
+            feed_cache.invalidate(rule_id)
+        return updated
     except Exception as e:
         logger.error(f"更新条目时出错: {str(e)}")
         return False
@@ -134,28 +121,10 @@ async def update_entry(rule_id: int, entry_id: str, updated_data: Dict[str, Any]
 async def delete_entry(rule_id: int, entry_id: str) -> bool:
     """删除条目"""
     try:
-        file_path = get_rule_entries_path(rule_id)
-        
-        # 如果文件不存在，返回False
-        if not file_path.exists():
-            return False
-        
-        # 读取文件内容
-        with open(file_path, 'r', encoding='utf-8') as file:
-            entries = json.load(file)
-        
-        # 查找并删除条目
-        original_length = len(entries)
-        entries = [entry for entry in entries if entry.get('id') != entry_id]
-        
-        if len(entries) == original_length:
-            return False  # 没有找到对应ID的条目
-        
-        # 保存到文件
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump(entries, file, ensure_ascii=False, indent=2)
-        
-        return True
+        deleted = await _run_in_store(entry_store.delete, rule_id, entry_id)
+        if deleted:
+            feed_cache.invalidate(rule_id)
+        return deleted
     except Exception as e:
         logger.error(f"删除条目时出错: {str(e)}")
-        return False 
\ No newline at end of file
+        return False
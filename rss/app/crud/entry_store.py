@@ -0,0 +1,213 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 每个规则的条目数据库文件名，与旧的 entries.json 放在同一目录
+ENTRIES_DB_NAME = "entries.db"
+LEGACY_ENTRIES_NAME = "entries.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    published TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_published ON entries (published, seq);
+CREATE TABLE IF NOT EXISTS feed_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    modified_at REAL NOT NULL
+);
+INSERT OR IGNORE INTO feed_state (id, version, modified_at) VALUES (1, 0, 0);
+"""
+
+
+class EntryStore:
+    """
+    RSS条目存储
+
+    每个规则一个 SQLite 文件 (rule_data_dir/entries.db)，按 published 建立索引：
+    - 新增条目只插入一行，不再读写整个 JSON 文件
+    - 按发布时间分页读取走索引
+    - 超出 max_items 时按发布时间删除最旧的条目
+    - 每次写入递增 feed_state 中的版本号，供 Feed 渲染缓存判断是否需要重新生成
+    首次打开规则的存储时，会把旧的 entries.json 导入数据库并重命名为 entries.json.migrated
+
+    写入均在 BEGIN IMMEDIATE 事务中进行，机器人进程 (RSS_INGEST_MODE=local) 与RSS服务进程可以同时访问。
+    """
+
+    def __init__(self):
+        self._connections: Dict[int, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, rule_id: int) -> sqlite3.Connection:
+        connection = self._connections.get(rule_id)
+        if connection is not None and self._db_path(rule_id).exists():
+            return connection
+
+        with self._lock:
+            connection = self._connections.get(rule_id)
+            if connection is not None:
+                if self._db_path(rule_id).exists():
+                    return connection
+                # 规则数据目录已被其他进程删除，重新创建数据库
+                connection.close()
+                del self._connections[rule_id]
+
+            data_dir = Path(settings.get_rule_data_path(rule_id))
+            connection = sqlite3.connect(
+                str(data_dir / ENTRIES_DB_NAME),
+                timeout=10,
+                check_same_thread=False,
+                isolation_level=None  # 自动提交，需要事务时显式 BEGIN
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._migrate_legacy(connection, data_dir / LEGACY_ENTRIES_NAME)
+            self._connections[rule_id] = connection
+            return connection
+
+    @staticmethod
+    def _db_path(rule_id: int) -> Path:
+        return Path(settings.DATA_PATH) / str(rule_id) / ENTRIES_DB_NAME
+
+    @staticmethod
+    def _migrate_legacy(connection: sqlite3.Connection, legacy_path: Path) -> None:
+        """导入旧的 entries.json"""
+        if not legacy_path.exists():
+            return
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"读取旧条目文件失败，跳过迁移: {legacy_path}, {str(e)}")
+            return
+
+        # 旧文件按追加顺序保存，导入时保持原顺序
+        rows = [
+            (item.get('id'), item.get('published') or '', json.dumps(item, ensure_ascii=False))
+            for item in data if isinstance(item, dict) and item.get('id')
+        ]
+        with connection:
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT OR IGNORE INTO entries (id, published, data) VALUES (?, ?, ?)", rows
+            )
+            EntryStore._bump_version(connection)
+        legacy_path.rename(legacy_path.with_name(LEGACY_ENTRIES_NAME + ".migrated"))
+        logger.info(f"已将 {len(rows)} 个条目从 {legacy_path} 迁移到 {ENTRIES_DB_NAME}")
+
+    @staticmethod
+    def _bump_version(connection: sqlite3.Connection) -> None:
+        """在当前事务中递增条目版本号"""
+        connection.execute(
+            "UPDATE feed_state SET version = version + 1, modified_at = ? WHERE id = 1", (time.time(),)
+        )
+
+    def state(self, rule_id: int) -> Tuple[int, float]:
+        """
+        获取条目版本号和最后修改时间
+
+        Returns:
+            Tuple[int, float]: (版本号, 最后修改的时间戳)，从未写入时为 (0, 0)
+        """
+        connection = self._connect(rule_id)
+        row = connection.execute("SELECT version, modified_at FROM feed_state WHERE id = 1").fetchone()
+        return (row[0], row[1]) if row else (0, 0.0)
+
+    def append(self, rule_id: int, entry: dict) -> None:
+        """添加条目，相同ID的条目会被替换"""
+        connection = self._connect(rule_id)
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (id, published, data) VALUES (?, ?, ?)",
+                (entry['id'], entry.get('published') or '', json.dumps(entry, ensure_ascii=False))
+            )
+            self._bump_version(connection)
+
+    def list(self, rule_id: int, limit: int = 100, offset: int = 0) -> List[dict]:
+        """按发布时间倒序读取条目"""
+        connection = self._connect(rule_id)
+        rows = connection.execute(
+            "SELECT data FROM entries ORDER BY published DESC, seq DESC LIMIT ? OFFSET ?",
+            (limit, offset)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, rule_id: int, entry_id: str) -> Optional[dict]:
+        connection = self._connect(rule_id)
+        row = connection.execute("SELECT data FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self, rule_id: int) -> int:
+        connection = self._connect(rule_id)
+        return connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def update(self, rule_id: int, entry_id: str, updated_data: dict) -> bool:
+        """更新条目字段"""
+        connection = self._connect(rule_id)
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute("SELECT data FROM entries WHERE id = ?", (entry_id,)).fetchone()
+            if not row:
+                return False
+            entry = json.loads(row[0])
+            entry.update(updated_data)
+            connection.execute(
+                "UPDATE entries SET published = ?, data = ? WHERE id = ?",
+                (entry.get('published') or '', json.dumps(entry, ensure_ascii=False), entry_id)
+            )
+            self._bump_version(connection)
+        return True
+
+    def delete(self, rule_id: int, entry_id: str) -> bool:
+        connection = self._connect(rule_id)
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            cursor = connection.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+            if cursor.rowcount <= 0:
+                return False
+            self._bump_version(connection)
+        return True
+
+    def trim(self, rule_id: int, max_items: int) -> List[dict]:
+        """
+        只保留最新的 max_items 个条目
+
+        Returns:
+            List[dict]: 被删除的条目（调用方可据此删除媒体文件）
+        """
+        connection = self._connect(rule_id)
+        max_items = max(0, max_items)
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            rows = connection.execute(
+                "SELECT seq, data FROM entries ORDER BY published DESC, seq DESC LIMIT -1 OFFSET ?",
+                (max_items,)
+            ).fetchall()
+            if rows:
+                connection.executemany("DELETE FROM entries WHERE seq = ?", [(row[0],) for row in rows])
+                self._bump_version(connection)
+        return [json.loads(row[1]) for row in rows]
+
+    def close(self, rule_id: int) -> None:
+        """关闭规则的数据库连接（删除规则数据目录前调用）"""
+        with self._lock:
+            connection = self._connections.pop(rule_id, None)
+        if connection is not None:
+            connection.close()
+
+
+# 创建全局实例
+entry_store = EntryStore()
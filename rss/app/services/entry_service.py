@@ -0,0 +1,273 @@
+import json
+import logging
+import os
+import re
+from typing import Any, Dict
+
+from ai import ai_executor
+from models.models import get_session, RSSConfig, ForwardRule, RSSPattern
+from ..core.config import settings
+from ..crud.entry import create_entry
+from ..models.entry import Entry
+
+logger = logging.getLogger(__name__)
+
+
+async def add_entry(rule_id: int, entry_data: Dict[str, Any]) -> Dict[str, str]:
+    """
+    添加新的条目：AI提取或正则提取标题和内容、写入条目存储并清理超出数量的条目及其媒体文件
+
+    Args:
+        rule_id: 规则ID
+        entry_data: RSS过滤器生成的条目数据
+
+    Returns:
+        Dict[str, str]: 处理结果
+
+    Raises:
+        pydantic.ValidationError: 条目数据无效
+        RuntimeError: 写入条目失败
+    """
+    # 记录接收到的数据摘要
+    media_count = len(entry_data.get("media", []))
+    has_context = "context" in entry_data and entry_data["context"] is not None
+    logger.info(f"接收到新条目数据: 规则ID={rule_id}, 标题='{entry_data.get('title', '无标题')}', 媒体数量={media_count}, 包含上下文={has_context}")
+
+    # 获取 RSS 配置信息，确定最大条目数量
+    session = get_session()
+    max_items = None
+    try:
+        rss_config = session.query(RSSConfig).filter(RSSConfig.rule_id == rule_id).first()
+        max_items = rss_config.max_items
+    finally:
+        session.close()
+
+    # 验证媒体数据
+    if media_count > 0:
+        media_filenames = []
+        for m in entry_data.get("media", []):
+            if isinstance(m, dict):
+                media_filenames.append(m.get('filename', '未知'))
+            else:
+                media_filenames.append(getattr(m, 'filename', '未知'))
+        logger.info(f"媒体文件列表: {media_filenames}")
+
+        # 确保媒体文件存在
+        for media in entry_data.get("media", []):
+            if isinstance(media, dict):
+                filename = media.get("filename", "")
+            else:
+                filename = getattr(media, "filename", "")
+
+            media_path = os.path.join(settings.MEDIA_PATH, filename)
+            if not os.path.exists(media_path):
+                logger.warning(f"媒体文件不存在: {media_path}")
+
+    # 记录上下文信息
+    if has_context:
+        logger.info(f"条目包含原始上下文对象，属性: {', '.join(entry_data['context'].keys()) if hasattr(entry_data['context'], 'keys') else '无法获取属性'}")
+
+    # 确保必要的字段存在
+    entry_data["rule_id"] = rule_id
+    if not entry_data.get("message_id"):
+        entry_data["message_id"] = entry_data.get("id", "")
+
+    # 转换为Entry对象，条目ID由规则ID、来源聊天ID和消息ID组成，重复提交的同一条消息会替换原有条目
+    # (评论区消息与频道消息经过同一规则，消息ID只在各自聊天内唯一)
+    message_id = entry_data["message_id"]
+    chat_id = entry_data.get("chat_id")
+    entry = Entry(
+        id=f"{rule_id}:{chat_id}:{message_id}" if chat_id and message_id else None,
+        rule_id=rule_id,
+        message_id=message_id,
+        title=entry_data.get("title", "新消息"),
+        content=entry_data.get("content", ""),
+        published=entry_data.get("published"),
+        author=entry_data.get("author", ""),
+        link=entry_data.get("link", ""),
+        media=entry_data.get("media", []),
+        original_link=entry_data.get("original_link"),
+        sender_info=entry_data.get("sender_info")
+    )
+
+
+
+    # 使用AI提取内容
+    if rss_config.is_ai_extract:
+        try:
+            rule = session.query(ForwardRule).filter(ForwardRule.id == rule_id).first()
+            json_text = await ai_executor.process(
+                rule.ai_model,
+                entry.content or "",
+                prompt=rss_config.ai_extract_prompt
+            )
+            logger.info(f"AI提取内容: {json_text}")
+
+            # 去除代码块标记，如果有的话
+            if "```" in json_text:
+                # 移除所有代码块标记，包括语言标识和结束标记
+                json_text = re.sub(r'```(\w+)?\n', '', json_text)  # 开始标记（带可选的语言标识）
+                json_text = re.sub(r'\n```', '', json_text)  # 结束标记
+                json_text = json_text.strip()
+                logger.info(f"去除代码块标记后的内容: {json_text}")
+
+            # 解析JSON数据
+            try:
+                json_data = json.loads(json_text)
+                logger.info(f"解析后的JSON数据: {json_data}")
+
+                # 提取标题和内容
+                title = json_data.get("title", "")
+                content = json_data.get("content", "")
+                entry.title = title
+                entry.content = content
+            except json.JSONDecodeError as e:
+                logger.error(f"JSON解析错误: {str(e)}, 原始文本: {json_text}")
+                # 尝试其他清理方式
+                try:
+                    # 匹配大括号之间的JSON内容
+                    json_match = re.search(r'\{.*\}', json_text, re.DOTALL)
+                    if json_match:
+                        clean_json = json_match.group(0)
+                        logger.info(f"尝试提取JSON: {clean_json}")
+                        json_data = json.loads(clean_json)
+
+                        # 提取标题和内容
+                        title = json_data.get("title", "")
+                        content = json_data.get("content", "")
+                        entry.title = title
+                        entry.content = content
+                        logger.info(f"成功从文本中提取JSON数据")
+                    else:
+                        logger.error("无法从AI响应中提取有效JSON")
+                except Exception as inner_e:
+                    logger.error(f"尝试二次解析JSON时出错: {str(inner_e)}")
+            except Exception as e:
+                logger.error(f"处理JSON数据时出错: {str(e)}")
+        except Exception as e:
+            logger.error(f"AI提取内容时出错: {str(e)}")
+        finally:
+            if session:
+                session.close()
+
+    logger.info(f"启用自定义标题模式: {rss_config.enable_custom_title_pattern}, 启用自定义内容模式: {rss_config.enable_custom_content_pattern}")
+    if rss_config.enable_custom_title_pattern or rss_config.enable_custom_content_pattern:
+        try:
+            # 获取原始内容
+            original_content = entry.content or ""
+            original_title = entry.title
+
+            # 如果启用了标题正则表达式提取
+            if rss_config.enable_custom_title_pattern:
+                # 直接使用会话查询标题模式并按优先级排序
+                title_patterns = session.query(RSSPattern).filter_by(
+                    rss_config_id=rss_config.id, 
+                    pattern_type='title'
+                ).order_by(RSSPattern.priority).all()
+
+                logger.info(f"找到 {len(title_patterns)} 个标题模式")
+
+                # 设置初始处理文本
+                processing_content = original_content
+                logger.info(f"标题提取初始文本: {processing_content[:100]}..." if len(processing_content) > 100 else processing_content)
+
+                # 依次应用每个模式，每次处理后的结果作为下一个模式的输入
+                for pattern in title_patterns:
+                    logger.info(f"开始尝试标题模式: {pattern.pattern}")
+                    try:
+                        logger.info(f"对内容应用正则表达式: {pattern.pattern}")
+                        match = re.search(pattern.pattern, processing_content)
+                        if match:
+                            logger.info(f"找到匹配: {match.groups()}")
+                            if match.groups():
+                                entry.title = match.group(1)
+                                logger.info(f"使用标题模式 '{pattern.pattern}' 提取到标题: {entry.title}")
+                            else:
+                                logger.warning(f"模式 '{pattern.pattern}' 匹配成功但没有捕获组")
+                        else:
+                            logger.info(f"模式 '{pattern.pattern}' 未找到匹配")
+                    except Exception as e:
+                        logger.error(f"应用标题正则表达式 '{pattern.pattern}' 时出错: {str(e)}")
+                        logger.exception("详细错误信息:")
+
+            # 如果启用了内容正则表达式提取
+            if rss_config.enable_custom_content_pattern:
+                # 直接使用会话查询内容模式并按优先级排序
+                content_patterns = session.query(RSSPattern).filter_by(
+                    rss_config_id=rss_config.id, 
+                    pattern_type='content'
+                ).order_by(RSSPattern.priority).all()
+
+                logger.info(f"找到 {len(content_patterns)} 个内容模式")
+
+                # 设置初始处理文本
+                processing_content = original_content
+                logger.info(f"内容提取初始文本: {processing_content[:100]}..." if len(processing_content) > 100 else processing_content)
+
+                # 依次应用每个模式，每次处理后的结果作为下一个模式的输入
+                for i, pattern in enumerate(content_patterns):
+                    try:
+                        logger.info(f"[步骤 {i+1}/{len(content_patterns)}] 对内容应用正则表达式: {pattern.pattern}")
+                        logger.info(f"处理前的内容长度: {len(processing_content)}, 预览: {processing_content[:150]}..." if len(processing_content) > 150 else processing_content)
+
+                        match = re.search(pattern.pattern, processing_content)
+                        if match and match.groups():
+                            extracted_content = match.group(1)
+                            processing_content = extracted_content  # 更新处理内容为提取结果
+                            entry.content = extracted_content
+
+                            logger.info(f"使用内容模式 '{pattern.pattern}' 提取到内容，长度: {len(extracted_content)}")
+                            logger.info(f"处理后的内容长度: {len(processing_content)}, 预览: {processing_content[:150]}..." if len(processing_content) > 150 else processing_content)
+                        else:
+                            logger.info(f"模式 '{pattern.pattern}' 未找到匹配或没有捕获组，内容保持不变")
+                    except Exception as e:
+                        logger.error(f"应用内容正则表达式 '{pattern.pattern}' 时出错: {str(e)}")
+
+
+            # 如果执行到这里但没有提取到标题，则恢复原标题
+            if not entry.title and original_title:
+                entry.title = original_title
+                logger.info(f"恢复原标题: {entry.title}")
+
+        except Exception as e:
+            logger.error(f"使用正则表达式提取标题和内容时出错: {str(e)}")
+
+
+    if entry.sender_info:
+        # 清楚空格和换行
+        entry.sender_info = entry.sender_info.strip()
+        entry.content = entry.sender_info +":" +"\n\n" + entry.content
+
+    # 添加原始链接
+    if entry.original_link:
+        # 清理链接中的前缀、换行符和多余空格
+        clean_link = entry.original_link.replace("原始消息:", "").strip()
+        # 删除链接中的所有换行符
+        clean_link = clean_link.replace("\n", "").replace("\r", "")
+        # 处理链接中的多余空格
+        clean_link = re.sub(r'\s+', ' ', clean_link).strip()
+
+        # 确保链接是URL格式
+        if clean_link.startswith("http"):
+            if entry.author:
+                # 使用Markdown格式的链接
+                entry.content += f'\n\n[来源: {entry.author}]({clean_link})'
+            else:
+                # 使用Markdown格式的链接
+                entry.content += f'\n\n[来源]({clean_link})'
+            logger.info(f"已添加清理后的链接(Markdown格式): {clean_link}")
+        else:
+            logger.warning(f"链接格式不正确，跳过添加: {clean_link}")
+
+    # 处理后的消息
+    logger.info(f"处理后的消息: {entry.content}")
+
+
+
+
+    # 添加条目
+    success = await create_entry(entry, max_items)
+    if not success:
+        logger.error("添加条目失败")
+        raise RuntimeError("添加条目失败")
+    return {"status": "success", "message": f"条目已添加，媒体文件数量: {media_count}"}
@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 最多缓存的 Feed 数量 (规则 × 基础URL)
+MAX_CACHED_FEEDS = 256
+
+
+def get_config_fingerprint(rss_config) -> str:
+    """根据RSS配置的所有字段生成指纹，配置被修改（包括其他进程修改）后指纹随之变化"""
+    if rss_config is None:
+        return ''
+    values = tuple(
+        (column.name, getattr(rss_config, column.name, None))
+        for column in rss_config.__table__.columns
+    )
+    return hashlib.sha1(repr(values).encode('utf-8')).hexdigest()
+
+
+class CachedFeed:
+    """已渲染的 Feed"""
+
+    __slots__ = ('key', 'body', 'etag', 'last_modified', 'last_modified_ts')
+
+    def __init__(self, key: Tuple, body: bytes, modified_at: float):
+        self.key = key
+        self.body = body
+        self.etag = '"' + hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '"'
+        # HTTP 日期只精确到秒
+        self.last_modified_ts = int(modified_at)
+        self.last_modified = formatdate(self.last_modified_ts, usegmt=True)
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            'ETag': self.etag,
+            'Last-Modified': self.last_modified,
+            'Cache-Control': 'no-cache',
+        }
+
+    def is_not_modified(self, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """
+        判断条件请求是否可以返回 304
+
+        If-None-Match 存在时优先比较 ETag，否则比较 If-Modified-Since
+        """
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            if '*' in tags:
+                return True
+            # 弱比较，忽略 W/ 前缀
+            return self.etag in {tag[2:] if tag.startswith('W/') else tag for tag in tags}
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError, IndexError):
+                return False
+            if since is None:
+                return False
+            return self.last_modified_ts <= int(since.timestamp())
+        return False
+
+
+class FeedCache:
+    """
+    RSS Feed 渲染缓存
+
+    缓存键为 (规则ID, 基础URL) ，缓存内容附带生成时的版本 (条目版本号, RSS配置指纹, 标题模板版本)，
+    版本不一致即视为失效，重新渲染后替换。条目增删改时也会主动清除对应规则的缓存。
+    """
+
+    def __init__(self, max_size: int = MAX_CACHED_FEEDS):
+        self.max_size = max_size
+        self._feeds: "OrderedDict[Tuple[int, str], CachedFeed]" = OrderedDict()
+        # 规则ID -> (渲染配置指纹, 首次见到该指纹的时间)，不随缓存清除
+        self._config_seen: Dict[int, Tuple[Hashable, float]] = {}
+
+    def get(self, rule_id: int, base_url: str, version: Hashable) -> Optional[CachedFeed]:
+        cache_key = (rule_id, base_url)
+        feed = self._feeds.get(cache_key)
+        if feed is None or feed.key != (rule_id, base_url, version):
+            return None
+        self._feeds.move_to_end(cache_key)
+        return feed
+
+    def put(self, rule_id: int, base_url: str, version: Hashable, body: bytes, modified_at: float) -> CachedFeed:
+        cache_key = (rule_id, base_url)
+        feed = CachedFeed((rule_id, base_url, version), body, modified_at)
+        self._feeds[cache_key] = feed
+        self._feeds.move_to_end(cache_key)
+        while len(self._feeds) > self.max_size:
+            self._feeds.popitem(last=False)
+        return feed
+
+    def config_modified_at(self, rule_id: int, fingerprint: Hashable) -> float:
+        """
+        获取渲染配置 (RSS配置指纹、标题模板版本) 最后一次变化的时间
+
+        指纹与上次不同（包括服务启动后第一次请求）时记为当前时间，
+        配置修改后 Last-Modified 不会早于按新配置渲染的时间
+        """
+        seen = self._config_seen.get(rule_id)
+        if seen is None or seen[0] != fingerprint:
+            seen = (fingerprint, time.time())
+            self._config_seen[rule_id] = seen
+        return seen[1]
+
+    def invalidate(self, rule_id: int) -> None:
+        """清除规则的所有缓存"""
+        for cache_key in [key for key in self._feeds if key[0] == rule_id]:
+            del self._feeds[cache_key]
+
+
+class EntryFragment:
+    """单个条目的渲染结果"""
+
+    __slots__ = ('title', 'content', 'enclosures')
+
+    def __init__(self, title: str, content: str, enclosures: List[Tuple[str, str, str]]):
+        self.title = title
+        self.content = content
+        # [(url, length, type), ...]
+        self.enclosures = enclosures
+
+
+def _entry_digest(entry) -> Tuple:
+    """影响渲染结果的条目字段，条目被更新后随之变化"""
+    return (
+        entry.title,
+        entry.content,
+        tuple(
+            (media.url, media.type, media.size, media.filename, media.original_name)
+            for media in entry.media
+        ),
+    )
+
+
+class EntryFragmentCache:
+    """
+    条目渲染缓存
+
+    按 (规则ID, 条目ID) 保存条目的标题、HTML内容和媒体附件，附带渲染时的
+    版本 (RSS配置指纹, 基础URL, 标题模板版本) 和条目内容摘要。
+    新条目加入后重新生成 Feed 时，只有新条目需要重新渲染。
+    """
+
+    def __init__(self):
+        self._fragments: Dict[int, Dict[str, Tuple[Tuple, EntryFragment]]] = {}
+
+    def get(self, rule_id: int, entry, version: Hashable) -> Optional[EntryFragment]:
+        cached = self._fragments.get(rule_id, {}).get(entry.id)
+        if cached is None or cached[0] != (version, _entry_digest(entry)):
+            return None
+        return cached[1]
+
+    def put(self, rule_id: int, entry, version: Hashable, fragment: EntryFragment) -> None:
+        if not entry.id:
+            return
+        self._fragments.setdefault(rule_id, {})[entry.id] = ((version, _entry_digest(entry)), fragment)
+
+    def retain(self, rule_id: int, entry_ids: Set[str]) -> None:
+        """只保留 Feed 中仍存在的条目"""
+        fragments = self._fragments.get(rule_id)
+        if not fragments:
+            return
+        for entry_id in [entry_id for entry_id in fragments if entry_id not in entry_ids]:
+            del fragments[entry_id]
+
+    def invalidate(self, rule_id: int) -> None:
+        self._fragments.pop(rule_id, None)
+
+
+# 创建全局实例
+feed_cache = FeedCache()
+entry_fragment_cache = EntryFragmentCache()
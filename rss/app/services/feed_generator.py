@@ -2,7 +2,8 @@ from feedgen.feed import FeedGenerator
 from datetime import datetime, timedelta
 from ..core.config import settings
 from ..models.entry import Entry
-from typing import List
+from .feed_cache import EntryFragment, entry_fragment_cache, get_config_fingerprint
+from typing import List, Optional, Tuple
 import logging
 import os
 from pathlib import Path
@@ -15,6 +16,37 @@ import pytz
 
 logger = logging.getLogger(__name__)
 
+# 标题模板配置文件
+TITLE_TEMPLATE_PATH = Path(__file__).parent.parent / 'configs' / 'title_template.json'
+
+# 已编译的标题模板 (修改时间, [(正则, 模式字符串, 描述), ...])
+_title_patterns: Tuple[Optional[int], List[tuple]] = (None, [])
+
+
+def get_title_template_version() -> Optional[int]:
+    """获取标题模板文件的修改时间，作为模板版本"""
+    try:
+        return os.stat(TITLE_TEMPLATE_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+
+def load_title_patterns() -> List[tuple]:
+    """读取并编译标题模板，文件未修改时直接返回缓存"""
+    global _title_patterns
+    version = get_title_template_version()
+    if version is None or version != _title_patterns[0]:
+        logger.info(f"正在读取标题模板配置文件: {TITLE_TEMPLATE_PATH}")
+        with open(TITLE_TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+            title_config = json.load(f)
+        patterns = [
+            (re.compile(info['pattern'], re.MULTILINE), info['pattern'], info['description'])
+            for info in title_config['patterns']
+        ]
+        _title_patterns = (version, patterns)
+    return _title_patterns[1]
+
+
 class FeedService:
     
     
@@ -33,21 +65,10 @@ class FeedService:
             return "", ""
             
         try:
-            # 读取标题模板配置
-            config_path = Path(__file__).parent.parent / 'configs' / 'title_template.json'
-            logger.info(f"正在读取标题模板配置文件: {config_path}")
-            with open(config_path, 'r', encoding='utf-8') as f:
-                title_config = json.load(f)
-                
-            # 遍历每个模式
-            for pattern_info in title_config['patterns']:
-                pattern_str = pattern_info['pattern']
-                pattern_desc = pattern_info['description']
+            # 遍历每个模式（标题模板只在文件修改后重新读取和编译）
+            for pattern, pattern_str, pattern_desc in load_title_patterns():
                 logger.debug(f"尝试匹配模式: {pattern_desc} ({pattern_str})")
                 
-                # 编译正则表达式
-                pattern = re.compile(pattern_str, re.MULTILINE)
-                
                 # 尝试匹配
                 match = pattern.match(content)
                 if match:
@@ -168,203 +189,31 @@ class FeedService:
         # 设置Feed链接
         fg.link(href=f'{base_url}/rss/feed/{rule_id}')
         
+        # 条目渲染结果按 RSS配置、基础URL和标题模板 缓存，未变化的条目直接复用
+        fragment_version = (get_config_fingerprint(rss_config), base_url, get_title_template_version())
+        rendered_ids = set()
+
         # 添加条目
         for entry in entries:
             try:
+                fragment = entry_fragment_cache.get(rule_id, entry, fragment_version)
+                if fragment is None:
+                    fragment = FeedService.render_entry(entry, rss_config, base_url)
+                    entry_fragment_cache.put(rule_id, entry, fragment_version, fragment)
+                rendered_ids.add(entry.id)
+
                 fe = fg.add_entry()
                 fe.id(entry.id or entry.message_id)
+                fe.title(fragment.title)
 
+                for url, length, media_type in fragment.enclosures:
+                    fe.enclosure(url=url, length=length, type=media_type)
 
-                # 初始化content变量
-                content = None
-                fe.title(entry.title)
-
-                if rss_config.is_ai_extract:
-                    fe.title(entry.title)
-                    content = entry.content
-                else:
-                    if rss_config.enable_custom_title_pattern:
-                        fe.title(entry.title)
-                    if rss_config.enable_custom_content_pattern:
-                        content = entry.content
-                    # 自动提取标题和内容
-                    if rss_config.is_auto_title or rss_config.is_auto_content:
-                        extracted_title, extracted_content = FeedService.extract_telegram_title_and_content(entry.content or "")
-                        if rss_config.is_auto_title:
-                            fe.title(extracted_title)
-                        if rss_config.is_auto_content:
-                            content = FeedService.convert_markdown_to_html(extracted_content)
-                        else:
-                            # 如果不自动提取内容，使用原始内容
-                            content = FeedService.convert_markdown_to_html(entry.content or "")
-                    else:
-                        # 如果不是自动提取，直接使用原始内容
-                        content = FeedService.convert_markdown_to_html(entry.content or "")
-
-                # 添加图片 - 针对各种RSS阅读器的优化处理
-                all_media_urls = []  # 存储所有媒体URL用于后续检查
-                
-                if entry.media:
-                    logger.info(f"处理条目 {entry.id} 的媒体文件，数量: {len(entry.media)}")
-                    # 处理每个媒体文件
-                    for idx, media in enumerate(entry.media):
-                        # 记录原始媒体URL
-                        original_url = media.url if hasattr(media, 'url') else "未知"
-                        logger.info(f"媒体 {idx+1}/{len(entry.media)} - 原始URL: {original_url}")
-                        
-                        # 构建规范化的媒体URL - 恢复为包含规则ID的格式
-                        media_filename = os.path.basename(media.url.split('/')[-1])
-                        media_url = f"/media/{entry.rule_id}/{media_filename}"
-                        full_media_url = f"{base_url}{media_url}"
-                        all_media_urls.append(full_media_url)
-                        
-                        logger.info(f"媒体 {idx+1}/{len(entry.media)} - 新URL: {full_media_url}")
-                        
-                        # 处理图片类型
-                        if media.type.startswith('image/'):
-                            try:
-                                # 构建媒体文件路径
-                                rule_media_path = settings.get_rule_media_path(entry.rule_id)
-                                media_path = os.path.join(rule_media_path, media_filename)
-                                
-                                # 添加图片标签到内容中 - 使用包含规则ID的URL格式
-                                img_tag = f'<p><img src="{full_media_url}" alt="{media.filename}" style="max-width:100%;height:auto;display:block;" /></p>'
-                                content += img_tag
-                                
-                                logger.info(f"已添加图片标签到内容中: {media_filename}")
-                            except Exception as e:
-                                logger.error(f"添加图片标签时出错: {str(e)}")
-                        elif media.type.startswith('video/'):
-                            # 为视频添加特殊处理
-                            display_name = ""
-                            if hasattr(media, "original_name") and media.original_name:
-                                display_name = media.original_name
-                            else:
-                                display_name = media.filename
-                            
-                            # 添加HTML5视频播放器 - 使用内联样式
-                            video_player = f'''
-                            <div style="margin:15px 0;border:1px solid #eee;padding:10px;border-radius:5px;background-color:#f9f9f9;">
-                                <video controls width="100%" preload="none" poster="" seekable="true" controlsList="nodownload" style="width:100%;max-width:600px;display:block;margin:0 auto;">
-                                    <source src="{full_media_url}" type="{media.type}">
-                                    您的阅读器不支持HTML5视频播放/预览
-                                </video>
-                                <p style="text-align:center;margin-top:8px;font-size:14px;">
-                                    <a href="{full_media_url}" target="_blank" style="display:inline-block;padding:6px 12px;background-color:#4CAF50;color:white;text-decoration:none;border-radius:4px;">
-                                        <i class="bi bi-download"></i> 下载视频: {display_name}
-                                    </a>
-                                </p>
-                            </div>
-                            '''
-                            content += video_player
-                            
-                            logger.info(f"添加视频播放器到内容中: {display_name}")
-                        elif media.type.startswith('audio/'):
-                            # 为音频添加特殊处理
-                            display_name = ""
-                            if hasattr(media, "original_name") and media.original_name:
-                                display_name = media.original_name
-                            else:
-                                display_name = media.filename
-                                
-                            # 添加HTML5音频播放器 - 使用内联样式
-                            audio_player = f'''
-                            <div style="margin:15px 0;border:1px solid #eee;padding:10px;border-radius:5px;background-color:#f9f9f9;">
-                                <audio controls style="width:100%;max-width:600px;display:block;margin:0 auto;">
-                                    <source src="{full_media_url}" type="{media.type}">
-                                    您的阅读器不支持HTML5音频播放/预览
-                                </audio>
-                                <p style="text-align:center;margin-top:8px;font-size:14px;">
-                                    <a href="{full_media_url}" target="_blank">下载音频: {display_name}</a>
-                                </p>
-                            </div>
-                            '''
-                            content += audio_player
-                            
-                            logger.info(f"添加音频播放器到内容中: {display_name}")
-                        else:
-                            # 其他类型文件添加下载链接
-                            display_name = ""
-                            if hasattr(media, "original_name") and media.original_name:
-                                display_name = media.original_name
-                            else:
-                                display_name = media.filename
-                            
-                            # 添加美观的下载链接
-                            file_tag = f'''
-                            <div style="margin:15px 0;padding:10px;border-radius:5px;background-color:#f5f5f5;text-align:center;">
-                                <a href="{full_media_url}" target="_blank" style="display:inline-block;padding:8px 16px;background-color:#4CAF50;color:white;text-decoration:none;border-radius:4px;">
-                                    下载文件: {display_name}
-                                </a>
-                            </div>
-                            '''
-                            content += file_tag
-                
-                # 确保content不为空，至少包含一些默认文本
-                if not content:
-                    content = "<p>该消息没有文本内容。</p>"
-                    if entry.media and len(entry.media) > 0:
-                        content += f"<p>包含 {len(entry.media)} 个媒体文件。</p>"
-                
-                # 确保content是有效的HTML
-                if not content.startswith("<"):
-                    # 预处理文本中的换行符，确保段落结构
-                    processed_content = ""
-                    paragraphs = content.split("\n\n")
-                    for p in paragraphs:
-                        if p.strip():
-                            lines = p.split("\n")
-                            processed_content += f"<p>{lines[0]}"
-                            for line in lines[1:]:
-                                if line.strip():
-                                    processed_content += f"<br>{line}"
-                            processed_content += "</p>"
-                    content = processed_content if processed_content else f"<p>{content}</p>"
-                
-                # 删除多余的HTML标签和空格，但保留有意义的段落结构
-                content = re.sub(r'<br>\s*<br>', '<br>', content)
-                content = re.sub(r'<p>\s*</p>', '', content)
-                content = re.sub(r'<p><br></p>', '<p></p>', content)
-                
-                # 检查内容中是否包含硬编码的本地地址
-                if "127.0.0.1" in content or "localhost" in content:
-                    logger.warning(f"内容中包含硬编码的本地地址，将替换为: {base_url}")
-                    content = content.replace(f"http://127.0.0.1:{settings.PORT}", base_url)
-                    content = content.replace(f"http://localhost:{settings.PORT}", base_url)
-                    content = content.replace(f"http://{settings.HOST}:{settings.PORT}", base_url)
-                
-                # 添加媒体附件，并确保内容中包含所有媒体
-                if entry.media:
-                    for media in entry.media:
-                        try:
-                            # 使用包含规则ID的媒体URL格式
-                            media_filename = os.path.basename(media.url.split('/')[-1])
-                            full_media_url = f"{base_url}/media/{entry.rule_id}/{media_filename}"
-                            
-                            # 确保图片等内容已经添加
-                            if media.type.startswith('image/') and full_media_url not in content:
-                                # 如果内容中没有该图片，添加
-                                img_tag = f'<p><img src="{full_media_url}" alt="{media.filename}" style="max-width:100%;" /></p>'
-                                content += img_tag
-                                logger.info(f"添加缺失的图片标签: {media_filename}")
-                            
-                            # 记录添加的媒体附件
-                            logger.info(f"添加媒体附件: {full_media_url}, 类型: {media.type}, 大小: {media.size}")
-                            
-                            # 添加enclosure
-                            fe.enclosure(
-                                url=full_media_url,
-                                length=str(media.size) if hasattr(media, 'size') else "0",
-                                type=media.type if hasattr(media, 'type') else "application/octet-stream"
-                            )
-                        except Exception as e:
-                            logger.error(f"添加媒体附件时出错: {str(e)}")
-                
                 # 设置内容字段
-                fe.content(content, type='html')
+                fe.content(fragment.content, type='html')
                 
                 # 设置描述字段 - 使用相同的内容
-                fe.description(content)
+                fe.description(fragment.content)
                 
                 # 解析ISO格式时间字符串，设置发布时间
                 try:
@@ -388,9 +237,212 @@ class FeedService:
             except Exception as e:
                 logger.error(f"添加条目到Feed时出错: {str(e)}")
                 continue
+
+        # 清理已不在Feed中的条目缓存
+        entry_fragment_cache.retain(rule_id, rendered_ids)
         
         return fg
     
+    @staticmethod
+    def render_entry(entry: Entry, rss_config, base_url: str) -> EntryFragment:
+        """渲染单个条目的标题、HTML内容和媒体附件
+
+        Args:
+            entry: 条目
+            rss_config: 规则的RSS配置
+            base_url: 媒体链接使用的基础URL
+
+        Returns:
+            EntryFragment: 渲染结果
+        """
+        # 初始化content变量
+        content = None
+        title = entry.title
+
+        if rss_config.is_ai_extract:
+            title = entry.title
+            content = entry.content
+        else:
+            if rss_config.enable_custom_title_pattern:
+                title = entry.title
+            if rss_config.enable_custom_content_pattern:
+                content = entry.content
+            # 自动提取标题和内容
+            if rss_config.is_auto_title or rss_config.is_auto_content:
+                extracted_title, extracted_content = FeedService.extract_telegram_title_and_content(entry.content or "")
+                if rss_config.is_auto_title:
+                    title = extracted_title
+                if rss_config.is_auto_content:
+                    content = FeedService.convert_markdown_to_html(extracted_content)
+                else:
+                    # 如果不自动提取内容，使用原始内容
+                    content = FeedService.convert_markdown_to_html(entry.content or "")
+            else:
+                # 如果不是自动提取，直接使用原始内容
+                content = FeedService.convert_markdown_to_html(entry.content or "")
+
+        # 添加图片 - 针对各种RSS阅读器的优化处理
+        all_media_urls = []  # 存储所有媒体URL用于后续检查
+
+        if entry.media:
+            logger.info(f"处理条目 {entry.id} 的媒体文件，数量: {len(entry.media)}")
+            # 处理每个媒体文件
+            for idx, media in enumerate(entry.media):
+                # 记录原始媒体URL
+                original_url = media.url if hasattr(media, 'url') else "未知"
+                logger.info(f"媒体 {idx+1}/{len(entry.media)} - 原始URL: {original_url}")
+
+                # 构建规范化的媒体URL - 恢复为包含规则ID的格式
+                media_filename = os.path.basename(media.url.split('/')[-1])
+                media_url = f"/media/{entry.rule_id}/{media_filename}"
+                full_media_url = f"{base_url}{media_url}"
+                all_media_urls.append(full_media_url)
+
+                logger.info(f"媒体 {idx+1}/{len(entry.media)} - 新URL: {full_media_url}")
+
+                # 处理图片类型
+                if media.type.startswith('image/'):
+                    try:
+                        # 构建媒体文件路径
+                        rule_media_path = settings.get_rule_media_path(entry.rule_id)
+                        media_path = os.path.join(rule_media_path, media_filename)
+
+                        # 添加图片标签到内容中 - 使用包含规则ID的URL格式
+                        img_tag = f'<p><img src="{full_media_url}" alt="{media.filename}" style="max-width:100%;height:auto;display:block;" /></p>'
+                        content += img_tag
+
+                        logger.info(f"已添加图片标签到内容中: {media_filename}")
+                    except Exception as e:
+                        logger.error(f"添加图片标签时出错: {str(e)}")
+                elif media.type.startswith('video/'):
+                    # 为视频添加特殊处理
+                    display_name = ""
+                    if hasattr(media, "original_name") and media.original_name:
+                        display_name = media.original_name
+                    else:
+                        display_name = media.filename
+
+                    # 添加HTML5视频播放器 - 使用内联样式
+                    video_player = f'''
+                    <div style="margin:15px 0;border:1px solid #eee;padding:10px;border-radius:5px;background-color:#f9f9f9;">
+                        <video controls width="100%" preload="none" poster="" seekable="true" controlsList="nodownload" style="width:100%;max-width:600px;display:block;margin:0 auto;">
+                            <source src="{full_media_url}" type="{media.type}">
+                            您的阅读器不支持HTML5视频播放/预览
+                        </video>
+                        <p style="text-align:center;margin-top:8px;font-size:14px;">
+                            <a href="{full_media_url}" target="_blank" style="display:inline-block;padding:6px 12px;background-color:#4CAF50;color:white;text-decoration:none;border-radius:4px;">
+                                <i class="bi bi-download"></i> 下载视频: {display_name}
+                            </a>
+                        </p>
+                    </div>
+                    '''
+                    content += video_player
+
+                    logger.info(f"添加视频播放器到内容中: {display_name}")
+                elif media.type.startswith('audio/'):
+                    # 为音频添加特殊处理
+                    display_name = ""
+                    if hasattr(media, "original_name") and media.original_name:
+                        display_name = media.original_name
+                    else:
+                        display_name = media.filename
+
+                    # 添加HTML5音频播放器 - 使用内联样式
+                    audio_player = f'''
+                    <div style="margin:15px 0;border:1px solid #eee;padding:10px;border-radius:5px;background-color:#f9f9f9;">
+                        <audio controls style="width:100%;max-width:600px;display:block;margin:0 auto;">
+                            <source src="{full_media_url}" type="{media.type}">
+                            您的阅读器不支持HTML5音频播放/预览
+                        </audio>
+                        <p style="text-align:center;margin-top:8px;font-size:14px;">
+                            <a href="{full_media_url}" target="_blank">下载音频: {display_name}</a>
+                        </p>
+                    </div>
+                    '''
+                    content += audio_player
+
+                    logger.info(f"添加音频播放器到内容中: {display_name}")
+                else:
+                    # 其他类型文件添加下载链接
+                    display_name = ""
+                    if hasattr(media, "original_name") and media.original_name:
+                        display_name = media.original_name
+                    else:
+                        display_name = media.filename
+
+                    # 添加美观的下载链接
+                    file_tag = f'''
+                    <div style="margin:15px 0;padding:10px;border-radius:5px;background-color:#f5f5f5;text-align:center;">
+                        <a href="{full_media_url}" target="_blank" style="display:inline-block;padding:8px 16px;background-color:#4CAF50;color:white;text-decoration:none;border-radius:4px;">
+                            下载文件: {display_name}
+                        </a>
+                    </div>
+                    '''
+                    content += file_tag
+
+        # 确保content不为空，至少包含一些默认文本
+        if not content:
+            content = "<p>该消息没有文本内容。</p>"
+            if entry.media and len(entry.media) > 0:
+                content += f"<p>包含 {len(entry.media)} 个媒体文件。</p>"
+
+        # 确保content是有效的HTML
+        if not content.startswith("<"):
+            # 预处理文本中的换行符，确保段落结构
+            processed_content = ""
+            paragraphs = content.split("\n\n")
+            for p in paragraphs:
+                if p.strip():
+                    lines = p.split("\n")
+                    processed_content += f"<p>{lines[0]}"
+                    for line in lines[1:]:
+                        if line.strip():
+                            processed_content += f"<br>{line}"
+                    processed_content += "</p>"
+            content = processed_content if processed_content else f"<p>{content}</p>"
+
+        # 删除多余的HTML标签和空格，但保留有意义的段落结构
+        content = re.sub(r'<br>\s*<br>', '<br>', content)
+        content = re.sub(r'<p>\s*</p>', '', content)
+        content = re.sub(r'<p><br></p>', '<p></p>', content)
+
+        # 检查内容中是否包含硬编码的本地地址
+        if "127.0.0.1" in content or "localhost" in content:
+            logger.warning(f"内容中包含硬编码的本地地址，将替换为: {base_url}")
+            content = content.replace(f"http://127.0.0.1:{settings.PORT}", base_url)
+            content = content.replace(f"http://localhost:{settings.PORT}", base_url)
+            content = content.replace(f"http://{settings.HOST}:{settings.PORT}", base_url)
+
+        # 添加媒体附件，并确保内容中包含所有媒体
+        enclosures = []
+        if entry.media:
+            for media in entry.media:
+                try:
+                    # 使用包含规则ID的媒体URL格式
+                    media_filename = os.path.basename(media.url.split('/')[-1])
+                    full_media_url = f"{base_url}/media/{entry.rule_id}/{media_filename}"
+
+                    # 确保图片等内容已经添加
+                    if media.type.startswith('image/') and full_media_url not in content:
+                        # 如果内容中没有该图片，添加
+                        img_tag = f'<p><img src="{full_media_url}" alt="{media.filename}" style="max-width:100%;" /></p>'
+                        content += img_tag
+                        logger.info(f"添加缺失的图片标签: {media_filename}")
+
+                    # 记录添加的媒体附件
+                    logger.info(f"添加媒体附件: {full_media_url}, 类型: {media.type}, 大小: {media.size}")
+
+                    # 添加enclosure
+                    enclosures.append((
+                        full_media_url,
+                        str(media.size) if hasattr(media, 'size') else "0",
+                        media.type if hasattr(media, 'type') else "application/octet-stream"
+                    ))
+                except Exception as e:
+                    logger.error(f"添加媒体附件时出错: {str(e)}")
+
+        return EntryFragment(title, content, enclosures)
+
     @staticmethod
     def _extract_chat_name(link: str) -> str:
         """从Telegram链接中提取频道/群组名称"""
@@ -6,9 +6,10 @@ import logging
 import os
 from dotenv import load_dotenv
 from telethon import TelegramClient, errors
-from ai import get_ai_provider
+from ai import ai_executor
 import traceback
-from utils.constants import DEFAULT_TIMEZONE,DEFAULT_AI_MODEL,DEFAULT_SUMMARY_PROMPT
+from utils.constants import DEFAULT_TIMEZONE,DEFAULT_AI_MODEL,DEFAULT_SUMMARY_PROMPT,AI_SUMMARY_TIMEOUT
+from managers.send_scheduler import send_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -223,12 +224,12 @@ class SummaryScheduler:
                 else:
                     logger.info(f"使用规则配置的AI模型进行总结: {rule.ai_model}")
 
-                # 获取AI提供者并处理总结
-                provider = await get_ai_provider(rule.ai_model)
-                summary = await provider.process_message(
+                # 调用AI生成总结（受并发限制、超时和熔断保护）
+                summary = await ai_executor.process(
+                    rule.ai_model,
                     all_messages,
                     prompt=rule.summary_prompt or DEFAULT_SUMMARY_PROMPT,
-                    model=rule.ai_model
+                    timeout=AI_SUMMARY_TIMEOUT
                 )
 
 
@@ -256,14 +257,16 @@ class SummaryScheduler:
                             logger.info(f"Retry attempt {attempt + 1}/{MAX_SEND_ATTEMPTS} for sending message to chat ID {target_chat_id}.")
                             try:
                                 if use_markdown:
-                                    current_message = await self.bot_client.send_message(
+                                    current_message = await send_scheduler.send_message(
+                                        self.bot_client,
                                         target_chat_id,
                                         message_to_send,
                                         parse_mode='markdown'
                                     )
                                 else:
                                     # Fallback to plain text
-                                    current_message = await self.bot_client.send_message(
+                                    current_message = await send_scheduler.send_message(
+                                        self.bot_client,
                                         target_chat_id,
                                         message_to_send
                                     )
@@ -279,14 +282,10 @@ class SummaryScheduler:
                                     logger.error(f"纯文本发送时出现意外的 MarkupInvalidError : {e}")
                                     raise # Fail fast
 
-                            except errors.FloodWaitError as fwe:
-                                if attempt < MAX_SEND_ATTEMPTS - 1:
-                                    logger.warning(f"触发Telegram发送频率限制，等待 {fwe.seconds} 秒后重试...")
-                                    await asyncio.sleep(fwe.seconds)
-                                    attempt += 1
-                                else:
-                                    logger.error("重试次数已达上限，发送失败。")
-                                    raise
+                            except errors.FloodWaitError:
+                                # 发送调度器已按 FloodWait 自动等待重试，仍失败时不再重复重试
+                                logger.error("触发Telegram发送频率限制，重试次数已达上限，发送失败。")
+                                raise
 
                             except Exception as send_error:
                                 logger.error(f"发送总结第 {i+1} 部分时出错: {str(send_error)}")
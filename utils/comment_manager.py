@@ -8,6 +8,7 @@ from telethon.errors import ChannelPrivateError, FloodWaitError, RPCError
 from telethon.tl.functions.channels import GetFullChannelRequest
 
 from models.models import Chat, ChannelCommentMapping, get_session
+from managers.entity_cache import entity_cache
 
 logger = logging.getLogger(__name__)
 
@@ -106,7 +107,7 @@ class CommentManager:
     ) -> Optional[Tuple[Optional[int], object]]:
         """从 Telegram API 获取评论区信息，返回 (linked_chat_telegram_id, full_channel)"""
         try:
-            channel_entity = await self._client.get_entity(channel_telegram_id)
+            channel_entity = await entity_cache.get_entity(self._client, channel_telegram_id)
             full_channel = await self._client(
                 GetFullChannelRequest(channel=channel_entity)
             )
@@ -123,6 +124,7 @@ class CommentManager:
             )
             raise
         except ChannelPrivateError as exc:
+            entity_cache.invalidate(channel_telegram_id, self._client)
             logger.error(
                 "无法访问频道 %s (chat_db_id=%s): %s",
                 channel_telegram_id,
@@ -9,6 +9,8 @@ from models.models import Chat, ForwardRule
 import re
 import telethon
 from utils.auto_delete import respond_and_delete,reply_and_delete,async_delete_user_message
+from utils.keyword_matcher import get_keyword_matcher
+from managers.entity_cache import entity_cache
 from datetime import datetime, timedelta
 
 from utils.constants import AI_SETTINGS_TEXT,MEDIA_SETTINGS_TEXT
@@ -427,34 +429,22 @@ async def check_keywords(rule, message_text, event = None):
 async def process_whitelist_mode(rule, message_text, reverse_blacklist):
     """处理仅白名单模式"""
     logger.info("进入仅白名单模式")
-    should_forward = False
+    matcher = get_keyword_matcher(rule)
+    lowered_text = message_text.lower()
 
     # 检查普通白名单关键词
-    whitelist_keywords = [k for k in rule.keywords if not k.is_blacklist]
-    logger.info(f"普通白名单关键词: {[k.keyword for k in whitelist_keywords]}")
-    
-    for keyword in whitelist_keywords:
-        if await check_keyword_match(keyword, message_text):
-            should_forward = True
-            break
-    
-    if not should_forward:
+    logger.info(f"普通白名单关键词数量: {len(matcher.whitelist)}")
+    matched = matcher.whitelist.search(message_text, lowered_text)
+    if matched is None:
         logger.info("未匹配到普通白名单关键词，不转发")
         return False
+    logger.info(f"关键字匹配成功: {matched}")
 
     # 如果启用了黑名单反转，还需要匹配反转后的黑名单（作为第二重白名单）
     if reverse_blacklist:
         logger.info("检查反转后的黑名单关键词（作为白名单）")
-        reversed_blacklist = [k for k in rule.keywords if k.is_blacklist]
-        logger.info(f"反转后的黑名单关键词: {[k.keyword for k in reversed_blacklist]}")
-        
-        reversed_match = False
-        for keyword in reversed_blacklist:
-            if await check_keyword_match(keyword, message_text):
-                reversed_match = True
-                break
-        
-        if not reversed_match:
+        logger.info(f"反转后的黑名单关键词数量: {len(matcher.blacklist)}")
+        if matcher.blacklist.search(message_text, lowered_text) is None:
             logger.info("未匹配到反转后的黑名单关键词，不转发")
             return False
 
@@ -464,32 +454,33 @@ async def process_whitelist_mode(rule, message_text, reverse_blacklist):
 async def process_blacklist_mode(rule, message_text, reverse_whitelist):
     """处理仅黑名单模式"""
     logger.info("进入仅黑名单模式")
+    matcher = get_keyword_matcher(rule)
+    lowered_text = message_text.lower()
 
     # 检查普通黑名单关键词
-    blacklist_keywords = [k for k in rule.keywords if k.is_blacklist]
-    logger.info(f"普通黑名单关键词: {[k.keyword for k in blacklist_keywords]}")
-    
-    for keyword in blacklist_keywords:
-        if await check_keyword_match(keyword, message_text):
-            logger.info(f"匹配到黑名单关键词 '{keyword.keyword}'，不转发")
-            return False
+    logger.info(f"普通黑名单关键词数量: {len(matcher.blacklist)}")
+    matched = matcher.blacklist.search(message_text, lowered_text)
+    if matched is not None:
+        logger.info(f"匹配到黑名单关键词 '{matched}'，不转发")
+        return False
 
     # 如果启用了白名单反转，检查反转后的白名单（作为黑名单）
     if reverse_whitelist:
         logger.info("检查反转后的白名单关键词（作为黑名单）")
-        reversed_whitelist = [k for k in rule.keywords if not k.is_blacklist]
-        logger.info(f"反转后的白名单关键词: {[k.keyword for k in reversed_whitelist]}")
-        
-        for keyword in reversed_whitelist:
-            if await check_keyword_match(keyword, message_text):
-                logger.info(f"匹配到反转后的白名单关键词 '{keyword.keyword}'，不转发")
-                return False
+        logger.info(f"反转后的白名单关键词数量: {len(matcher.whitelist)}")
+        matched = matcher.whitelist.search(message_text, lowered_text)
+        if matched is not None:
+            logger.info(f"匹配到反转后的白名单关键词 '{matched}'，不转发")
+            return False
 
     logger.info("未匹配到任何黑名单关键词，允许转发")
     return True
 
 async def check_keyword_match(keyword, message_text):
-    """检查单个关键词是否匹配"""
+    """检查单个关键词是否匹配
+
+    注意：规则级的关键字检查请使用 get_keyword_matcher，此函数仅用于单个关键字
+    """
     logger.info(f"检查关键字: {keyword.keyword} (正则: {keyword.is_regex})")
     if keyword.is_regex:
         try:
@@ -540,45 +531,30 @@ async def process_whitelist_then_blacklist_mode(rule, message_text, reverse_blac
     如果启用黑名单反转，则黑名单变成第二重白名单（必须匹配）
     """
     logger.info("进入先白后黑模式")
+    matcher = get_keyword_matcher(rule)
+    lowered_text = message_text.lower()
 
     # 检查普通白名单（必须匹配）
-    whitelist_match = False
-    whitelist_keywords = [k for k in rule.keywords if not k.is_blacklist]
-    logger.info(f"检查普通白名单关键词: {[k.keyword for k in whitelist_keywords]}")
-    
-    for keyword in whitelist_keywords:
-        if await check_keyword_match(keyword, message_text):
-            whitelist_match = True
-            break
-    
-    if not whitelist_match:
+    logger.info(f"检查普通白名单关键词数量: {len(matcher.whitelist)}")
+    if matcher.whitelist.search(message_text, lowered_text) is None:
         logger.info("未匹配到白名单关键词，不转发")
         return False
 
     # 根据反转设置处理黑名单
-    blacklist_keywords = [k for k in rule.keywords if k.is_blacklist]
-    
     if reverse_blacklist:
         # 黑名单反转为白名单，必须匹配才转发
         logger.info("黑名单已反转，作为第二重白名单检查")
-        logger.info(f"反转后的黑名单关键词: {[k.keyword for k in blacklist_keywords]}")
-        
-        blacklist_match = False
-        for keyword in blacklist_keywords:
-            if await check_keyword_match(keyword, message_text):
-                blacklist_match = True
-                break
-        
-        if not blacklist_match:
+        logger.info(f"反转后的黑名单关键词数量: {len(matcher.blacklist)}")
+        if matcher.blacklist.search(message_text, lowered_text) is None:
             logger.info("未匹配到反转后的黑名单关键词，不转发")
             return False
     else:
         # 正常黑名单，匹配则不转发
-        logger.info(f"检查普通黑名单关键词: {[k.keyword for k in blacklist_keywords]}")
-        for keyword in blacklist_keywords:
-            if await check_keyword_match(keyword, message_text):
-                logger.info(f"匹配到黑名单关键词 '{keyword.keyword}'，不转发")
-                return False
+        logger.info(f"检查普通黑名单关键词数量: {len(matcher.blacklist)}")
+        matched = matcher.blacklist.search(message_text, lowered_text)
+        if matched is not None:
+            logger.info(f"匹配到黑名单关键词 '{matched}'，不转发")
+            return False
 
     logger.info("所有条件都满足，允许转发")
     return True
@@ -599,7 +575,7 @@ async def construct_message_link(client, chat_id: int, message_id: int) -> str:
     """
     try:
         # 尝试获取频道实体
-        channel = await client.get_entity(chat_id)
+        channel = await entity_cache.get_entity(client, chat_id)
 
         # 检查是否有公开用户名 (单个 username)
         if hasattr(channel, 'username') and channel.username:
@@ -631,38 +607,29 @@ async def process_blacklist_then_whitelist_mode(rule, message_text, reverse_whit
     如果启用白名单反转，则白名单变成第二重黑名单（不能匹配）
     """
     logger.info("进入先黑后白模式")
+    matcher = get_keyword_matcher(rule)
+    lowered_text = message_text.lower()
 
     # 检查普通黑名单（匹配则拒绝）
-    blacklist_keywords = [k for k in rule.keywords if k.is_blacklist]
-    logger.info(f"检查普通黑名单关键词: {[k.keyword for k in blacklist_keywords]}")
-    
-    for keyword in blacklist_keywords:
-        if await check_keyword_match(keyword, message_text):
-            logger.info(f"匹配到黑名单关键词 '{keyword.keyword}'，不转发")
-            return False
+    logger.info(f"检查普通黑名单关键词数量: {len(matcher.blacklist)}")
+    matched = matcher.blacklist.search(message_text, lowered_text)
+    if matched is not None:
+        logger.info(f"匹配到黑名单关键词 '{matched}'，不转发")
+        return False
 
     # 处理白名单
-    whitelist_keywords = [k for k in rule.keywords if not k.is_blacklist]
-    
     if reverse_whitelist:
         # 白名单反转为黑名单，匹配则不转发
         logger.info("白名单已反转，作为第二重黑名单检查")
-        logger.info(f"反转后的白名单关键词: {[k.keyword for k in whitelist_keywords]}")
-        
-        for keyword in whitelist_keywords:
-            if await check_keyword_match(keyword, message_text):
-                logger.info(f"匹配到反转后的白名单关键词 '{keyword.keyword}'，不转发")
-                return False
+        logger.info(f"反转后的白名单关键词数量: {len(matcher.whitelist)}")
+        matched = matcher.whitelist.search(message_text, lowered_text)
+        if matched is not None:
+            logger.info(f"匹配到反转后的白名单关键词 '{matched}'，不转发")
+            return False
     else:
         # 正常白名单，必须匹配才转发
-        logger.info(f"检查普通白名单关键词: {[k.keyword for k in whitelist_keywords]}")
-        whitelist_match = False
-        for keyword in whitelist_keywords:
-            if await check_keyword_match(keyword, message_text):
-                whitelist_match = True
-                break
-        
-        if not whitelist_match:
+        logger.info(f"检查普通白名单关键词数量: {len(matcher.whitelist)}")
+        if matcher.whitelist.search(message_text, lowered_text) is None:
             logger.info("未匹配到白名单关键词，不转发")
             return False
 
@@ -20,6 +20,17 @@ RSS_MEDIA_BASE_URL = os.getenv('RSS_MEDIA_BASE_URL', '')
 
 RSS_ENABLED = os.getenv('RSS_ENABLED', 'false')
 
+# RSS条目写入方式：http 通过RSS服务的接口提交，local 在机器人进程内直接写入条目存储（RSS服务只负责读取）
+RSS_INGEST_MODE = os.getenv('RSS_INGEST_MODE', 'http').lower()
+
+# RSS条目批量提交：每批最多条目数、收集等待时间 (秒)、队列长度及失败重试次数
+RSS_INGEST_BATCH_SIZE = int(os.getenv('RSS_INGEST_BATCH_SIZE', 20))
+RSS_INGEST_WINDOW = float(os.getenv('RSS_INGEST_WINDOW', 0.5))
+RSS_INGEST_QUEUE_SIZE = int(os.getenv('RSS_INGEST_QUEUE_SIZE', 1000))
+RSS_INGEST_MAX_RETRIES = int(os.getenv('RSS_INGEST_MAX_RETRIES', 3))
+# 程序退出时等待后台队列中剩余任务提交完成的最长时间 (秒)
+SHUTDOWN_FLUSH_TIMEOUT = float(os.getenv('SHUTDOWN_FLUSH_TIMEOUT', 10))
+
 RULES_PER_PAGE = int(os.getenv('RULES_PER_PAGE', 20))
 
 PUSH_CHANNEL_PER_PAGE = int(os.getenv('PUSH_CHANNEL_PER_PAGE', 10))
@@ -47,6 +58,23 @@ DEFAULT_SUMMARY_PROMPT = os.getenv('DEFAULT_SUMMARY_PROMPT', '请总结以下频
 # 默认AI提示词
 DEFAULT_AI_PROMPT = os.getenv('DEFAULT_AI_PROMPT', '请尊重原意，保持原有格式不变，用简体中文重写下面的内容：')
 
+# AI处理结果缓存：有效期 (秒，设为0不缓存)、磁盘最多保存的结果数及内存中保留的结果数
+AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', 24 * 3600))
+AI_CACHE_MAX_ITEMS = int(os.getenv('AI_CACHE_MAX_ITEMS', 10000))
+AI_CACHE_MEMORY_ITEMS = int(os.getenv('AI_CACHE_MEMORY_ITEMS', 500))
+
+# AI调用：每个提供商最多同时进行的请求数、单次请求超时时间 (秒) 及总结请求的超时时间 (秒)
+AI_CONCURRENCY = int(os.getenv('AI_CONCURRENCY', 4))
+AI_REQUEST_TIMEOUT = float(os.getenv('AI_REQUEST_TIMEOUT', 60))
+AI_SUMMARY_TIMEOUT = float(os.getenv('AI_SUMMARY_TIMEOUT', 300))
+# AI提供商连续失败多少次后熔断，以及熔断后的冷却时间 (秒)
+AI_BREAKER_THRESHOLD = int(os.getenv('AI_BREAKER_THRESHOLD', 5))
+AI_BREAKER_COOLDOWN = float(os.getenv('AI_BREAKER_COOLDOWN', 60))
+
+# AI提示词聊天记录占位符：每个聊天在内存中保留的最近消息数及最多缓存的聊天数
+CHAT_HISTORY_SIZE = int(os.getenv('CHAT_HISTORY_SIZE', 500))
+CHAT_HISTORY_MAX_CHATS = int(os.getenv('CHAT_HISTORY_MAX_CHATS', 100))
+
 # 分页配置
 MODELS_PER_PAGE = int(os.getenv('AI_MODELS_PER_PAGE', 10))
 KEYWORDS_PER_PAGE = int(os.getenv('KEYWORDS_PER_PAGE', 50))
@@ -64,6 +92,49 @@ MEDIA_SIZE_COLS = int(os.getenv('MEDIA_SIZE_COLS', 6))
 MEDIA_EXTENSIONS_ROWS = int(os.getenv('MEDIA_EXTENSIONS_ROWS', 6))
 MEDIA_EXTENSIONS_COLS = int(os.getenv('MEDIA_EXTENSIONS_COLS', 6))
 
+# 同一条消息匹配多条规则时最多并发处理的规则数量，设为1时逐条顺序处理
+RULE_CONCURRENCY = int(os.getenv('RULE_CONCURRENCY', 8))
+
+# 媒体组最后一条消息到达后等待的静默时间 (秒)，以及收集媒体组的最长等待时间 (秒)
+ALBUM_QUIET_PERIOD = float(os.getenv('ALBUM_QUIET_PERIOD', 0.8))
+ALBUM_MAX_WAIT = float(os.getenv('ALBUM_MAX_WAIT', 5))
+
+# 媒体组并发下载/上传的文件数
+MEDIA_GROUP_CONCURRENCY = int(os.getenv('MEDIA_GROUP_CONCURRENCY', 4))
+
+# 发送频率限制：每个客户端每秒最多发送的消息数，每个目标聊天每分钟最多发送的消息数及突发数量
+SEND_GLOBAL_RATE = float(os.getenv('SEND_GLOBAL_RATE', 30))
+SEND_CHAT_RATE_PER_MINUTE = float(os.getenv('SEND_CHAT_RATE_PER_MINUTE', 20))
+SEND_CHAT_BURST = float(os.getenv('SEND_CHAT_BURST', 10))
+# 触发 FloodWait 后自动重试的最大次数
+SEND_FLOOD_MAX_RETRIES = int(os.getenv('SEND_FLOOD_MAX_RETRIES', 3))
+
+# 推送：同一条消息最多同时推送的渠道数
+PUSH_CONCURRENCY = int(os.getenv('PUSH_CONCURRENCY', 5))
+# 推送是否放入后台队列 (不等待推送完成即继续处理)，后台队列长度及推送失败后的重试次数
+PUSH_BACKGROUND = os.getenv('PUSH_BACKGROUND', 'false').lower() == 'true'
+PUSH_QUEUE_SIZE = int(os.getenv('PUSH_QUEUE_SIZE', 200))
+PUSH_MAX_RETRIES = int(os.getenv('PUSH_MAX_RETRIES', 2))
+
+# 聊天实体缓存有效期 (秒)
+ENTITY_CACHE_TTL = int(os.getenv('ENTITY_CACHE_TTL', 6 * 3600))
+
+# SQLite 连接参数，设为空字符串则不设置对应的 PRAGMA
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+# 遇到数据库锁时的等待时间 (毫秒)
+SQLITE_BUSY_TIMEOUT = os.getenv('SQLITE_BUSY_TIMEOUT', '10000')
+# 页缓存大小，负数表示 KB
+SQLITE_CACHE_SIZE = os.getenv('SQLITE_CACHE_SIZE', '-32000')
+# 内存映射大小 (字节)
+SQLITE_MMAP_SIZE = os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024))
+SQLITE_TEMP_STORE = os.getenv('SQLITE_TEMP_STORE', 'MEMORY')
+
+# 数据库连接池大小、允许额外创建的连接数及获取连接的超时时间 (秒)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+
 LOG_MAX_SIZE_MB = 10
 LOG_BACKUP_COUNT = 3
 
@@ -0,0 +1,250 @@
+import logging
+import re
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from models.change_tracker import change_tracker
+from models.models import get_session, Keyword
+
+logger = logging.getLogger(__name__)
+
+# 普通关键字数量低于该值时直接逐个做子串查找，比逐字符遍历自动机更快
+AHO_CORASICK_MIN_KEYWORDS = 32
+
+# 最多缓存的规则匹配器数量，超出时淘汰最久未使用的规则（包括已删除的规则）
+MAX_CACHED_MATCHERS = 1024
+
+# 含有反向引用的正则无法与其他正则合并
+_BACKREFERENCE_PATTERN = re.compile(r'\\[1-9]|\(\?P=')
+
+
+class AhoCorasick:
+    """
+    Aho–Corasick 多模式匹配自动机
+
+    一次遍历文本即可判断是否命中任意关键字，复杂度与关键字数量无关。
+    """
+
+    def __init__(self, keywords: List[str]):
+        # 每个状态: 子节点表、失败指针、在该状态结束的关键字
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Optional[str]] = [None]
+
+        for keyword in keywords:
+            self._add(keyword)
+        self._build()
+
+    def _add(self, keyword: str) -> None:
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._goto[state][char] = next_state
+            state = next_state
+        if self._output[state] is None:
+            self._output[state] = keyword
+
+    def _build(self) -> None:
+        """广度优先计算失败指针"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # 失败链上的关键字同样视为命中
+                if self._output[next_state] is None:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+
+    def search(self, text: str) -> Optional[str]:
+        """返回文本中第一个命中的关键字，未命中返回 None"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+
+class KeywordSet:
+    """
+    单个名单（白名单或黑名单）的预编译关键字集合
+
+    普通关键字不区分大小写，使用 Aho–Corasick 自动机匹配；
+    正则关键字合并为一个预编译的多选正则，无法合并的单独编译。
+    """
+
+    def __init__(self, plain_keywords: List[str], regex_keywords: List[str]):
+        self.plain_keywords = plain_keywords
+        self.regex_keywords = regex_keywords
+
+        # 空关键字与任何文本都匹配（与 `'' in text` 的行为一致）
+        self._empty_keyword = '' in plain_keywords
+        lowered = list(dict.fromkeys(k.lower() for k in plain_keywords if k))
+        # 记录小写关键字对应的原始关键字，用于日志输出
+        self._original = {}
+        for keyword in plain_keywords:
+            if keyword:
+                self._original.setdefault(keyword.lower(), keyword)
+
+        self._automaton = None
+        self._plain_list: List[str] = []
+        if len(lowered) >= AHO_CORASICK_MIN_KEYWORDS:
+            self._automaton = AhoCorasick(lowered)
+        else:
+            self._plain_list = lowered
+
+        self._combined_regex = None
+        self._combined_groups: List[Tuple[int, str]] = []
+        self._standalone_regex: List[Tuple[re.Pattern, str]] = []
+        self._compile_regex(regex_keywords)
+
+    def _compile_regex(self, regex_keywords: List[str]) -> None:
+        """编译正则关键字"""
+        combinable = []
+        for pattern in dict.fromkeys(regex_keywords):
+            if pattern is None:
+                continue
+            try:
+                compiled = re.compile(pattern)
+            except re.error:
+                logger.error(f"正则表达式错误: {pattern}")
+                continue
+
+            # 含反向引用或无法放入分组（如非开头的全局标志）的正则单独匹配
+            if _BACKREFERENCE_PATTERN.search(pattern):
+                self._standalone_regex.append((compiled, pattern))
+                continue
+            try:
+                re.compile(f'({pattern})')
+            except re.error:
+                self._standalone_regex.append((compiled, pattern))
+                continue
+            combinable.append((compiled, pattern))
+
+        if not combinable:
+            return
+
+        # 每个正则包在一个捕获组中，记录外层分组编号以便找出命中的关键字
+        parts = []
+        group_index = 1
+        for compiled, pattern in combinable:
+            parts.append(f'({pattern})')
+            self._combined_groups.append((group_index, pattern))
+            group_index += 1 + compiled.groups
+        try:
+            self._combined_regex = re.compile('|'.join(parts))
+        except re.error:
+            # 例如不同正则中存在同名分组，退回逐个匹配
+            logger.warning("正则关键字无法合并，使用逐个匹配")
+            self._combined_groups = []
+            self._standalone_regex.extend(combinable)
+
+    def __len__(self):
+        return len(self.plain_keywords) + len(self.regex_keywords)
+
+    def search(self, text: str, lowered_text: Optional[str] = None) -> Optional[str]:
+        """
+        检查文本是否命中集合中的任意关键字
+
+        Args:
+            text: 原始文本（正则匹配使用）
+            lowered_text: 小写文本，可由调用方预先计算以避免重复转换
+
+        Returns:
+            Optional[str]: 命中的关键字，未命中返回 None
+        """
+        if self._empty_keyword:
+            return ''
+
+        if self._automaton is not None or self._plain_list:
+            if lowered_text is None:
+                lowered_text = text.lower()
+            if self._automaton is not None:
+                matched = self._automaton.search(lowered_text)
+                if matched is not None:
+                    return self._original.get(matched, matched)
+            else:
+                for keyword in self._plain_list:
+                    if keyword in lowered_text:
+                        return self._original.get(keyword, keyword)
+
+        if self._combined_regex is not None:
+            match = self._combined_regex.search(text)
+            if match:
+                for group_index, pattern in self._combined_groups:
+                    if match.group(group_index) is not None:
+                        return pattern
+
+        for compiled, pattern in self._standalone_regex:
+            if compiled.search(text):
+                return pattern
+
+        return None
+
+
+class RuleKeywordMatcher:
+    """规则的预编译关键字匹配器，按黑白名单拆分"""
+
+    def __init__(self, keywords):
+        whitelist_plain, whitelist_regex = [], []
+        blacklist_plain, blacklist_regex = [], []
+        for keyword in keywords:
+            if keyword.keyword is None:
+                continue
+            if keyword.is_blacklist:
+                (blacklist_regex if keyword.is_regex else blacklist_plain).append(keyword.keyword)
+            else:
+                (whitelist_regex if keyword.is_regex else whitelist_plain).append(keyword.keyword)
+
+        self.whitelist = KeywordSet(whitelist_plain, whitelist_regex)
+        self.blacklist = KeywordSet(blacklist_plain, blacklist_regex)
+
+
+# 匹配器缓存 {rule_id: (keyword_version, matcher)}，按最近使用排序
+_matcher_cache: "OrderedDict[int, Tuple[int, RuleKeywordMatcher]]" = OrderedDict()
+
+
+def get_keyword_matcher(rule) -> RuleKeywordMatcher:
+    """
+    获取规则的关键字匹配器，按规则ID和关键字版本号缓存，最多缓存 MAX_CACHED_MATCHERS 个规则
+
+    Args:
+        rule: 转发规则对象
+
+    Returns:
+        RuleKeywordMatcher: 预编译的匹配器
+    """
+    version = change_tracker.version('keywords', rule.id)
+    cached = _matcher_cache.get(rule.id)
+    if cached and cached[0] == version:
+        _matcher_cache.move_to_end(rule.id)
+        return cached[1]
+
+    # 按规则ID查询关键字，传入的规则可以是已脱离会话的快照
+    session = get_session()
+    try:
+        matcher = RuleKeywordMatcher(session.query(Keyword).filter_by(rule_id=rule.id).all())
+    finally:
+        session.close()
+    _matcher_cache[rule.id] = (version, matcher)
+    _matcher_cache.move_to_end(rule.id)
+    while len(_matcher_cache) > MAX_CACHED_MATCHERS:
+        _matcher_cache.popitem(last=False)
+    logger.info(
+        f"规则 {rule.id} 关键字匹配器已编译: 白名单 {len(matcher.whitelist)} 个, 黑名单 {len(matcher.blacklist)} 个"
+    )
+    return matcher
@@ -1,9 +1,115 @@
 import logging
 import os
+import time
+from typing import Dict, Optional, Tuple
+
+from telethon.tl.types import DocumentAttributeAudio, DocumentAttributeImageSize, DocumentAttributeVideo
 
 logger = logging.getLogger(__name__)
 
-async def get_media_size(media):
+# 媒体类型标志位，与 MediaTypes 的字段对应
+MEDIA_PHOTO = 1
+MEDIA_DOCUMENT = 2
+MEDIA_VIDEO = 4
+MEDIA_AUDIO = 8
+MEDIA_VOICE = 16
+
+MEDIA_TYPE_FLAGS = (
+    ('photo', MEDIA_PHOTO),
+    ('document', MEDIA_DOCUMENT),
+    ('video', MEDIA_VIDEO),
+    ('audio', MEDIA_AUDIO),
+    ('voice', MEDIA_VOICE),
+)
+
+
+class MediaInfo:
+    """
+    消息媒体的元数据，每条消息只解析一次，供各过滤器共用
+
+    kind: photo / video / audio / voice / document，纯链接预览为 webpage，没有媒体为 None
+    flags: message.media 上存在的媒体类型标志位 (MEDIA_PHOTO 等)
+    extension: 小写且不带点号的扩展名，没有扩展名时为空字符串
+    """
+
+    __slots__ = ('kind', 'flags', 'size', 'file_name', 'extension', 'mime_type', 'width', 'height')
+
+    def __init__(self, kind=None, flags=0, size=0, file_name=None, mime_type=None, width=None, height=None):
+        self.kind = kind
+        self.flags = flags
+        self.size = size
+        self.file_name = file_name
+        self.extension = os.path.splitext(file_name)[1].lstrip('.').lower() if file_name else ''
+        self.mime_type = mime_type
+        self.width = width
+        self.height = height
+
+    @property
+    def has_media(self):
+        """是否包含实际媒体（图片、文件等）"""
+        return self.flags != 0
+
+    @property
+    def is_pure_link_preview(self):
+        return self.kind == 'webpage'
+
+    @property
+    def size_mb(self):
+        return round(self.size / 1024 / 1024, 2)
+
+    @classmethod
+    def from_message(cls, message):
+        media = getattr(message, 'media', None)
+        if not media:
+            return cls()
+
+        flags = 0
+        for name, flag in MEDIA_TYPE_FLAGS:
+            if getattr(media, name, None):
+                flags |= flag
+        if not flags:
+            return cls(kind='webpage' if hasattr(media, 'webpage') else None)
+
+        document = getattr(media, 'document', None)
+        if document:
+            kind = 'document'
+            file_name = width = height = None
+            for attr in getattr(document, 'attributes', None) or []:
+                if file_name is None and hasattr(attr, 'file_name'):
+                    file_name = attr.file_name
+                if isinstance(attr, DocumentAttributeVideo):
+                    width, height = attr.w, attr.h
+                    if not attr.round_message:
+                        kind = 'video'
+                elif isinstance(attr, DocumentAttributeImageSize):
+                    width, height = attr.w, attr.h
+                elif isinstance(attr, DocumentAttributeAudio) and kind == 'document':
+                    kind = 'voice' if attr.voice else 'audio'
+            return cls(kind, flags, document.size or 0, file_name, document.mime_type, width, height)
+
+        photo = getattr(media, 'photo', None)
+        if photo:
+            largest = _largest_photo_size(photo)
+            width, height, size = largest if largest else (None, None, 0)
+            return cls('photo', flags, size, mime_type='image/jpeg', width=width, height=height)
+
+        return cls(None, flags, media_size(media))
+
+
+def _largest_photo_size(photo):
+    """获取照片最大尺寸的 (宽, 高, 字节数)"""
+    largest = None
+    for photo_size in getattr(photo, 'sizes', None) or []:
+        size = getattr(photo_size, 'size', None)
+        if size is None:
+            # 渐进式照片的 sizes 为各级大小，最后一级为完整大小
+            size = max(getattr(photo_size, 'sizes', None) or [0])
+        if largest is None or size > largest[2]:
+            largest = (getattr(photo_size, 'w', None), getattr(photo_size, 'h', None), size)
+    return largest
+
+
+def media_size(media):
     """获取媒体文件大小"""
     if not media:
         return 0
@@ -28,10 +134,73 @@ async def get_media_size(media):
 
     return 0
 
+
 async def get_max_media_size():
     """获取媒体文件大小上限"""
     max_media_size_str = os.getenv('MAX_MEDIA_SIZE')
     if not max_media_size_str:
         logger.error('未设置 MAX_MEDIA_SIZE 环境变量')
         raise ValueError('必须在 .env 文件中设置 MAX_MEDIA_SIZE')
-    return float(max_media_size_str) * 1024 * 1024  # 转换为字节，支持小数
\ No newline at end of file
+    return float(max_media_size_str) * 1024 * 1024  # 转换为字节，支持小数
+
+def is_same_account(client, other_client):
+    """判断两个客户端是否为同一账号"""
+    if client is None or other_client is None:
+        return False
+    if client is other_client:
+        return True
+    self_id = getattr(client, '_self_id', None)
+    return self_id is not None and self_id == getattr(other_client, '_self_id', None)
+
+
+# 发送客户端无法查看的聊天 {(客户端, chat_id): 过期时间}，期间不再尝试由发送客户端获取消息
+_unreadable_chats: Dict[Tuple[int, int], float] = {}
+UNREADABLE_CHAT_TTL = 600
+
+
+def _has_reference_media(message) -> bool:
+    """消息是否带有可以直接引用发送的照片或文件"""
+    if not message or not getattr(message, 'media', None):
+        return False
+    return bool(getattr(message, 'photo', None) or getattr(message, 'document', None))
+
+
+async def get_reference_messages(client, messages) -> Optional[list]:
+    """
+    获取可以由 client 直接引用媒体发送的消息，无需下载再上传
+
+    媒体的 access_hash 和 file_reference 只对获取到该消息的账号有效：
+    - 发送客户端就是接收客户端时直接使用原消息
+    - 否则（机器人发送用户账号收到的消息）如果源聊天是频道/超级群组，且机器人也能查看，
+      由机器人按ID重新获取这些消息，一次请求即可代替下载和上传。
+      普通群组和私聊的消息ID因账号而异，不能这样获取
+
+    Returns:
+        Optional[list]: 与 messages 顺序一致、可由 client 引用的消息，无法引用时返回 None
+    """
+    messages = list(messages)
+    if not messages or not all(_has_reference_media(message) for message in messages):
+        return None
+    if all(is_same_account(client, getattr(message, 'client', None)) for message in messages):
+        return messages
+
+    chat_id = messages[0].chat_id
+    if chat_id is None or not str(chat_id).startswith('-100'):
+        return None
+    key = (id(client), chat_id)
+    if _unreadable_chats.get(key, 0) > time.monotonic():
+        return None
+    try:
+        fetched = await client.get_messages(chat_id, ids=[message.id for message in messages])
+    except Exception as e:
+        logger.info(f'发送客户端无法查看聊天 {chat_id}，{UNREADABLE_CHAT_TTL} 秒内改为下载后发送: {str(e)}')
+        _unreadable_chats[key] = time.monotonic() + UNREADABLE_CHAT_TTL
+        return None
+    if not fetched or not all(_has_reference_media(message) for message in fetched):
+        return None
+    return list(fetched)
+
+
+def media_bytes_required(rule):
+    """判断规则的后续处理是否需要媒体文件内容（推送附件、AI识图）"""
+    return bool(rule.enable_push) or bool(rule.is_ai and rule.enable_ai_upload_image)
@@ -0,0 +1,250 @@
+import asyncio
+import contextvars
+import logging
+import os
+import shutil
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+from utils.constants import TEMP_DIR
+
+logger = logging.getLogger(__name__)
+
+# 缓存文件存放目录，每个媒体一个子目录，文件名与直接下载时一致
+MEDIA_CACHE_DIR = os.path.join(TEMP_DIR, 'media_cache')
+
+# 当前事件的缓存作用域，规则任务创建时自动继承
+_current_scope: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar('media_cache_scope', default=None)
+
+
+def get_media_key(message) -> Optional[Tuple[str, int, int]]:
+    """
+    获取消息媒体的缓存键 (类型, id, access_hash)
+
+    只有照片和文件可以缓存，网页预览等其他媒体返回 None
+    """
+    photo = getattr(message, 'photo', None)
+    if photo is not None and getattr(photo, 'id', None) is not None:
+        return ('photo', photo.id, getattr(photo, 'access_hash', 0))
+    document = getattr(message, 'document', None)
+    if document is not None and getattr(document, 'id', None) is not None:
+        return ('document', document.id, getattr(document, 'access_hash', 0))
+    return None
+
+
+class _CacheEntry:
+    __slots__ = ('path', 'refs', 'pins', 'future', 'uploads')
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        # 使用者引用计数 {scope_id: count}，不在任何作用域内的引用记在 None 下
+        self.refs: Counter = Counter()
+        # 持有该媒体的事件作用域，作用域结束前文件不会被删除
+        self.pins: set = set()
+        self.future: Optional[asyncio.Future] = None
+        # 已上传到 Telegram 的媒体 {client: Future[InputMedia]}，随缓存文件一起释放
+        self.uploads: Dict[object, asyncio.Future] = {}
+
+
+class MediaCache:
+    """
+    媒体下载缓存
+
+    以 Telegram 照片/文件的 id 和 access_hash 为键，同一个媒体只从 Telegram 下载一次，
+    所有过滤器和规则共用同一个本地文件。文件按引用计数管理，最后一个使用者释放后删除。
+
+    消息处理时由监听器为每个事件开启一个作用域 (scope)，作用域内获取的媒体
+    在作用域结束前不会被删除，保证后执行的规则可以直接复用已下载的文件。
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, int, int], _CacheEntry] = {}
+        # 本地路径 -> 缓存键
+        self._paths: Dict[str, Tuple[str, int, int]] = {}
+        self._next_scope_id = 0
+        logger.info("MediaCache 初始化")
+
+    @asynccontextmanager
+    async def scope(self):
+        """
+        开启事件级作用域，作用域结束时释放其中所有媒体的引用
+        """
+        self._next_scope_id += 1
+        scope_id = self._next_scope_id
+        token = _current_scope.set(scope_id)
+        try:
+            yield scope_id
+        finally:
+            _current_scope.reset(token)
+            for key in list(self._entries):
+                entry = self._entries.get(key)
+                if entry is not None and scope_id in entry.pins:
+                    entry.pins.discard(scope_id)
+                    entry.refs.pop(scope_id, None)
+                    self._evict_if_unused(key)
+
+    async def acquire(self, message) -> Optional[str]:
+        """
+        获取消息媒体的本地文件路径，首次获取时下载，引用计数加一
+
+        使用完毕后需要调用 release(path)
+
+        Args:
+            message: Telethon 消息对象
+
+        Returns:
+            Optional[str]: 本地文件路径，下载失败返回 None
+        """
+        key = get_media_key(message)
+        if key is None:
+            # 无法缓存的媒体直接下载到临时目录
+            return await message.download_media(TEMP_DIR)
+
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _CacheEntry()
+            self._entries[key] = entry
+
+        scope_id = _current_scope.get()
+        entry.refs[scope_id] += 1
+        if scope_id is not None:
+            entry.pins.add(scope_id)
+
+        try:
+            if entry.path is not None and os.path.exists(entry.path):
+                logger.info(f"媒体缓存命中: {entry.path}")
+                return entry.path
+
+            if entry.future is None:
+                entry.future = asyncio.ensure_future(self._download(key, message))
+            path = await asyncio.shield(entry.future)
+        except BaseException:
+            self._release_key(key, scope_id)
+            raise
+
+        if path is None:
+            self._release_key(key, scope_id)
+        return path
+
+    async def _download(self, key, message) -> Optional[str]:
+        entry = self._entries[key]
+        target_dir = os.path.join(MEDIA_CACHE_DIR, f'{key[0]}_{key[1]}')
+        os.makedirs(target_dir, exist_ok=True)
+        try:
+            path = await message.download_media(target_dir)
+            if path:
+                entry.path = path
+                self._paths[path] = key
+                logger.info(f"媒体文件已下载到缓存: {path}")
+            return path
+        finally:
+            entry.future = None
+
+    def release(self, file_path) -> None:
+        """
+        释放文件引用，最后一个引用释放后删除文件
+
+        不是由缓存管理的文件直接删除
+        """
+        if not file_path:
+            return
+        file_path = str(file_path)
+        key = self._paths.get(file_path)
+        if key is None:
+            self._remove_file(file_path)
+            return
+        self._release_key(key, _current_scope.get())
+
+    def retain(self, file_path) -> bool:
+        """
+        为后台任务增加一个不属于任何作用域的引用，事件处理结束后文件仍会保留
+
+        后台任务需在不属于任何作用域的上下文中调用 release(path) 释放
+
+        Returns:
+            bool: 文件不是由缓存管理时返回 False
+        """
+        key = self._paths.get(str(file_path)) if file_path else None
+        entry = self._entries.get(key) if key is not None else None
+        if entry is None:
+            return False
+        entry.refs[None] += 1
+        return True
+
+    def uploads(self, file_path) -> Optional[Dict[object, asyncio.Future]]:
+        """
+        获取缓存文件的上传记录，同一事件的其他规则可以复用已上传的媒体
+
+        Returns:
+            Optional[Dict]: {client: Future[InputMedia]}，文件不是由缓存管理时返回 None
+        """
+        key = self._paths.get(str(file_path)) if file_path else None
+        entry = self._entries.get(key) if key is not None else None
+        return entry.uploads if entry is not None else None
+
+    async def download(self, message, file):
+        """
+        将消息媒体复制到指定位置，行为与 message.download_media(file) 相同
+
+        Args:
+            message: Telethon 消息对象
+            file: 目标文件路径，或可写的文件对象
+
+        Returns:
+            目标文件路径或文件对象，失败返回 None
+        """
+        path = await self.acquire(message)
+        if path is None:
+            return None
+        try:
+            if hasattr(file, 'write'):
+                with open(path, 'rb') as f:
+                    shutil.copyfileobj(f, file)
+                return file
+            target = str(file)
+            if os.path.isdir(target):
+                target = os.path.join(target, os.path.basename(path))
+            try:
+                # 同一文件系统下优先使用硬链接，避免复制大文件
+                if os.path.exists(target):
+                    os.remove(target)
+                os.link(path, target)
+            except OSError:
+                shutil.copyfile(path, target)
+            return target
+        finally:
+            self.release(path)
+
+    def _release_key(self, key, scope_id) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        if entry.refs[scope_id] > 0:
+            entry.refs[scope_id] -= 1
+        if entry.refs[scope_id] <= 0:
+            del entry.refs[scope_id]
+        self._evict_if_unused(key)
+
+    def _evict_if_unused(self, key) -> None:
+        entry = self._entries.get(key)
+        if entry is None or entry.pins or sum(entry.refs.values()) > 0 or entry.future is not None:
+            return
+        del self._entries[key]
+        if entry.path is not None:
+            self._paths.pop(entry.path, None)
+            self._remove_file(entry.path)
+            shutil.rmtree(os.path.dirname(entry.path), ignore_errors=True)
+
+    @staticmethod
+    def _remove_file(file_path: str) -> None:
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+                logger.info(f'删除临时文件: {file_path}')
+        except Exception as e:
+            logger.error(f'删除临时文件失败: {str(e)}')
+
+
+# 创建全局实例
+media_cache = MediaCache()
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import mimetypes
+import os
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple, TypeVar
+
+from telethon import utils
+from telethon.tl.functions.messages import UploadMediaRequest
+from telethon.tl.types import DocumentAttributeFilename, InputMediaUploadedDocument, InputMediaUploadedPhoto
+
+from utils.constants import MEDIA_GROUP_CONCURRENCY
+from utils.media import MediaInfo
+from utils.media_cache import media_cache
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+async def map_bounded(func: Callable[[T], Awaitable[R]], items: Iterable[T],
+                      concurrency: int = MEDIA_GROUP_CONCURRENCY) -> List[R]:
+    """并发执行 func(item)，最多同时执行 concurrency 个，结果保持 items 的顺序"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(item):
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+
+async def download_album(messages, concurrency: int = MEDIA_GROUP_CONCURRENCY) -> List[str]:
+    """
+    并发下载媒体组的所有文件，返回按媒体组顺序排列的本地路径（下载失败的跳过）
+
+    文件通过 media_cache 获取，使用完毕后需要逐个 release
+    """
+    async def acquire(message):
+        try:
+            return await media_cache.acquire(message)
+        except Exception as e:
+            logger.error(f'下载媒体组文件失败: 消息ID={message.id}, {str(e)}')
+            return None
+
+    paths = await map_bounded(acquire, [message for message in messages if message.media], concurrency)
+    return [path for path in paths if path]
+
+
+async def upload_media(client, entity, message, file_path: str):
+    """
+    上传文件并转换为可以直接发送（包括作为媒体组发送）的 InputMedia
+
+    文档沿用原消息的属性（文件名、视频时长和尺寸等），无需在本地重新解析文件
+    """
+    handle = await client.upload_file(file_path)
+    media_info = MediaInfo.from_message(message)
+    if media_info.kind == 'photo':
+        uploaded = InputMediaUploadedPhoto(handle)
+    else:
+        document = getattr(message, 'document', None)
+        attributes = list(document.attributes) if document else []
+        if not attributes:
+            attributes = [DocumentAttributeFilename(os.path.basename(file_path))]
+        mime_type = media_info.mime_type or mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        uploaded = InputMediaUploadedDocument(handle, mime_type, attributes, nosound_video=True)
+
+    result = await client(UploadMediaRequest(await client.get_input_entity(entity), uploaded))
+    return utils.get_input_media(result)
+
+
+async def upload_cached(client, entity, message, file_path: str):
+    """
+    上传文件并返回 InputMedia，同一事件中同一客户端的同一媒体只上传一次
+
+    上传结果记录在媒体缓存中，同一事件发往其他目标的规则直接引用已上传的媒体发送；
+    多个规则同时上传同一媒体时共用一次上传。上传失败时不记录，由下一个规则重新上传。
+    """
+    uploads = media_cache.uploads(file_path)
+    if uploads is None:
+        return await upload_media(client, entity, message, file_path)
+
+    future = uploads.get(client)
+    if future is None:
+        future = asyncio.ensure_future(upload_media(client, entity, message, file_path))
+        uploads[client] = future
+    else:
+        logger.info(f'复用已上传的媒体: {file_path}')
+    try:
+        # 单个规则被取消时不影响其他规则等待中的上传
+        return await asyncio.shield(future)
+    except Exception:
+        if uploads.get(client) is future:
+            del uploads[client]
+        raise
+
+
+async def prepare_album(client, entity, messages,
+                        concurrency: int = MEDIA_GROUP_CONCURRENCY) -> Tuple[List[str], list]:
+    """
+    下载并上传媒体组的所有文件
+
+    每个文件下载完成后立即开始上传，不必等待其他文件下载完成，
+    整个媒体组的耗时接近最慢的单个文件，而不是所有文件耗时之和。
+    同一事件中已由其他规则上传过的文件直接复用。
+
+    Returns:
+        Tuple[List[str], list]: (本地文件路径, 可直接传给 send_file 的媒体)，均按媒体组顺序排列；
+        上传失败的文件以本地路径代替，由 send_file 重新上传。本地文件使用完毕后需要逐个 release
+    """
+    async def prepare(message) -> Optional[Tuple[str, object]]:
+        try:
+            file_path = await media_cache.acquire(message)
+        except Exception as e:
+            logger.error(f'下载媒体组文件失败: 消息ID={message.id}, {str(e)}')
+            return None
+        if not file_path:
+            return None
+        try:
+            return file_path, await upload_cached(client, entity, message, file_path)
+        except Exception as e:
+            logger.warning(f'预先上传媒体组文件失败，发送时重新上传: {file_path}, {str(e)}')
+            return file_path, file_path
+
+    results = await map_bounded(prepare, [message for message in messages if message.media], concurrency)
+    results = [result for result in results if result]
+    return [path for path, _ in results], [media for _, media in results]
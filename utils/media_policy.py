@@ -0,0 +1,66 @@
+import logging
+from typing import Dict, FrozenSet, Tuple
+
+from models.models import get_session, MediaTypes, MediaExtensions
+from models.change_tracker import change_tracker
+from utils.media import MEDIA_TYPE_FLAGS
+
+logger = logging.getLogger(__name__)
+
+# 媒体策略依赖的表，任意一张表中该规则的数据变更后缓存失效
+MEDIA_POLICY_TABLES = ('media_types', 'media_extensions')
+
+
+class MediaPolicy:
+    """规则的媒体过滤设置：被屏蔽的媒体类型标志位和扩展名集合"""
+
+    __slots__ = ('blocked_flags', 'extensions')
+
+    def __init__(self, blocked_flags: int = 0, extensions: FrozenSet[str] = frozenset()):
+        self.blocked_flags = blocked_flags
+        # 小写且不带点号
+        self.extensions = extensions
+
+    @classmethod
+    def load(cls, rule_id: int) -> 'MediaPolicy':
+        session = get_session()
+        try:
+            media_types = session.query(MediaTypes).filter_by(rule_id=rule_id).first()
+            blocked_flags = 0
+            if media_types:
+                for name, flag in MEDIA_TYPE_FLAGS:
+                    if getattr(media_types, name):
+                        blocked_flags |= flag
+            extensions = frozenset(
+                extension.lower()
+                for (extension,) in session.query(MediaExtensions.extension).filter_by(rule_id=rule_id)
+                if extension
+            )
+            return cls(blocked_flags, extensions)
+        finally:
+            session.close()
+
+    def blocked_types(self, media_info) -> int:
+        """返回媒体中被屏蔽的类型标志位，为 0 表示未被屏蔽"""
+        return media_info.flags & self.blocked_flags
+
+
+# 媒体策略缓存 {rule_id: (版本号, policy)}
+_policy_cache: Dict[int, Tuple[tuple, MediaPolicy]] = {}
+
+
+def get_media_policy(rule) -> MediaPolicy:
+    """
+    获取规则的媒体策略，按规则ID和媒体类型/扩展名的版本号缓存
+
+    媒体设置回调和 db_operations 提交修改后版本号随之变化，下次访问时重新加载
+    """
+    version = change_tracker.versions(*MEDIA_POLICY_TABLES, key=rule.id)
+    cached = _policy_cache.get(rule.id)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    policy = MediaPolicy.load(rule.id)
+    _policy_cache[rule.id] = (version, policy)
+    logger.info(f"规则 {rule.id} 媒体策略已加载: 屏蔽类型 {policy.blocked_flags:#04x}, 扩展名 {len(policy.extensions)} 个")
+    return policy